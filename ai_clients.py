@@ -0,0 +1,76 @@
+"""
+Shared AI provider clients for BookGenPro
+
+One keep-alive HTTP connection pool is shared by every OpenRouter call and
+one google-genai client is kept per API key, so a book's worth of
+generation requests pays the TCP/TLS handshake once instead of per call.
+
+Tunables (environment variables):
+- AI_HTTP_POOL_SIZE: max pooled connections per host (default 16)
+- AI_HTTP_CONNECT_TIMEOUT: seconds to wait for a connection (default 10)
+- AI_GEMINI_TIMEOUT: seconds per Gemini request (default 120)
+"""
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+HTTP_POOL_SIZE = int(os.environ.get("AI_HTTP_POOL_SIZE", 16))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("AI_HTTP_CONNECT_TIMEOUT", 10))
+GEMINI_TIMEOUT = float(os.environ.get("AI_GEMINI_TIMEOUT", 120))
+
+_lock = threading.Lock()
+_http_session = None
+_gemini_clients = {}
+
+
+def get_http_session():
+    """Process-wide requests session with a keep-alive connection pool"""
+    global _http_session
+    with _lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def openrouter_post(api_key, payload, timeout=45, **kwargs):
+    """POST a chat completion request to OpenRouter over the pooled session"""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    return get_http_session().post(OPENROUTER_URL, json=payload, headers=headers,
+                                   timeout=(HTTP_CONNECT_TIMEOUT, timeout), **kwargs)
+
+
+def get_gemini_client(api_key):
+    """Cached google-genai client for this API key (raises ImportError if the
+    library is not installed)"""
+    with _lock:
+        client = _gemini_clients.get(api_key)
+        if client is None:
+            from google import genai
+            from google.genai import types
+
+            client = genai.Client(
+                api_key=api_key,
+                http_options=types.HttpOptions(timeout=int(GEMINI_TIMEOUT * 1000))
+            )
+            _gemini_clients[api_key] = client
+        return client
+
+
+def reset_clients():
+    """Drop pooled connections and cached clients (e.g. after API keys change)"""
+    global _http_session
+    with _lock:
+        if _http_session is not None:
+            _http_session.close()
+        _http_session = None
+        _gemini_clients.clear()
@@ -1,16 +1,33 @@
 import os
 import json
 import uuid
+import base64
 import hashlib
-import requests
+import time
+import queue
 import threading
 from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_file
 from werkzeug.utils import secure_filename
 from werkzeug.middleware.proxy_fix import ProxyFix
-import weasyprint
 from PIL import Image
 import logging
+from ai_clients import get_http_session, openrouter_post, get_gemini_client, reset_clients
+from llm_cache import cached_generate, llm_cache_stats
+from manuscript_import import split_raw_text, read_manuscript, MANUSCRIPT_EXTENSIONS, MAX_IMPORT_MB
+from text_normalizer import clean_chapter_content, enhance_content_for_kdp
+from render_cache import render_key, project_content_hash, cached_pdf, render_cache_stats
+from export_store import init_exports, get_export_store, export_key, export_store_stats
+from export_service import run_export, render_book, render_standalone_pdf, export_part_cache_stats, EXPORT_PROCESSES
+from docx_export import book_model, standalone_book_model, build_docx
+from pdf_resources import fetch_fonts
+from config_service import config_snapshot, read_config, write_config
+import generation_events
+from project_store import (init_store, get_project_file, load_project, save_project,
+                           remove_project, list_projects, query_projects, count_projects,
+                           library_stats, find_chapter, project_revision)
+from job_queue import (init_jobs, register_job_handler, start_job_workers, enqueue_job,
+                       get_job, list_jobs, cancel_job, current_job)
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -23,12 +40,25 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 UPLOAD_FOLDER = 'static/uploads'
 PROJECTS_FOLDER = 'projects'
 EXPORTS_FOLDER = 'exports'
+IMPORTS_FOLDER = 'imports'  # uploaded manuscripts waiting for their import job
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
 
 # Create directories if they don't exist
-for folder in [UPLOAD_FOLDER, PROJECTS_FOLDER, EXPORTS_FOLDER]:
+for folder in [UPLOAD_FOLDER, PROJECTS_FOLDER, EXPORTS_FOLDER, IMPORTS_FOLDER]:
     os.makedirs(folder, exist_ok=True)
 
+# Indexed project store (mirrors projects/*.json for fast listings)
+init_store(app, PROJECTS_FOLDER)
+# Durable background job queue (handlers are registered further down)
+init_jobs(app)
+# Content-addressed export files with retention (exports/manifest.json)
+init_exports(app, EXPORTS_FOLDER)
+
+@app.cli.command('fetch-fonts')
+def fetch_fonts_command():
+    """Download the PDF export fonts into static/fonts."""
+    print(f"Vendored {fetch_fonts()} font files in static/fonts")
+
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
@@ -53,10 +83,9 @@ def get_machine_id():
         return hashlib.md5(f"{platform.system()}-{uuid.getnode()}".encode()).hexdigest()
 
 def load_config():
-    """Load configuration from config.json"""
+    """Load configuration from config.json (cached in memory, one snapshot per request)"""
     try:
-        with open('config.json', 'r') as f:
-            return json.load(f)
+        return config_snapshot()
     except FileNotFoundError:
         # Create default config
         from datetime import datetime, timedelta
@@ -127,28 +156,33 @@ Return only the chapter titles, one per line, without numbers or additional text
         return None
 
 def start_ai_content_generation(project_id, config):
-    """Start AI content generation for a project in background"""
-    import threading
-    
-    def generate_content():
-        try:
-            project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-            if not os.path.exists(project_file):
+    """Queue AI content generation for a project's pending chapters; returns the job id"""
+    return enqueue_job('write_pending_chapters', project_id=project_id)
+
+def write_pending_chapters_background(project_id, config):
+    """Background task writing every pending chapter of a newly created project"""
+    try:
+        project_file = get_project_file(project_id)
+        if not os.path.exists(project_file):
+            return
+        
+        project = load_project(project_id)
+        
+        project['generation_status'] = 'generating'
+        
+        # Save status update
+        save_project(project_id, project)
+        
+        # Generate content for each chapter
+        job = current_job()
+        for i, chapter in enumerate(project['chapters']):
+            if job and job.cancelled():
+                project['generation_status'] = 'cancelled'
+                save_project(project_id, project)
                 return
             
-            with open(project_file, 'r') as f:
-                project = json.load(f)
-            
-            project['generation_status'] = 'generating'
-            
-            # Save status update
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
-            
-            # Generate content for each chapter
-            for i, chapter in enumerate(project['chapters']):
-                if chapter['status'] == 'pending':
-                    chapter_prompt = f"""Write compelling content for this chapter:
+            if chapter['status'] == 'pending':
+                chapter_prompt = f"""Write compelling content for this chapter:
 
 Book Title: {project.get('title', project.get('name', 'Untitled'))}
 Book Topic: {project['topic']}
@@ -166,51 +200,63 @@ Please write detailed, engaging content for this chapter that:
 
 Write the complete chapter content:"""
 
-                    try:
-                        # Generate content with AI
-                        if config.get('ai_provider') == 'gemini' and config.get('gemini_api_key'):
-                            success, content = generate_with_gemini(chapter_prompt, config.get('gemini_api_key'), config.get('gemini_model', 'gemini-1.5-flash'))
-                        elif config.get('openrouter_api_key'):
-                            success, content = generate_with_openrouter(chapter_prompt, config.get('openrouter_api_key'), config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'))
-                        else:
-                            success = False
-                            content = f"AI content generation unavailable. Please edit this chapter manually.\n\nChapter: {chapter['title']}\n\nAdd your content here..."
-                        
-                        if success and content:
-                            chapter['content'] = content
-                            chapter['status'] = 'completed'
-                            chapter['word_count'] = len(content.split())
-                        else:
-                            chapter['content'] = f"Content generation failed for {chapter['title']}. Please edit manually."
-                            chapter['status'] = 'failed'
-                    except Exception as e:
-                        logging.error(f"Error generating content for chapter {i+1}: {e}")
+                try:
+                    # Generate content with AI
+                    if config.get('ai_provider') == 'gemini' and config.get('gemini_api_key'):
+                        success, content = generate_with_gemini(chapter_prompt, config.get('gemini_api_key'), config.get('gemini_model', 'gemini-1.5-flash'))
+                    elif config.get('openrouter_api_key'):
+                        success, content = generate_with_openrouter(chapter_prompt, config.get('openrouter_api_key'), config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'))
+                    else:
+                        success = False
+                        content = f"AI content generation unavailable. Please edit this chapter manually.\n\nChapter: {chapter['title']}\n\nAdd your content here..."
+                    
+                    if success and content:
+                        chapter['content'] = content
+                        chapter['status'] = 'completed'
+                        chapter['word_count'] = len(content.split())
+                    else:
                         chapter['content'] = f"Content generation failed for {chapter['title']}. Please edit manually."
                         chapter['status'] = 'failed'
-                
-                # Save progress after each chapter
-                with open(project_file, 'w') as f:
-                    json.dump(project, f, indent=2)
+                except Exception as e:
+                    logging.error(f"Error generating content for chapter {i+1}: {e}")
+                    chapter['content'] = f"Content generation failed for {chapter['title']}. Please edit manually."
+                    chapter['status'] = 'failed'
             
-            # Mark project as completed
-            project['generation_status'] = 'completed'
-            project['last_modified'] = datetime.now().isoformat()
+            # Save progress after each chapter
+            save_project(project_id, project)
+        
+        # Mark project as completed
+        project['generation_status'] = 'completed'
+        project['last_modified'] = datetime.now().isoformat()
+        
+        save_project(project_id, project)
             
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
-                
-        except Exception as e:
-            logging.error(f"Background content generation failed: {e}")
-    
-    # Start generation in background thread
-    thread = threading.Thread(target=generate_content)
-    thread.daemon = True
-    thread.start()
+    except Exception as e:
+        logging.error(f"Background content generation failed: {e}")
 
 def save_config(config):
     """Save configuration to config.json"""
-    with open('config.json', 'w') as f:
-        json.dump(config, f, indent=2)
+    write_config(config)
+
+def conditional_on_project(view):
+    """Answer 304 Not Modified when the client's If-None-Match already names
+    the project's current revision, before the project file is read.
+    Successful responses carry the revision as their ETag."""
+    from functools import wraps
+    
+    @wraps(view)
+    def wrapper(project_id, *args, **kwargs):
+        revision = project_revision(project_id)
+        if revision is not None and request.if_none_match.contains(revision):
+            response = app.response_class(status=304)
+        else:
+            response = app.make_response(view(project_id, *args, **kwargs))
+            if revision is None or response.status_code != 200:
+                return response
+        response.set_etag(revision)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -227,7 +273,7 @@ def verify_license(license_key, email, machine_id):
             "email": email,
             "machine_id": machine_id
         }
-        response = requests.post(API_URL, json=data, headers=headers, timeout=10)
+        response = get_http_session().post(API_URL, json=data, headers=headers, timeout=10)
         res_json = response.json()
 
         if response.status_code == 200 and res_json.get("success"):
@@ -241,10 +287,43 @@ def verify_license(license_key, email, machine_id):
     except Exception as e:
         return False, {"error": str(e)}
 
-def generate_with_openrouter(prompt, api_key, model="openai/gpt-3.5-turbo"):
+def generate_with_openrouter(prompt, api_key, model="openai/gpt-3.5-turbo", use_cache=True, on_token=None):
+    """Generate content using OpenRouter API, served from the response cache when possible.
+    When on_token is given the response is streamed and each text chunk is passed to it."""
+    return cached_generate('openrouter', model, prompt, None,
+                           lambda: _generate_with_openrouter(prompt, api_key, model, on_token),
+                           bypass=not use_cache, api_key=api_key)
+
+def _read_openrouter_stream(response, on_token):
+    """Collect an OpenRouter server-sent event stream, forwarding text chunks"""
+    parts = []
+    for line in response.iter_lines(decode_unicode=True):
+        # Blank lines separate events; lines starting with ':' are keepalive comments
+        if not line or not line.startswith('data: '):
+            continue
+        payload = line[6:].strip()
+        if payload == '[DONE]':
+            break
+        chunk = json.loads(payload)
+        if 'error' in chunk:
+            raise RuntimeError(chunk['error'].get('message', chunk['error']))
+        choices = chunk.get('choices') or []
+        delta = choices[0].get('delta', {}).get('content') if choices else None
+        if delta:
+            parts.append(delta)
+            on_token(delta)
+    return ''.join(parts)
+
+def _generate_with_openrouter(prompt, api_key, model, on_token=None):
     """Generate content using OpenRouter API with retry logic and fallback models"""
     import time
     
+    streamed = [False]
+    
+    def forward(delta):
+        streamed[0] = True
+        on_token(delta)
+    
     # List of free models to try as fallbacks
     free_models = [
         model,  # Try the requested model first
@@ -255,22 +334,28 @@ def generate_with_openrouter(prompt, api_key, model="openai/gpt-3.5-turbo"):
     ]
     
     for attempt, current_model in enumerate(free_models):
+        if streamed[0]:
+            # A failed attempt streamed some text; the next model starts over
+            on_token(None)
+            streamed[0] = False
         try:
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            }
             data = {
                 "model": current_model,
                 "messages": [
                     {"role": "user", "content": prompt}
                 ]
             }
+            if on_token:
+                data["stream"] = True
             
-            response = requests.post("https://openrouter.ai/api/v1/chat/completions", 
-                                   json=data, headers=headers, timeout=45)
+            response = openrouter_post(api_key, data, timeout=45, stream=bool(on_token))
             
-            if response.status_code == 200:
+            if response.status_code == 200 and on_token:
+                content = _read_openrouter_stream(response, forward)
+                if content:
+                    return True, content
+                return False, "No content in streamed API response"
+            elif response.status_code == 200:
                 result = response.json()
                 if 'choices' in result and len(result['choices']) > 0:
                     return True, result['choices'][0]['message']['content']
@@ -301,11 +386,16 @@ def generate_with_openrouter(prompt, api_key, model="openai/gpt-3.5-turbo"):
     
     return False, "All retry attempts failed"
 
-def generate_with_gemini(prompt, api_key, model="gemini-2.5-flash"):
+def generate_with_gemini(prompt, api_key, model="gemini-2.5-flash", use_cache=True, on_token=None):
+    """Generate content using Google Gemini API, served from the response cache when possible.
+    When on_token is given the response is streamed and each text chunk is passed to it."""
+    return cached_generate('gemini', model, prompt, 0.7,
+                           lambda: _generate_with_gemini(prompt, api_key, model, on_token),
+                           bypass=not use_cache, api_key=api_key)
+
+def _generate_with_gemini(prompt, api_key, model, on_token=None):
     """Generate content using Google Gemini API with the new google-genai library"""
     try:
-        import os
-        from google import genai
         from google.genai import types
         
         # Use API key from settings or environment
@@ -315,15 +405,27 @@ def generate_with_gemini(prompt, api_key, model="gemini-2.5-flash"):
         if not api_key:
             return False, "Gemini API key not configured. Please add it in Settings."
         
-        client = genai.Client(api_key=api_key)
+        client = get_gemini_client(api_key)
+        generation_config = types.GenerateContentConfig(
+            temperature=0.7,
+            max_output_tokens=4096,
+        )
+        
+        if on_token:
+            parts = []
+            for chunk in client.models.generate_content_stream(model=model, contents=prompt,
+                                                                config=generation_config):
+                if chunk.text:
+                    parts.append(chunk.text)
+                    on_token(chunk.text)
+            if parts:
+                return True, ''.join(parts)
+            return False, "No content generated by Gemini"
         
         response = client.models.generate_content(
             model=model,
             contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.7,
-                max_output_tokens=4096,
-            )
+            config=generation_config
         )
         
         if response.text:
@@ -337,8 +439,14 @@ def generate_with_gemini(prompt, api_key, model="gemini-2.5-flash"):
         logging.error(f"Gemini API exception: {str(e)}")
         return False, f"Gemini connection error: {str(e)}"
 
-def generate_content(prompt, config):
-    """Generate content using the selected AI provider"""
+def generate_content(prompt, config, use_cache=True, on_token=None):
+    """Generate content using the selected AI provider.
+    
+    Pass use_cache=False to force a fresh generation (the result still
+    refreshes the response cache). Pass on_token to stream the response;
+    it is called with each chunk of text as it arrives, and with None when
+    the text streamed so far is discarded because a fallback model retries.
+    """
     ai_provider = config.get('ai_provider', 'openrouter')
     
     if ai_provider == 'gemini':
@@ -346,14 +454,109 @@ def generate_content(prompt, config):
         model = config.get('gemini_model', 'gemini-1.5-flash')
         if not api_key:
             return False, "Gemini API key not configured"
-        return generate_with_gemini(prompt, api_key, model)
+        return generate_with_gemini(prompt, api_key, model, use_cache=use_cache, on_token=on_token)
     else:
         # Default to OpenRouter
         api_key = config.get('openrouter_api_key', '')
         model = config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free')
         if not api_key:
             return False, "OpenRouter API key not configured"
-        return generate_with_openrouter(prompt, api_key, model)
+        return generate_with_openrouter(prompt, api_key, model, use_cache=use_cache, on_token=on_token)
+
+# Parallel chapter generation: at most this many requests in flight per AI
+# provider across all books. Override with "openrouter_concurrency" /
+# "gemini_concurrency" in config.json.
+DEFAULT_PROVIDER_CONCURRENCY = {'openrouter': 4, 'gemini': 4}
+_provider_slots = {}
+_provider_slots_lock = threading.Lock()
+
+def get_provider_concurrency(config):
+    """Concurrency limit for the configured AI provider"""
+    ai_provider = config.get('ai_provider', 'openrouter')
+    try:
+        limit = int(config.get(f'{ai_provider}_concurrency', DEFAULT_PROVIDER_CONCURRENCY.get(ai_provider, 2)))
+    except (TypeError, ValueError):
+        limit = DEFAULT_PROVIDER_CONCURRENCY.get(ai_provider, 2)
+    return max(1, limit)
+
+def get_provider_slots(config):
+    """Shared semaphore bounding in-flight requests for the configured provider"""
+    ai_provider = config.get('ai_provider', 'openrouter')
+    limit = get_provider_concurrency(config)
+    with _provider_slots_lock:
+        slots = _provider_slots.get(ai_provider)
+        if slots is None or slots[0] != limit:
+            slots = (limit, threading.BoundedSemaphore(limit))
+            _provider_slots[ai_provider] = slots
+        return slots[1]
+
+def generate_chapters_parallel(project_id, project, config, chapters, write_chapter):
+    """Generate chapter bodies concurrently on a bounded worker pool.
+    
+    write_chapter(chapter, on_token) returns (success, content) and passes
+    on_token to the provider so text is streamed to the project page while
+    it is written. Partial text is saved every STREAM_SAVE_INTERVAL seconds.
+    Chapters may finish in any order; each result lands in its own chapter
+    dict and the project file is saved as soon as it arrives.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    
+    save_lock = threading.Lock()
+    slots = get_provider_slots(config)
+    job = current_job()
+    
+    def worker(chapter):
+        if job and job.cancelled():
+            return  # leave the chapter pending
+        chapter_id = chapter.get('id')
+        last_save = [time.monotonic()]
+        
+        def on_token(delta):
+            if delta is None:
+                generation_events.reset_partial(project_id, chapter_id)
+                with save_lock:
+                    chapter['content'] = ''
+                return
+            generation_events.append_partial(project_id, chapter_id, delta)
+            if time.monotonic() - last_save[0] >= generation_events.STREAM_SAVE_INTERVAL:
+                last_save[0] = time.monotonic()
+                with save_lock:
+                    chapter['content'] = generation_events.partial_texts(project_id).get(chapter_id, '')
+                    save_project(project_id, project)
+        
+        with slots:
+            if job and job.cancelled():
+                return
+            with save_lock:
+                chapter['status'] = 'generating'
+                save_project(project_id, project)
+            generation_events.publish(project_id, 'chapter', {'id': chapter_id, 'status': 'generating'})
+            
+            try:
+                success, content = write_chapter(chapter, on_token)
+            except Exception as e:
+                logging.error(f"Error generating chapter {chapter.get('number')}: {e}")
+                success, content = False, str(e)
+        
+        with save_lock:
+            if success:
+                chapter['content'] = content
+                chapter['status'] = 'completed'
+            else:
+                chapter['content'] = f"Error generating content: {content}"
+                chapter['status'] = 'error'
+            save_project(project_id, project)
+        generation_events.finish_partial(project_id, chapter_id)
+        generation_events.publish(project_id, 'chapter', {
+            'id': chapter_id,
+            'status': chapter['status'],
+            'content': chapter['content']
+        })
+    
+    with ThreadPoolExecutor(max_workers=get_provider_concurrency(config),
+                            thread_name_prefix=f"chapters-{project_id[:8]}") as pool:
+        # list() re-raises anything a worker did not handle
+        list(pool.map(worker, chapters))
 
 @app.route('/')
 def index():
@@ -366,15 +569,7 @@ def index():
     # Get recent projects
     recent_projects = []
     try:
-        for filename in os.listdir(PROJECTS_FOLDER):
-            if filename.endswith('.json'):
-                filepath = os.path.join(PROJECTS_FOLDER, filename)
-                with open(filepath, 'r') as f:
-                    project = json.load(f)
-                    project['filename'] = filename
-                    recent_projects.append(project)
-        recent_projects.sort(key=lambda x: x.get('last_modified', ''), reverse=True)
-        recent_projects = recent_projects[:5]  # Show only 5 recent projects
+        recent_projects = list_projects(limit=5)  # Show only 5 recent projects
     except Exception as e:
         logging.error(f"Error loading recent projects: {e}")
     
@@ -436,6 +631,9 @@ def save_settings():
     config['selected_model'] = request.form.get('model', 'meta-llama/llama-3.2-3b-instruct:free')
     config['gemini_model'] = request.form.get('gemini_model', 'gemini-1.5-flash')
     save_config(config)
+    # Drop pooled clients bound to the previous API keys
+    reset_clients()
+    generation_events.publish_global('ai_status', ai_status_summary(config))
     flash('Settings saved successfully! AI provider updated.', 'success')
     return redirect(url_for('settings'))
 
@@ -476,7 +674,7 @@ def check_ai_provider_status():
 
 @app.route('/api/writing_progress')
 def get_writing_progress():
-    """Get real writing progress statistics"""
+    """Get real writing progress statistics (?verify=1 recomputes the library totals)"""
     try:
         config = load_config()
         if not config.get('license_activated', False):
@@ -489,111 +687,72 @@ def get_writing_progress():
                 'recent_activity': []
             })
         
-        total_projects = 0
-        completed_projects = 0
-        total_chapters = 0
-        total_words = 0
+        # Running library totals kept by the project store
+        stats = library_stats(verify=request.args.get('verify') == '1')
+        total_projects = stats['total_projects']
+        completed_projects = stats['completed_projects']
+        total_chapters = stats['total_chapters']
+        total_words = stats['total_words']
         recent_activity = []
         
-        # Get all project files
-        project_files = []
-        if os.path.exists(PROJECTS_FOLDER):
-            for filename in os.listdir(PROJECTS_FOLDER):
-                if filename.endswith('.json') and filename != '.gitkeep':
-                    project_files.append(filename)
-        
-        projects_data = []
-        
-        for filename in project_files:
-            try:
-                project_file = os.path.join(PROJECTS_FOLDER, filename)
-                with open(project_file, 'r') as f:
-                    project = json.load(f)
-                
-                total_projects += 1
-                projects_data.append(project)
-                
-                # Count chapters and calculate completion
-                chapters = project.get('chapters', [])
-                project_chapter_count = len(chapters)
-                total_chapters += project_chapter_count
-                
-                # Check if project is completed
-                project_status = project.get('status', 'in_progress')
-                if project_status == 'completed':
-                    completed_projects += 1
-                
-                # Count words in chapters
-                project_words = 0
-                for chapter in chapters:
-                    content = chapter.get('content', '')
-                    if content and content.strip():
-                        # Simple word count
-                        project_words += len(content.split())
-                
-                total_words += project_words
-                
-                # Add to recent activity
-                project_name = project.get('name', 'Untitled Project')
-                last_modified = project.get('last_modified', project.get('created_at', ''))
-                
-                if last_modified:
-                    try:
-                        from datetime import datetime
-                        if isinstance(last_modified, str):
-                            # Parse the datetime string
-                            if 'T' in last_modified:
-                                modified_dt = datetime.fromisoformat(last_modified.replace('Z', '+00:00'))
-                            else:
-                                modified_dt = datetime.fromisoformat(last_modified)
-                        else:
-                            modified_dt = last_modified
-                        
-                        # Calculate days ago
-                        days_ago = (datetime.now() - modified_dt.replace(tzinfo=None)).days
-                        
-                        if days_ago == 0:
-                            time_ago = "Today"
-                        elif days_ago == 1:
-                            time_ago = "Yesterday"
-                        elif days_ago < 7:
-                            time_ago = f"{days_ago} days ago"
-                        elif days_ago < 30:
-                            weeks_ago = days_ago // 7
-                            time_ago = f"{weeks_ago} week{'s' if weeks_ago > 1 else ''} ago"
+        recent_projects, _ = query_projects(limit=5, with_chapters=False)
+        for project in recent_projects:
+            # Add to recent activity
+            project_name = project.get('name', 'Untitled Project')
+            last_modified = project.get('last_modified') or project.get('created_at', '')
+            
+            if last_modified:
+                try:
+                    if isinstance(last_modified, str):
+                        # Parse the datetime string
+                        if 'T' in last_modified:
+                            modified_dt = datetime.fromisoformat(last_modified.replace('Z', '+00:00'))
                         else:
-                            time_ago = f"{days_ago // 30} month{'s' if days_ago // 30 > 1 else ''} ago"
-                        
-                        activity_item = {
-                            'project_name': project_name,
-                            'time_ago': time_ago,
-                            'action': 'Updated',
-                            'project_id': project.get('id', filename.replace('.json', ''))
-                        }
-                        recent_activity.append(activity_item)
-                    except Exception as e:
-                        logging.error(f"Error parsing date for project {project_name}: {e}")
-                        
-            except Exception as e:
-                logging.error(f"Error reading project file {filename}: {e}")
-        
-        # Sort recent activity by project name for now (since we don't have exact timestamps)
-        recent_activity.sort(key=lambda x: x['project_name'])
-        recent_activity = recent_activity[:5]  # Limit to 5 most recent
+                            modified_dt = datetime.fromisoformat(last_modified)
+                    else:
+                        modified_dt = last_modified
+                    
+                    # Calculate days ago
+                    days_ago = (datetime.now() - modified_dt.replace(tzinfo=None)).days
+                    
+                    if days_ago == 0:
+                        time_ago = "Today"
+                    elif days_ago == 1:
+                        time_ago = "Yesterday"
+                    elif days_ago < 7:
+                        time_ago = f"{days_ago} days ago"
+                    elif days_ago < 30:
+                        weeks_ago = days_ago // 7
+                        time_ago = f"{weeks_ago} week{'s' if weeks_ago > 1 else ''} ago"
+                    else:
+                        time_ago = f"{days_ago // 30} month{'s' if days_ago // 30 > 1 else ''} ago"
+                    
+                    activity_item = {
+                        'project_name': project_name,
+                        'time_ago': time_ago,
+                        'action': 'Updated',
+                        'project_id': project['id']
+                    }
+                    recent_activity.append(activity_item)
+                except Exception as e:
+                    logging.error(f"Error parsing date for project {project_name}: {e}")
         
         # Calculate completion percentage
         completion_percentage = 0
         if total_projects > 0:
             completion_percentage = round((completed_projects / total_projects) * 100)
         
-        return jsonify({
+        response = {
             'total_projects': total_projects,
             'completed_projects': completed_projects,
             'total_chapters': total_chapters,
             'total_words': total_words,
             'completion_percentage': completion_percentage,
             'recent_activity': recent_activity
-        })
+        }
+        if 'drift' in stats:
+            response['drift'] = stats['drift']
+        return jsonify(response)
         
     except Exception as e:
         logging.error(f"Error getting writing progress: {e}")
@@ -726,9 +885,7 @@ def create_manual_book():
                 chapter['status'] = 'pending'
         
         # Save project
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         # Start AI content generation in background if requested
         if content_method == 'ai':
@@ -943,12 +1100,43 @@ def create_project():
     }
     
     # Save project
-    project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-    with open(project_file, 'w') as f:
-        json.dump(project, f, indent=2)
+    save_project(project_id, project)
     
     return redirect(url_for('project_view', project_id=project_id))
 
+def _generate_short(prompt, config, max_tokens):
+    """(success, text) of a single short completion without fallback models,
+    served from the response cache when the same prompt was answered before"""
+    if config['ai_provider'] == 'gemini' and config.get('gemini_api_key'):
+        api_key = config['gemini_api_key']
+        model = config.get('gemini_model', 'gemini-2.5-flash')
+        
+        def generate():
+            response = get_gemini_client(api_key).models.generate_content(model=model, contents=prompt)
+            return bool(response.text), response.text.strip() if response.text else ''
+        
+        return cached_generate('gemini', model, prompt, None, generate, api_key=api_key)
+    
+    elif config.get('openrouter_api_key'):
+        api_key = config['openrouter_api_key']
+        model = config.get('selected_model', 'anthropic/claude-3.5-sonnet:beta')
+        
+        def generate():
+            response = openrouter_post(
+                api_key,
+                {
+                    "model": model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_tokens": max_tokens
+                },
+                timeout=60
+            )
+            return True, response.json()['choices'][0]['message']['content'].strip()
+        
+        return cached_generate('openrouter', model, prompt, None, generate, api_key=api_key)
+    
+    return False, ''
+
 def enhance_book_title(title, topic, language="English"):
     """Enhance book title using AI"""
     try:
@@ -970,28 +1158,8 @@ Guidelines:
 
 Enhanced title:"""
 
-        if config['ai_provider'] == 'gemini' and config.get('gemini_api_key'):
-            import google.genai as genai
-            client = genai.Client(api_key=config['gemini_api_key'])
-            response = client.models.generate_content(
-                model=config.get('gemini_model', 'gemini-2.5-flash'),
-                contents=prompt
-            )
-            return response.text.strip() if response.text else title
-        
-        elif config.get('openrouter_api_key'):
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={"Authorization": f"Bearer {config['openrouter_api_key']}"},
-                json={
-                    "model": config.get('selected_model', 'anthropic/claude-3.5-sonnet:beta'),
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 200
-                }
-            )
-            return response.json()['choices'][0]['message']['content'].strip()
-        
-        return title
+        success, enhanced_title = _generate_short(prompt, config, max_tokens=200)
+        return enhanced_title if success else title
         
     except Exception as e:
         logging.error(f"Error enhancing title: {e}")
@@ -1019,28 +1187,8 @@ Create a description that includes:
 
 Write in {language}. Return ONLY the book description:"""
 
-        if config['ai_provider'] == 'gemini' and config.get('gemini_api_key'):
-            import google.genai as genai
-            client = genai.Client(api_key=config['gemini_api_key'])
-            response = client.models.generate_content(
-                model=config.get('gemini_model', 'gemini-2.5-flash'),
-                contents=prompt
-            )
-            return response.text.strip() if response.text else "Professional book covering essential topics and insights."
-        
-        elif config.get('openrouter_api_key'):
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={"Authorization": f"Bearer {config['openrouter_api_key']}"},
-                json={
-                    "model": config.get('selected_model', 'anthropic/claude-3.5-sonnet:beta'),
-                    "messages": [{"role": "user", "content": prompt}],
-                    "max_tokens": 500
-                }
-            )
-            return response.json()['choices'][0]['message']['content'].strip()
-        
-        return "Professional book covering essential topics and insights."
+        success, description = _generate_short(prompt, config, max_tokens=500)
+        return description if success else "Professional book covering essential topics and insights."
         
     except Exception as e:
         logging.error(f"Error generating description: {e}")
@@ -1108,9 +1256,7 @@ def create_ai_book():
     }
     
     # Save project
-    project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-    with open(project_file, 'w') as f:
-        json.dump(project, f, indent=2)
+    save_project(project_id, project)
     
     # Start generation based on action
     if action in ['generate_titles', 'generate_full']:
@@ -1126,9 +1272,7 @@ def project_view(project_id):
         return redirect(url_for('index'))
     
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         return render_template('project.html', project=project, config=config)
     except FileNotFoundError:
         flash('Project not found', 'error')
@@ -1142,39 +1286,70 @@ def pdf_editor(project_id):
         flash('Please activate your license first', 'error')
         return redirect(url_for('index'))
     
-    project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
+    project_file = get_project_file(project_id)
     if not os.path.exists(project_file):
         flash('Project not found', 'error')
         return redirect(url_for('index'))
     
-    with open(project_file, 'r') as f:
-        project = json.load(f)
+    project = load_project(project_id)
     
     return render_template('pdf_editor.html', project=project, config=config)
 
+def export_render_key(project, template, **options):
+    """Render-cache key for a PDF of project made with template. Computed
+    before the chapters are cleaned, from the project as loaded."""
+    cover_image = project.get('cover_image')
+    if cover_image:
+        cover_path = os.path.join(UPLOAD_FOLDER, cover_image)
+        if os.path.exists(cover_path):
+            options['cover_mtime'] = os.stat(cover_path).st_mtime_ns
+    return render_key(project, os.path.join(app.root_path, app.template_folder, template), **options)
+
+# Professional PDF settings for KDP print
+KDP_PDF_OPTIONS = {
+    'pdf_version': '1.4',  # Compatible with most printers
+    'pdf_identifier': False,  # No metadata for cleaner output
+    'uncompressed_pdf': False,  # Compressed for smaller file size
+    # Optimize for print quality
+    'optimize_size': ('fonts', 'images')
+}
+
+def export_book_pdf(project, template, cache_key, base_url=None, **pdf_options):
+    """PDF of project, from the render cache or laid out in the export
+    process pool (the calling thread only waits)"""
+    def render():
+        if template == 'kdp_book_export.html':
+            # Use advanced content cleaning for KDP format
+            clean = enhance_content_for_kdp
+        else:
+            clean = clean_chapter_content
+        for chapter in project.get('chapters', []):
+            chapter['cleaned_paragraphs'] = clean(chapter.get('content', ''))
+        return run_export(project.get('id'), render_book, template, project,
+                          base_url=base_url, **pdf_options)
+    
+    return cached_pdf(cache_key, render)
+
 @app.route('/pdf_preview/<project_id>')
 def pdf_preview(project_id):
-    """Generate PDF preview for editor"""
-    project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
+    """Generate PDF preview for editor (cached until the book or template changes)"""
+    project_file = get_project_file(project_id)
     if not os.path.exists(project_file):
         return "Project not found", 404
     
-    with open(project_file, 'r') as f:
-        project = json.load(f)
-    
-    # Clean chapter content for better formatting
-    if project.get('chapters'):
-        for chapter in project['chapters']:
-            chapter['cleaned_paragraphs'] = clean_chapter_content(chapter.get('content', ''))
-    
-    # Generate HTML for PDF
-    html_content = render_template('book_export.html', project=project)
+    project = load_project(project_id)
+    cache_key = export_render_key(project, 'book_export.html', export='preview')
     
-    # Generate PDF
-    pdf = weasyprint.HTML(string=html_content).write_pdf()
+    # The editor iframe reloads often; an unchanged book costs nothing
+    if request.if_none_match.contains(cache_key):
+        return app.response_class(status=304)
     
     from flask import Response
-    return Response(pdf, mimetype='application/pdf')
+    response = Response(export_book_pdf(project, 'book_export.html', cache_key),
+                        mimetype='application/pdf')
+    response.set_etag(cache_key)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/pdf_edit/<project_id>', methods=['POST'])
 def api_pdf_edit(project_id):
@@ -1183,12 +1358,11 @@ def api_pdf_edit(project_id):
         data = request.get_json()
         edit_type = data.get('type')
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
+        project_file = get_project_file(project_id)
         if not os.path.exists(project_file):
             return jsonify({'success': False, 'message': 'Project not found'})
         
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         # Handle different edit types
         if edit_type == 'title':
@@ -1218,8 +1392,7 @@ def api_pdf_edit(project_id):
         project['last_modified'] = datetime.now().isoformat()
         
         # Save project
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'message': 'Changes saved successfully'})
         
@@ -1231,14 +1404,10 @@ def api_pdf_edit(project_id):
 def api_get_chapter(chapter_id):
     """Get chapter details for editing"""
     try:
-        # Find project containing this chapter
-        for filename in os.listdir(PROJECTS_FOLDER):
-            if filename.endswith('.json'):
-                with open(os.path.join(PROJECTS_FOLDER, filename), 'r') as f:
-                    project = json.load(f)
-                    for chapter in project.get('chapters', []):
-                        if chapter.get('id') == chapter_id:
-                            return jsonify(chapter)
+        # Find project containing this chapter via the chapter index
+        project_id, project, chapter = find_chapter(chapter_id)
+        if chapter:
+            return jsonify(chapter)
         
         return jsonify({'error': 'Chapter not found'}), 404
         
@@ -1247,15 +1416,15 @@ def api_get_chapter(chapter_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/chapters/<project_id>')
+@conditional_on_project
 def api_get_chapters(project_id):
     """Get all chapters for a project"""
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
+        project_file = get_project_file(project_id)
         if not os.path.exists(project_file):
             return jsonify({'error': 'Project not found'}), 404
         
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         return jsonify(project.get('chapters', []))
         
@@ -1272,9 +1441,7 @@ def upload_project_cover(project_id):
         return redirect(url_for('index'))
     
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         if 'cover_image' not in request.files:
             flash('No file selected', 'error')
@@ -1317,8 +1484,7 @@ def upload_project_cover(project_id):
             project['cover_image'] = filename
             project['last_modified'] = datetime.now().isoformat()
             
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
+            save_project(project_id, project)
             
             flash('Cover image updated successfully!', 'success')
         else:
@@ -1339,12 +1505,11 @@ def delete_project(project_id):
         return redirect(url_for('index'))
     
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
+        project_file = get_project_file(project_id)
         
         # Load project to get cover image path
         if os.path.exists(project_file):
-            with open(project_file, 'r') as f:
-                project = json.load(f)
+            project = load_project(project_id)
             
             # Remove cover image if it exists
             if project.get('cover_image'):
@@ -1352,8 +1517,8 @@ def delete_project(project_id):
                 if os.path.exists(cover_path):
                     os.remove(cover_path)
             
-            # Remove project file
-            os.remove(project_file)
+            # Remove project file and its index rows
+            remove_project(project_id)
             
             flash('Project deleted successfully!', 'success')
         else:
@@ -1373,9 +1538,7 @@ def book_preview(project_id):
         return redirect(url_for('index'))
     
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         return render_template('book_preview.html', project=project, config=config)
     except FileNotFoundError:
         flash('Project not found', 'error')
@@ -1389,9 +1552,7 @@ def update_project_content(project_id):
         return jsonify({'success': False, 'message': 'License not activated'})
     
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         data = request.get_json()
         
@@ -1419,8 +1580,7 @@ def update_project_content(project_id):
         
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'message': 'Project updated successfully'})
         
@@ -1440,9 +1600,7 @@ def update_chapter_content():
         chapter_id = data.get('chapter_id')
         content = data.get('content')
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         # Find and update the chapter
         for chapter in project.get('chapters', []):
@@ -1452,8 +1610,7 @@ def update_chapter_content():
         
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'message': 'Chapter updated successfully'})
         
@@ -1478,15 +1635,14 @@ def generate_chapters(project_id):
             return redirect(url_for('project_view', project_id=project_id))
     
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        load_project(project_id)  # 404s through the except below if missing
+        
+        if list_jobs(project_id=project_id, active_only=True):
+            flash('Generation is already running for this project', 'info')
+            return redirect(url_for('project_view', project_id=project_id))
         
-        # Start background generation
-        thread = threading.Thread(target=generate_chapters_background, 
-                                args=(project_id, project, config))
-        thread.daemon = True
-        thread.start()
+        # Queue background generation
+        enqueue_job('generate_chapters', project_id=project_id)
         
         flash('Chapter generation started! Please wait...', 'info')
         return redirect(url_for('project_view', project_id=project_id))
@@ -1495,103 +1651,105 @@ def generate_chapters(project_id):
         flash(f'Error starting generation: {str(e)}', 'error')
         return redirect(url_for('project_view', project_id=project_id))
 
+def plan_chapters(project_id, project, config):
+    """Enhance the book description and create the chapter list.
+    Returns False (with an error status saved) when titles could not be generated."""
+    project['generation_status'] = 'generating_titles'
+    save_project(project_id, project)
+    
+    # Enhanced description step before generating titles
+    project['generation_status'] = 'enhancing_description'
+    save_project(project_id, project)
+    
+    # First enhance the topic description for better context
+    description_prompt = f"""Analyze and enhance this book topic: "{project['topic']}" in {project['language']}.
+    
+    Create a comprehensive book description that includes:
+    1. Main theme and purpose
+    2. Target audience 
+    3. Key concepts to be covered
+    4. Writing style and tone
+    5. Learning outcomes or takeaways
+    
+    Return a detailed, professional description that will guide chapter creation."""
+    
+    success, enhanced_description = generate_content(description_prompt, config)
+    
+    if success:
+        project['enhanced_description'] = enhanced_description.strip()
+    else:
+        project['enhanced_description'] = project['topic']  # Fallback to original topic
+    
+    save_project(project_id, project)
+    
+    # Update status for title generation
+    project['generation_status'] = 'generating_titles'
+    save_project(project_id, project)
+    
+    # Generate chapter titles using enhanced description
+    titles_prompt = f"""Based on this enhanced book description: "{project.get('enhanced_description', project['topic'])}"
+    
+    Generate {project['num_chapters']} compelling, specific chapter titles in {project['language']} that:
+    1. Follow a logical progression
+    2. Cover all key aspects mentioned in the description
+    3. Are engaging and professional
+    4. Build upon each other naturally
+    5. Appeal to the target audience
+    
+    Return only the titles, one per line, numbered from 1 to {project['num_chapters']}."""
+    
+    success, titles_result = generate_content(titles_prompt, config)
+    
+    if not success:
+        project['generation_status'] = f'error: {titles_result}'
+        save_project(project_id, project)
+        return False
+    
+    # Parse chapter titles
+    titles = []
+    for line in titles_result.strip().split('\n'):
+        line = line.strip()
+        if line and ('.' in line or ':' in line):
+            # Remove numbering
+            title = line.split('.', 1)[-1].split(':', 1)[-1].strip()
+            if title:
+                titles.append(title)
+    
+    if len(titles) < project['num_chapters']:
+        # Fill missing titles
+        for i in range(len(titles), project['num_chapters']):
+            titles.append(f"Chapter {i+1}")
+    
+    # Initialize chapters
+    project['chapters'] = []
+    for i, title in enumerate(titles[:project['num_chapters']]):
+        project['chapters'].append({
+            'id': str(uuid.uuid4()),
+            'number': i + 1,
+            'title': title,
+            'content': '',
+            'status': 'pending'
+        })
+    
+    project['generation_status'] = 'generating_content'
+    save_project(project_id, project)
+    return True
+
 def generate_chapters_background(project_id, project, config):
-    """Background task to generate chapters"""
-    project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
+    """Background task to generate chapters.
+    
+    A project that was interrupted while writing chapter content (e.g. by a
+    restart) keeps its chapter titles and only writes unfinished chapters.
+    """
+    job = current_job()
     try:
-        # Update status
-        project['generation_status'] = 'generating_titles'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
-        
-        # Enhanced description step before generating titles
-        project['generation_status'] = 'enhancing_description'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
-        
-        # First enhance the topic description for better context
-        description_prompt = f"""Analyze and enhance this book topic: "{project['topic']}" in {project['language']}.
-        
-        Create a comprehensive book description that includes:
-        1. Main theme and purpose
-        2. Target audience 
-        3. Key concepts to be covered
-        4. Writing style and tone
-        5. Learning outcomes or takeaways
-        
-        Return a detailed, professional description that will guide chapter creation."""
-        
-        success, enhanced_description = generate_content(description_prompt, config)
-        
-        if success:
-            project['enhanced_description'] = enhanced_description.strip()
-        else:
-            project['enhanced_description'] = project['topic']  # Fallback to original topic
-        
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
-        
-        # Update status for title generation
-        project['generation_status'] = 'generating_titles'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
-        
-        # Generate chapter titles using enhanced description
-        titles_prompt = f"""Based on this enhanced book description: "{project.get('enhanced_description', project['topic'])}"
-        
-        Generate {project['num_chapters']} compelling, specific chapter titles in {project['language']} that:
-        1. Follow a logical progression
-        2. Cover all key aspects mentioned in the description
-        3. Are engaging and professional
-        4. Build upon each other naturally
-        5. Appeal to the target audience
-        
-        Return only the titles, one per line, numbered from 1 to {project['num_chapters']}."""
-        
-        success, titles_result = generate_content(titles_prompt, config)
-        
-        if not success:
-            project['generation_status'] = f'error: {titles_result}'
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
+        if project.get('generation_status') == 'generating_content' and project.get('chapters'):
+            logging.info(f"Resuming chapter generation for project {project_id}")
+        elif not plan_chapters(project_id, project, config):
             return
         
-        # Parse chapter titles
-        titles = []
-        for line in titles_result.strip().split('\n'):
-            line = line.strip()
-            if line and ('.' in line or ':' in line):
-                # Remove numbering
-                title = line.split('.', 1)[-1].split(':', 1)[-1].strip()
-                if title:
-                    titles.append(title)
-        
-        if len(titles) < project['num_chapters']:
-            # Fill missing titles
-            for i in range(len(titles), project['num_chapters']):
-                titles.append(f"Chapter {i+1}")
-        
-        # Initialize chapters
-        project['chapters'] = []
-        for i, title in enumerate(titles[:project['num_chapters']]):
-            project['chapters'].append({
-                'id': str(uuid.uuid4()),
-                'number': i + 1,
-                'title': title,
-                'content': '',
-                'status': 'pending'
-            })
-        
-        project['generation_status'] = 'generating_content'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
-        
-        # Generate content for each chapter
-        for i, chapter in enumerate(project['chapters']):
-            chapter['status'] = 'generating'
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
-            
+        # Generate content for all unfinished chapters concurrently
+        def write_chapter(chapter, on_token):
             content_prompt = f"""Write comprehensive, professional content for Chapter {chapter['number']}: "{chapter['title']}" 
             
             Book Context: {project.get('enhanced_description', project['topic'])}
@@ -1608,112 +1766,300 @@ def generate_chapters_background(project_id, project, config):
             
             Create content that flows naturally like a professionally published book."""
             
-            success, content_result = generate_content(content_prompt, config)
+            success, content_result = generate_content(content_prompt, config, on_token=on_token)
             
-            if success:
-                # Clean markdown formatting from generated content
-                import re
-                clean_content = content_result.strip()
-                # Remove markdown headers
-                clean_content = re.sub(r'^#{1,6}\s+', '', clean_content, flags=re.MULTILINE)
-                # Remove bold/italic markers
-                clean_content = re.sub(r'\*{1,2}([^*]+)\*{1,2}', r'\1', clean_content)
-                clean_content = re.sub(r'_{1,2}([^_]+)_{1,2}', r'\1', clean_content)
-                # Remove bullet point markers
-                clean_content = re.sub(r'^\*\s+', '', clean_content, flags=re.MULTILINE)
-                clean_content = re.sub(r'^\-\s+', '', clean_content, flags=re.MULTILINE)
-                
-                chapter['content'] = clean_content
-                chapter['status'] = 'completed'
-            else:
-                chapter['content'] = f"Error generating content: {content_result}"
-                chapter['status'] = 'error'
+            if not success:
+                return False, content_result
+            
+            # Clean markdown formatting from generated content
+            import re
+            clean_content = content_result.strip()
+            # Remove markdown headers
+            clean_content = re.sub(r'^#{1,6}\s+', '', clean_content, flags=re.MULTILINE)
+            # Remove bold/italic markers
+            clean_content = re.sub(r'\*{1,2}([^*]+)\*{1,2}', r'\1', clean_content)
+            clean_content = re.sub(r'_{1,2}([^_]+)_{1,2}', r'\1', clean_content)
+            # Remove bullet point markers
+            clean_content = re.sub(r'^\*\s+', '', clean_content, flags=re.MULTILINE)
+            clean_content = re.sub(r'^\-\s+', '', clean_content, flags=re.MULTILINE)
             
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
+            return True, clean_content
+        
+        unfinished = [c for c in project['chapters'] if c.get('status') != 'completed']
+        generate_chapters_parallel(project_id, project, config, unfinished, write_chapter)
         
         # Mark as completed
-        project['generation_status'] = 'completed'
+        project['generation_status'] = 'cancelled' if job and job.cancelled() else 'completed'
         project['last_modified'] = datetime.now().isoformat()
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
             
     except Exception as e:
         project['generation_status'] = f'error: {str(e)}'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
+    finally:
+        generation_events.publish(project_id, 'done', {'status': project.get('generation_status')})
 
 @app.route('/api/projects')
 def api_projects():
-    """Get all projects with enhanced metadata for homepage"""
+    """Get projects with enhanced metadata for homepage and library.
+    
+    Optional query parameters:
+    - fields: comma-separated fields to return (id is always included)
+    - sort: last_modified (default), created_at, name, title, status, word_count, chapter_count
+    - order: desc (default) or asc
+    - limit / cursor: page size, and the next_cursor of the previous page
+    """
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    sort = request.args.get('sort', 'last_modified')
+    descending = request.args.get('order', 'desc') != 'asc'
+    try:
+        limit = max(0, int(request.args.get('limit', 0)))
+    except ValueError:
+        return jsonify({'error': 'limit must be a number'}), 400
+    
+    try:
+        page, next_cursor = query_projects(sort=sort, descending=descending, limit=limit,
+                                           cursor=request.args.get('cursor'),
+                                           with_chapters=not fields or 'chapters' in fields)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         projects = []
-        if os.path.exists(PROJECTS_FOLDER):
-            for filename in os.listdir(PROJECTS_FOLDER):
-                if filename.endswith('.json'):
-                    project_file = os.path.join(PROJECTS_FOLDER, filename)
-                    try:
-                        with open(project_file, 'r') as f:
-                            project = json.load(f)
-                        
-                        # Enhanced metadata
-                        project['filename'] = filename
-                        project['id'] = filename[:-5]  # Remove .json extension
-                        
-                        # Add file timestamps if missing
-                        if 'created_date' not in project:
-                            project['created_date'] = datetime.fromtimestamp(os.path.getctime(project_file)).isoformat()
-                        
-                        if 'last_modified' not in project:
-                            project['last_modified'] = datetime.fromtimestamp(os.path.getmtime(project_file)).isoformat()
-                        
-                        # Calculate completion status
-                        if project.get('generation_status') == 'completed':
-                            project['status'] = 'completed'
-                        elif project.get('chapters') and len(project.get('chapters', [])) > 0:
-                            completed_chapters = len([c for c in project.get('chapters', []) if c.get('content', '').strip()])
-                            total_chapters = len(project.get('chapters', []))
-                            project['completion_percentage'] = (completed_chapters / total_chapters * 100) if total_chapters > 0 else 0
-                            project['status'] = 'completed' if completed_chapters == total_chapters else 'in_progress'
-                        else:
-                            project['status'] = 'draft'
-                        
-                        projects.append(project)
-                    except Exception as e:
-                        logging.warning(f"Error reading project file {filename}: {e}")
-                        continue
-        
-        # Sort by last modified date (newest first)
-        projects.sort(key=lambda x: x.get('last_modified', ''), reverse=True)
-        
-        return jsonify({'projects': projects})
+        for project in page:
+            # Completion status from the stored chapter counters
+            if project.get('generation_status') == 'completed':
+                project['status'] = 'completed'
+            elif project['chapter_count'] > 0:
+                completed_chapters = project['written_chapters']
+                total_chapters = project['chapter_count']
+                project['completion_percentage'] = completed_chapters / total_chapters * 100
+                project['status'] = 'completed' if completed_chapters == total_chapters else 'in_progress'
+            else:
+                project['status'] = 'draft'
+            
+            if fields:
+                project = {key: project[key] for key in ['id'] + fields if key in project}
+            projects.append(project)
+        
+        response = {'projects': projects}
+        if limit:
+            response['next_cursor'] = next_cursor
+            response['total'] = count_projects()
+        return jsonify(response)
     except Exception as e:
         logging.error(f"Error fetching projects: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/project_status/<project_id>')
+@conditional_on_project
 def project_status(project_id):
-    """Get project generation status via AJAX"""
+    """Get project generation status via AJAX.
+    
+    With ?since=<revision> (the 'revision' of an earlier response) only the
+    chapters changed after that revision are returned, plus 'chapter_ids'
+    listing every chapter in order so removals can be detected.
+    """
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        since = request.args.get('since')
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return jsonify({'status': 'error', 'message': 'since must be a revision number'}), 400
         
-        completed_chapters = len([c for c in project.get('chapters', []) if c.get('status') == 'completed'])
-        total_chapters = len(project.get('chapters', []))
+        project = load_project(project_id)
+        chapters = project.get('chapters', [])
         
-        return jsonify({
-            'status': project.get('generation_status', 'pending'),
-            'chapters': project.get('chapters', []),
-            'progress': (completed_chapters / max(total_chapters, 1) * 100) if total_chapters > 0 else 0,
-            'completed_chapters': completed_chapters,
-            'total_chapters': total_chapters
-        })
+        status = generation_status_summary(project)
+        status['revision'] = project.get('version', 0)
+        if since is None or since > status['revision']:
+            status['chapters'] = chapters
+        else:
+            status['chapters'] = [c for c in chapters if c.get('rev', 0) > since]
+            status['chapter_ids'] = [c.get('id') for c in chapters]
+        return jsonify(status)
     except FileNotFoundError:
         return jsonify({'status': 'error', 'message': 'Project not found'}), 404
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def generation_status_summary(project):
+    """Status fields shared by the polling and streaming endpoints"""
+    chapters = project.get('chapters', [])
+    completed_chapters = len([c for c in chapters if c.get('status') == 'completed'])
+    total_chapters = len(chapters)
+    status = project.get('generation_status', 'pending')
+    if status == 'importing':
+        progress = project.get('import_progress', 0)
+    else:
+        progress = (completed_chapters / total_chapters * 100) if total_chapters > 0 else 0
+    return {
+        'status': status,
+        'progress': progress,
+        'completed_chapters': completed_chapters,
+        'total_chapters': total_chapters
+    }
+
+def generation_finished(status):
+    return status == 'completed' or str(status).startswith('error')
+
+def _chapter_statuses(project):
+    return [{'id': c.get('id'), 'status': c.get('status')} for c in project.get('chapters', [])]
+
+def channel_updates(project_id, sent, library_changed=False):
+    """Events for whatever changed since the state recorded in `sent` (the
+    values last sent to this tab, updated in place). Checks are cheap: a
+    stat() of the project file and config, and the one-row library totals,
+    so they also notice changes made by other worker processes.
+    
+    Yields 'snapshot' then 'status' (plus 'done' when generation finishes)
+    for the project, 'library' and 'ai_status'."""
+    if project_id:
+        revision = project_revision(project_id)
+        if revision != sent.get('revision', ''):
+            first = 'revision' not in sent
+            sent['revision'] = revision
+            if revision is None:
+                yield 'status', {'status': 'deleted'}
+            else:
+                project = load_project(project_id)
+                status = generation_status_summary(project)
+                status['chapters'] = _chapter_statuses(project)
+                if first:
+                    status['partial'] = generation_events.partial_texts(project_id)
+                yield ('snapshot' if first else 'status'), status
+                # 'done' marks the moment generation finishes, not every finished project
+                was_finished = first or generation_finished(sent.get('status'))
+                sent['status'] = status['status']
+                if generation_finished(status['status']) and not was_finished:
+                    yield 'done', {'status': status['status']}
+    
+    totals = library_stats()
+    if library_changed or totals != sent.get('library'):
+        sent['library'] = totals
+        yield 'library', totals
+    
+    try:
+        config = read_config()  # the per-request snapshot would go stale on a long stream
+    except FileNotFoundError:
+        config = load_config()
+    ai_status = ai_status_summary(config)
+    if ai_status != sent.get('ai_status'):
+        sent['ai_status'] = ai_status
+        yield 'ai_status', ai_status
+
+def _channel_subscription(project_id):
+    channels = [generation_events.GLOBAL_CHANNEL]
+    if project_id:
+        channels.append(project_id)
+    return generation_events.subscribe(*channels)
+
+def _channel_project(project_id):
+    """Validate ?project_id= for the event channel endpoints"""
+    if project_id and project_revision(project_id) is None:
+        return None, (jsonify({'status': 'error', 'message': 'Project not found'}), 404)
+    return project_id, None
+
+@app.route('/api/events')
+def event_stream():
+    """One Server-Sent Events stream per browser tab, closed after
+    STREAM_MAX_AGE seconds (the browser then reconnects).
+    
+    Every tab receives 'library' (library totals changed) and 'ai_status'.
+    With ?project_id= it also receives that project's generation
+    events: 'snapshot' (status plus text streamed so far), 'token' (a chunk
+    of chapter text), 'reset' (a chapter's streamed text was discarded
+    before a retry), 'chapter' (a chapter changed status), 'status' and
+    'done' when generation finishes. Browsers without EventSource use
+    /api/events/poll instead.
+    """
+    from flask import Response, stream_with_context
+    
+    project_id, error = _channel_project(request.args.get('project_id'))
+    if error:
+        return error
+    
+    events = _channel_subscription(project_id)
+    
+    def stream():
+        sent = {}
+        # Ended after STREAM_MAX_AGE so a tab never holds a server thread for
+        # good; the browser reconnects and picks up from a fresh snapshot
+        deadline = time.monotonic() + generation_events.STREAM_MAX_AGE
+        try:
+            for event, data in channel_updates(project_id, sent):
+                yield generation_events.format_sse(event, data)
+            
+            while generation_events.is_subscribed(events):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event, data = events.get(timeout=min(remaining, generation_events.STREAM_KEEPALIVE))
+                except queue.Empty:
+                    event, data = None, None
+                
+                if event in ('token', 'reset', 'chapter'):
+                    yield generation_events.format_sse(event, data)
+                    if event in ('token', 'reset'):
+                        continue
+                
+                # Status from disk also covers work running in another worker process
+                updates = list(channel_updates(project_id, sent, library_changed=event == 'library'))
+                if event == 'done' and not any(update == 'done' for update, _ in updates):
+                    # e.g. a cancelled run, which the status alone does not mark as finished
+                    updates.append((event, data))
+                for update, update_data in updates:
+                    yield generation_events.format_sse(update, update_data)
+                if not updates and event is None:
+                    yield ': keepalive\n\n'
+        finally:
+            generation_events.unsubscribe(events)
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/events/poll')
+def event_poll():
+    """Long-poll fallback for /api/events.
+    
+    Returns {'events': [[name, data], ...], 'cursor': ...} as soon as the
+    project, library or AI status differs from the state named by ?cursor=
+    (at once without a cursor), or an empty list after LONG_POLL_TIMEOUT.
+    Chapter text tokens and resets are not delivered; 'status' carries
+    chapter states.
+    """
+    project_id, error = _channel_project(request.args.get('project_id'))
+    if error:
+        return error
+    
+    try:
+        sent = json.loads(base64.urlsafe_b64decode(request.args['cursor'].encode()))
+    except (KeyError, ValueError, TypeError):
+        sent = {}
+    
+    events = _channel_subscription(project_id)
+    try:
+        updates = list(channel_updates(project_id, sent))
+        deadline = time.monotonic() + generation_events.LONG_POLL_TIMEOUT
+        while not updates and generation_events.is_subscribed(events):
+            remaining = min(deadline - time.monotonic(), generation_events.STREAM_KEEPALIVE)
+            if remaining <= 0:
+                break
+            try:
+                event, _ = events.get(timeout=remaining)
+            except queue.Empty:
+                event = None
+            if event in ('token', 'reset'):
+                continue
+            updates = list(channel_updates(project_id, sent, library_changed=event == 'library'))
+    finally:
+        generation_events.unsubscribe(events)
+    
+    cursor = base64.urlsafe_b64encode(json.dumps(sent).encode()).decode()
+    return jsonify({'events': [[event, data] for event, data in updates], 'cursor': cursor})
+
 @app.route('/regenerate_chapter/<project_id>/<chapter_id>')
 def regenerate_chapter(project_id, chapter_id):
     """Regenerate a specific chapter"""
@@ -1731,9 +2077,7 @@ def regenerate_chapter(project_id, chapter_id):
             return jsonify({'error': 'Please configure your OpenRouter API key in settings'}), 400
     
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         # Find the chapter
         chapter = None
@@ -1745,24 +2089,21 @@ def regenerate_chapter(project_id, chapter_id):
         if not chapter:
             return jsonify({'error': 'Chapter not found'}), 404
         
-        # Start background regeneration
-        thread = threading.Thread(target=regenerate_single_chapter, 
-                                args=(project_id, chapter_id, project, config))
-        thread.daemon = True
-        thread.start()
+        # Queue background regeneration
+        job_id = enqueue_job('regenerate_chapter', project_id=project_id, chapter_id=chapter_id)
         
-        return jsonify({'success': True, 'message': f'Chapter "{chapter["title"]}" regeneration started!'})
+        return jsonify({'success': True, 'job_id': job_id,
+                        'message': f'Chapter "{chapter["title"]}" regeneration started!'})
         
     except Exception as e:
         return jsonify({'error': f'Error starting regeneration: {str(e)}'}), 500
 
 @app.route('/api/chapter_status/<project_id>/<chapter_id>')
+@conditional_on_project
 def chapter_status(project_id, chapter_id):
     """Get status of a specific chapter"""
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         # Find the chapter
         chapter = None
@@ -1787,22 +2128,21 @@ def chapter_status(project_id, chapter_id):
 
 def regenerate_single_chapter(project_id, chapter_id, project, config):
     """Background task to regenerate a single chapter"""
-    project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
     
     try:
         # Find and update the chapter
         for chapter in project['chapters']:
             if chapter['id'] == chapter_id:
                 chapter['status'] = 'generating'
-                with open(project_file, 'w') as f:
-                    json.dump(project, f, indent=2)
+                save_project(project_id, project)
+                generation_events.publish(project_id, 'chapter', {'id': chapter_id, 'status': 'generating'})
                 
                 content_prompt = f"""Write comprehensive content for Chapter {chapter['number']}: "{chapter['title']}" 
                 for a book about "{project['topic']}" in {project['language']}. 
                 The content should be detailed, engaging, and approximately 1000-1500 words. 
                 Use proper formatting with paragraphs and sections where appropriate."""
                 
-                success, content_result = generate_content(content_prompt, config)
+                success, content_result = generate_content(content_prompt, config, use_cache=False)
                 
                 if success:
                     chapter['content'] = content_result.strip()
@@ -1812,8 +2152,8 @@ def regenerate_single_chapter(project_id, chapter_id, project, config):
                     chapter['status'] = 'error'
                 
                 project['last_modified'] = datetime.now().isoformat()
-                with open(project_file, 'w') as f:
-                    json.dump(project, f, indent=2)
+                save_project(project_id, project)
+                generation_events.publish(project_id, 'chapter', {'id': chapter_id, 'status': chapter['status']})
                 break
                 
     except Exception as e:
@@ -1822,16 +2162,14 @@ def regenerate_single_chapter(project_id, chapter_id, project, config):
             if chapter['id'] == chapter_id:
                 chapter['status'] = 'error'
                 chapter['content'] = f"Error: {str(e)}"
-                with open(project_file, 'w') as f:
-                    json.dump(project, f, indent=2)
+                save_project(project_id, project)
+                generation_events.publish(project_id, 'chapter', {'id': chapter_id, 'status': 'error'})
                 break
 
 @app.route('/edit_chapter/<project_id>/<chapter_id>', methods=['POST'])
 def edit_chapter(project_id, chapter_id):
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         new_title = request.form.get('title', '').strip()
         new_content = request.form.get('content', '').strip()
@@ -1844,8 +2182,7 @@ def edit_chapter(project_id, chapter_id):
                 break
         
         project['last_modified'] = datetime.now().isoformat()
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         flash('Chapter updated successfully!', 'success')
         return redirect(url_for('project_view', project_id=project_id))
@@ -1854,190 +2191,27 @@ def edit_chapter(project_id, chapter_id):
         flash(f'Error updating chapter: {str(e)}', 'error')
         return redirect(url_for('project_view', project_id=project_id))
 
-def clean_chapter_content(content):
-    """Clean and format chapter content for export"""
-    if not content:
-        return []
-    
-    lines = content.split('\n')
-    cleaned_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        # Skip empty lines, markdown headers, and duplicate titles
-        if (line and 
-            not line.startswith('#') and 
-            not line.startswith('Chapter') and 
-            not line.startswith('CHAPTER') and 
-            not line.startswith('hapitre') and
-            not (len(line) > 10 and line.isupper())):  # Skip all-caps lines
-            
-            # Clean markdown formatting
-            line = line.replace('**', '').replace('*', '').replace('_', '').replace('##', '').replace('###', '')
-            line = line.strip()
-            if line and len(line) > 10:  # Only keep substantial content
-                cleaned_lines.append(line)
-    
-    # Join all text and create proper paragraphs
-    full_text = ' '.join(cleaned_lines)
-    
-    # Split into sentences roughly
-    sentences = []
-    current_sentence = ""
-    
-    for char in full_text:
-        current_sentence += char
-        if char in '.!?' and len(current_sentence.strip()) > 15:
-            sentences.append(current_sentence.strip())
-            current_sentence = ""
-    
-    if current_sentence.strip():
-        sentences.append(current_sentence.strip())
-    
-    # Group sentences into paragraphs (3-4 sentences per paragraph)
-    paragraphs = []
-    current_paragraph = []
-    
-    for sentence in sentences:
-        if sentence and len(sentence) > 10:
-            current_paragraph.append(sentence)
-            if len(current_paragraph) >= 3:
-                paragraphs.append(' '.join(current_paragraph))
-                current_paragraph = []
-    
-    if current_paragraph:
-        paragraphs.append(' '.join(current_paragraph))
-    
-    return paragraphs
-
-def enhance_content_for_kdp(content):
-    """
-    Advanced content processing for Amazon KDP print-ready formatting
-    
-    Features:
-    - Intelligent paragraph detection and formatting
-    - Professional sentence structure optimization  
-    - Removal of poor formatting and excessive whitespace
-    - Chapter title and markdown cleanup
-    - Optimal paragraph length for print readability
-    """
-    if not content:
-        return []
-    
-    import re
-    
-    # Step 1: Advanced markdown and formatting cleanup
-    clean_text = content
-    
-    # Remove all markdown formatting markers
-    clean_text = re.sub(r'\*\*([^*]+)\*\*', r'\1', clean_text)  # Bold
-    clean_text = re.sub(r'\*([^*]+)\*', r'\1', clean_text)      # Italic
-    clean_text = re.sub(r'_([^_]+)_', r'\1', clean_text)        # Underscore italic
-    clean_text = re.sub(r'`([^`]+)`', r'\1', clean_text)        # Code spans
-    clean_text = re.sub(r'#+\s*', '', clean_text)              # Headers
-    clean_text = re.sub(r'^\s*[-*+]\s+', '', clean_text, flags=re.MULTILINE)  # List items
-    
-    # Step 2: Remove chapter headers and unwanted elements
-    lines = clean_text.split('\n')
-    filtered_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        # Skip empty lines, chapter headers, and very short lines
-        if (line and 
-            not line.lower().startswith('chapter') and 
-            not line.startswith('#') and
-            not re.match(r'^\d+\.?\s*$', line) and  # Skip standalone numbers
-            len(line) > 20):  # Skip very short lines that are likely formatting artifacts
-            filtered_lines.append(line)
-    
-    # Step 3: Join and clean up spacing
-    full_text = ' '.join(filtered_lines)
-    
-    # Remove excessive whitespace
-    full_text = re.sub(r'\s+', ' ', full_text)
-    
-    # Step 4: Intelligent sentence detection with improved splitting
-    sentence_endings = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
-    sentences = sentence_endings.split(full_text)
-    
-    # Clean up sentences
-    cleaned_sentences = []
-    for sentence in sentences:
-        sentence = sentence.strip()
-        if len(sentence) > 25:  # Only include substantial sentences
-            # Ensure proper sentence ending
-            if not sentence.endswith(('.', '!', '?')):
-                sentence += '.'
-            cleaned_sentences.append(sentence)
-    
-    # Step 5: Create optimal paragraphs for print formatting
-    paragraphs = []
-    current_paragraph = []
-    current_length = 0
-    target_paragraph_length = 400  # Optimal for 6x9 print format
-    max_paragraph_length = 600     # Maximum before forced break
-    
-    for sentence in cleaned_sentences:
-        sentence_length = len(sentence)
-        
-        # Add sentence to current paragraph
-        current_paragraph.append(sentence)
-        current_length += sentence_length
-        
-        # Check if paragraph should end
-        should_end_paragraph = (
-            len(current_paragraph) >= 4 or  # Maximum 4 sentences per paragraph
-            current_length >= target_paragraph_length or
-            (current_length >= max_paragraph_length)
-        )
-        
-        if should_end_paragraph:
-            if current_paragraph:
-                paragraph_text = ' '.join(current_paragraph)
-                # Final cleanup of the paragraph
-                paragraph_text = re.sub(r'\s+', ' ', paragraph_text).strip()
-                if len(paragraph_text) > 50:  # Only add substantial paragraphs
-                    paragraphs.append(paragraph_text)
-            current_paragraph = []
-            current_length = 0
-    
-    # Add remaining sentences as final paragraph
-    if current_paragraph:
-        paragraph_text = ' '.join(current_paragraph)
-        paragraph_text = re.sub(r'\s+', ' ', paragraph_text).strip()
-        if len(paragraph_text) > 50:
-            paragraphs.append(paragraph_text)
-    
-    return paragraphs
+def export_response(job_id):
+    """Answer an export request with its job: JSON for scripts, the status page for browsers"""
+    if request.accept_mimetypes.best == 'application/json' or \
+            request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': url_for('api_export_status', job_id=job_id),
+            'download_url': url_for('download_export', job_id=job_id)
+        })
+    return redirect(url_for('export_status', job_id=job_id))
 
 @app.route('/export_pdf/<project_id>')
 def export_pdf(project_id):
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
-        
-        # Clean chapter content for better formatting
-        if project.get('chapters'):
-            for chapter in project['chapters']:
-                chapter['cleaned_paragraphs'] = clean_chapter_content(chapter.get('content', ''))
-        
-        # Generate HTML content
-        html_content = render_template('book_export.html', project=project)
-        
-        # Fix relative URLs to absolute paths for PDF generation
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        static_path = os.path.join(current_dir, 'static', 'uploads')
-        html_content = html_content.replace('/static/uploads/', f'file://{static_path}/')
-        
-        # Convert to PDF
-        pdf_filename = f"{project['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = os.path.join(EXPORTS_FOLDER, pdf_filename)
-        
-        weasyprint.HTML(string=html_content, base_url=request.url_root).write_pdf(pdf_path)
-        
-        return send_file(pdf_path, as_attachment=True, download_name=pdf_filename)
+        if not os.path.exists(get_project_file(project_id)):
+            raise FileNotFoundError('Project not found')
+        # Rendered in the export process pool; the client waits on the job
+        job_id = enqueue_job('export', project_id=project_id, export='pdf',
+                             base_url=request.url_root)
+        return export_response(job_id)
         
     except Exception as e:
         flash(f'Error exporting PDF: {str(e)}', 'error')
@@ -2057,41 +2231,11 @@ def export_kdp_pdf(project_id):
     - Print-ready quality with no watermarks
     """
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
-        
-        # Enhanced content cleaning for professional formatting
-        if project.get('chapters'):
-            for chapter in project['chapters']:
-                # Use advanced content cleaning for KDP format
-                chapter['cleaned_paragraphs'] = enhance_content_for_kdp(chapter.get('content', ''))
-        
-        # Generate professional KDP HTML content
-        html_content = render_template('kdp_book_export.html', project=project)
-        
-        # Fix relative URLs to absolute paths for PDF generation
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        static_path = os.path.join(current_dir, 'static', 'uploads')
-        html_content = html_content.replace('/static/uploads/', f'file://{static_path}/')
-        
-        # Create KDP-optimized PDF with professional settings
-        pdf_filename = f"{project['name']}_KDP_Ready_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = os.path.join(EXPORTS_FOLDER, pdf_filename)
-        
-        # Enhanced WeasyPrint configuration for professional print quality
-        html_doc = weasyprint.HTML(string=html_content, base_url=request.url_root)
-        html_doc.write_pdf(
-            pdf_path,
-            # Professional PDF settings for print
-            pdf_version='1.4',  # Compatible with most printers
-            pdf_identifier=False,  # No metadata for cleaner output
-            uncompressed_pdf=False,  # Compressed for smaller file size
-            # Optimize for print quality
-            optimize_size=('fonts', 'images')
-        )
-        
-        return send_file(pdf_path, as_attachment=True, download_name=pdf_filename)
+        if not os.path.exists(get_project_file(project_id)):
+            raise FileNotFoundError('Project not found')
+        job_id = enqueue_job('export', project_id=project_id, export='kdp_pdf',
+                             base_url=request.url_root)
+        return export_response(job_id)
         
     except Exception as e:
         flash(f'Error exporting KDP PDF: {str(e)}', 'error')
@@ -2102,20 +2246,30 @@ def upload_raw_text():
     """
     Upload and process raw text or poorly formatted PDF content for KDP formatting
     Creates a new project with optimized content structure
+    
+    A manuscript file (.txt, .md, .docx) is saved to disk and split into
+    chapters by a background job; the project shows the import's progress.
     """
     if request.method == 'POST':
+        # Manuscript files may be larger than other uploads; the form parser
+        # spools them to disk rather than memory
+        request.max_content_length = MAX_IMPORT_MB * 1024 * 1024
         try:
             # Get form data
             project_name = request.form.get('project_name', '').strip()
             raw_content = request.form.get('raw_content', '').strip()
             author_name = request.form.get('author_name', '').strip()
+            manuscript = request.files.get('manuscript_file')
+            
+            if manuscript and manuscript.filename:
+                return import_manuscript_file(project_name, author_name, manuscript)
             
             if not project_name or not raw_content:
                 flash('Project name and content are required!', 'error')
                 return redirect(url_for('upload_raw_text'))
             
             # Process the raw content into chapters
-            processed_chapters = process_raw_content_to_chapters(raw_content)
+            processed_chapters = split_raw_text(raw_content)
             
             if not processed_chapters:
                 flash('Could not process the content into chapters. Please check your text format.', 'error')
@@ -2137,9 +2291,7 @@ def upload_raw_text():
             }
             
             # Save project
-            project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-            with open(project_file, 'w') as f:
-                json.dump(project_data, f, indent=2)
+            save_project(project_id, project_data)
             
             flash(f'Successfully created project "{project_name}" with {len(processed_chapters)} chapters!', 'success')
             return redirect(url_for('project_view', project_id=project_id))
@@ -2148,213 +2300,52 @@ def upload_raw_text():
             flash(f'Error processing content: {str(e)}', 'error')
             return redirect(url_for('upload_raw_text'))
     
-    return render_template('upload_raw_text.html')
+    return render_template('upload_raw_text.html', max_import_mb=MAX_IMPORT_MB)
 
-def process_raw_content_to_chapters(raw_content):
-    """
-    Process raw text content into structured chapters
-    Automatically detects chapter breaks and formats content
-    """
-    import re
-    
-    # Step 1: Detect chapter breaks
-    chapter_patterns = [
-        r'Chapter\s+\d+[:\-\s]+(.*?)(?=Chapter\s+\d+|$)',  # "Chapter 1: Title"
-        r'CHAPTER\s+\d+[:\-\s]+(.*?)(?=CHAPTER\s+\d+|$)',  # "CHAPTER 1: Title"
-        r'Ch\.\s*\d+[:\-\s]+(.*?)(?=Ch\.\s*\d+|$)',       # "Ch. 1: Title"
-        r'(\d+)\.\s+(.*?)(?=\d+\.\s+|$)',                  # "1. Title"
-    ]
+def manuscript_path(project_id, extension):
+    return os.path.join(IMPORTS_FOLDER, f"{project_id}.{extension}")
+
+def import_manuscript_file(project_name, author_name, manuscript):
+    """Save an uploaded manuscript and queue its import into a new project"""
+    extension = manuscript.filename.rsplit('.', 1)[-1].lower() if '.' in manuscript.filename else ''
+    if extension not in MANUSCRIPT_EXTENSIONS:
+        flash('Please upload a .txt, .md or .docx file.', 'error')
+        return redirect(url_for('upload_raw_text'))
+    if not project_name:
+        flash('Project name is required!', 'error')
+        return redirect(url_for('upload_raw_text'))
     
-    chapters = []
-    chapter_found = False
-    
-    # Try each pattern to detect chapters
-    for pattern in chapter_patterns:
-        matches = re.findall(pattern, raw_content, re.IGNORECASE | re.DOTALL)
-        if matches and len(matches) > 1:  # Need at least 2 chapters
-            chapter_found = True
-            for i, match in enumerate(matches):
-                if isinstance(match, tuple):
-                    title = match[1].strip() if len(match) > 1 else f"Chapter {i+1}"
-                    content = match[0].strip() if match[0] else ""
-                else:
-                    # Extract title from first line of content
-                    lines = match.strip().split('\n')
-                    title = lines[0].strip() if lines else f"Chapter {i+1}"
-                    content = '\n'.join(lines[1:]).strip() if len(lines) > 1 else match.strip()
-                
-                # Clean the title
-                title = re.sub(r'^(Chapter\s+\d+[:\-\s]*)', '', title, flags=re.IGNORECASE).strip()
-                if not title:
-                    title = f"Chapter {i+1}"
-                
-                chapters.append({
-                    'number': i + 1,
-                    'title': title[:100],  # Limit title length
-                    'content': content
-                })
-            break
+    project_id = str(uuid.uuid4())
+    manuscript.save(manuscript_path(project_id, extension))
     
-    # If no chapter pattern found, split by length or paragraphs
-    if not chapter_found:
-        # Split content into chunks of reasonable chapter length
-        paragraphs = [p.strip() for p in raw_content.split('\n\n') if p.strip()]
-        
-        if len(paragraphs) < 3:
-            # Very short content, create single chapter
-            chapters.append({
-                'number': 1,
-                'title': 'Chapter 1',
-                'content': raw_content.strip()
-            })
-        else:
-            # Group paragraphs into chapters
-            chapter_size = max(3, len(paragraphs) // 10)  # Aim for ~10 chapters
-            current_chapter = 1
-            
-            for i in range(0, len(paragraphs), chapter_size):
-                chapter_paragraphs = paragraphs[i:i+chapter_size]
-                content = '\n\n'.join(chapter_paragraphs)
-                
-                # Generate chapter title from first paragraph
-                first_paragraph = chapter_paragraphs[0]
-                title = first_paragraph[:50] + "..." if len(first_paragraph) > 50 else first_paragraph
-                title = re.sub(r'[^\w\s]', '', title).strip()
-                if not title:
-                    title = f"Chapter {current_chapter}"
-                
-                chapters.append({
-                    'number': current_chapter,
-                    'title': title,
-                    'content': content
-                })
-                current_chapter += 1
+    project_data = {
+        'id': project_id,
+        'name': project_name,
+        'topic': f"Imported from {secure_filename(manuscript.filename) or 'manuscript'}",
+        'language': 'English',
+        'chapters': [],
+        'author_name': author_name or 'Unknown Author',
+        'status': 'completed',
+        'generation_status': 'importing',
+        'import_progress': 0,
+        'generation_mood': 'focused',
+        'created_at': datetime.now().isoformat(),
+        'last_modified': datetime.now().isoformat()
+    }
+    save_project(project_id, project_data)
+    enqueue_job('import_manuscript', project_id, extension=extension)
     
-    return chapters
+    flash(f'Importing "{project_name}"; chapters will appear when the manuscript has been read.', 'success')
+    return redirect(url_for('project_view', project_id=project_id))
 
 @app.route('/export_docx/<project_id>')
 def export_docx(project_id):
     """Export project as DOCX file"""
     try:
-        from docx import Document
-        from docx.shared import Inches
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        from docx.shared import Pt
-        from docx.enum.style import WD_STYLE_TYPE
-        
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
-        
-        # Create new Word document
-        doc = Document()
-        
-        # Set document margins
-        sections = doc.sections
-        for section in sections:
-            section.top_margin = Inches(0.5)
-            section.bottom_margin = Inches(0.5)
-            section.left_margin = Inches(0.5)
-            section.right_margin = Inches(0.5)
-        
-        # Cover page with image if available
-        if project.get('cover_image'):
-            cover_image_path = os.path.join(UPLOAD_FOLDER, project['cover_image'])
-            if os.path.exists(cover_image_path):
-                # Add cover image
-                cover_paragraph = doc.add_paragraph()
-                cover_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                cover_run = cover_paragraph.add_run()
-                try:
-                    # Add image with full width
-                    cover_run.add_picture(cover_image_path, width=Inches(6))
-                except Exception as e:
-                    # If image fails, fall back to text cover
-                    pass
-        
-        # Title overlay or regular title
-        doc.add_paragraph()  # Space
-        title_paragraph = doc.add_paragraph()
-        title_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        title_run = title_paragraph.add_run(project['name'])
-        title_run.font.size = Pt(24)
-        title_run.font.bold = True
-        
-        # Subtitle/topic
-        if project.get('topic'):
-            topic_paragraph = doc.add_paragraph()
-            topic_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            topic_run = topic_paragraph.add_run(project['topic'])
-            topic_run.font.size = Pt(16)
-            topic_run.font.italic = True
-        
-        doc.add_paragraph()  # Empty line
-        
-        # Book metadata
-        meta_paragraph = doc.add_paragraph()
-        meta_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        meta_run = meta_paragraph.add_run(f"Generated with BookGenPro\nLanguage: {project.get('language', 'English')}\n{len(project.get('chapters', []))} Chapters")
-        meta_run.font.size = Pt(12)
-        
-        # Add author bio if present
-        if project.get('author_bio'):
-            doc.add_paragraph()
-            author_paragraph = doc.add_paragraph()
-            author_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            author_run = author_paragraph.add_run(f"By: {project['author_bio']}")
-            author_run.font.size = Pt(14)
-            author_run.font.italic = True
-        
-        doc.add_page_break()
-        
-        # Table of contents
-        toc_heading = doc.add_paragraph()
-        toc_run = toc_heading.add_run("Table of Contents")
-        toc_run.font.size = Pt(18)
-        toc_run.font.bold = True
-        doc.add_paragraph()
-        
-        # Add chapters to TOC
-        for i, chapter in enumerate(project.get('chapters', []), 1):
-            if chapter.get('status') == 'completed' and chapter.get('content'):
-                toc_entry = doc.add_paragraph(f"Chapter {i}: {chapter['title']}")
-                toc_entry.style = 'List Number'
-        
-        doc.add_page_break()
-        
-        # Add chapters
-        for i, chapter in enumerate(project.get('chapters', []), 1):
-            if chapter.get('status') == 'completed' and chapter.get('content'):
-                # Chapter title
-                chapter_heading = doc.add_paragraph()
-                chapter_run = chapter_heading.add_run(f"Chapter {i}: {chapter['title']}")
-                chapter_run.font.size = Pt(16)
-                chapter_run.font.bold = True
-                doc.add_paragraph()
-                
-                # Chapter content
-                content = chapter['content']
-                
-                # Clean markdown formatting
-                content = content.replace('**', '')
-                content = content.replace('*', '')
-                content = content.replace('#', '')
-                
-                # Split content into paragraphs
-                paragraphs = content.split('\n\n')
-                for paragraph_text in paragraphs:
-                    if paragraph_text.strip():
-                        paragraph = doc.add_paragraph(paragraph_text.strip())
-                        paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-                
-                doc.add_page_break()
-        
-        # Save DOCX file
-        docx_filename = f"{project['name']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        docx_path = os.path.join(EXPORTS_FOLDER, docx_filename)
-        doc.save(docx_path)
-        
-        return send_file(docx_path, as_attachment=True, download_name=docx_filename)
+        if not os.path.exists(get_project_file(project_id)):
+            raise FileNotFoundError('Project not found')
+        job_id = enqueue_job('export', project_id=project_id, export='docx')
+        return export_response(job_id)
         
     except Exception as e:
         flash(f'Error exporting DOCX: {str(e)}', 'error')
@@ -2368,25 +2359,17 @@ def save_chapter_content(chapter_id):
         content = data.get('content', '')
         title = data.get('title', '')
         
-        # Find the project containing this chapter
-        for filename in os.listdir(PROJECTS_FOLDER):
-            if filename.endswith('.json'):
-                project_file = os.path.join(PROJECTS_FOLDER, filename)
-                with open(project_file, 'r') as f:
-                    project = json.load(f)
-                
-                # Find and update the chapter
-                for chapter in project.get('chapters', []):
-                    if chapter['id'] == chapter_id:
-                        chapter['content'] = content
-                        if title:
-                            chapter['title'] = title
-                        project['last_modified'] = datetime.now().isoformat()
-                        
-                        with open(project_file, 'w') as f:
-                            json.dump(project, f, indent=2)
-                        
-                        return jsonify({'success': True})
+        # Find the project containing this chapter via the chapter index
+        project_id, project, chapter = find_chapter(chapter_id)
+        if chapter:
+            chapter['content'] = content
+            if title:
+                chapter['title'] = title
+            project['last_modified'] = datetime.now().isoformat()
+            
+            save_project(project_id, project)
+            
+            return jsonify({'success': True})
         
         return jsonify({'success': False, 'message': 'Chapter not found'}), 404
         
@@ -2430,11 +2413,8 @@ def enhance_author_bio():
 def generate_author_bio_gemini(author_info, bio_style, bio_length, config):
     """Generate author bio using Gemini AI"""
     try:
-        import os
-        from google import genai
-        
         # Set up Gemini client
-        client = genai.Client(api_key=config['gemini_api_key'])
+        client = get_gemini_client(config['gemini_api_key'])
         
         # Create style-specific prompt
         style_prompts = {
@@ -2512,11 +2492,6 @@ STYLE REQUIREMENTS:
 
 Create the author biography now:"""
 
-        headers = {
-            "Authorization": f"Bearer {config['openrouter_api_key']}",
-            "Content-Type": "application/json",
-        }
-        
         data = {
             "model": config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'),
             "messages": [{"role": "user", "content": prompt}],
@@ -2524,12 +2499,7 @@ Create the author biography now:"""
             "max_tokens": 500
         }
         
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=60
-        )
+        response = openrouter_post(config['openrouter_api_key'], data, timeout=60)
         
         if response.status_code == 200:
             result = response.json()
@@ -2544,11 +2514,10 @@ Create the author biography now:"""
         raise Exception(f"OpenRouter API error: {str(e)}")
 
 @app.route('/check_generation_status/<project_id>')
+@conditional_on_project
 def check_generation_status(project_id):
     try:
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         return jsonify({
             'status': project.get('generation_status', 'unknown'),
@@ -2558,41 +2527,42 @@ def check_generation_status(project_id):
     except:
         return jsonify({'status': 'error'})
 
+def ai_status_summary(config):
+    """AI provider readiness shown in the header and pushed to open tabs"""
+    ai_provider = config.get('ai_provider', 'openrouter')
+    is_ready = False
+    status = "Not configured"
+    detailed_status = "AI not configured"
+    
+    if ai_provider == 'gemini':
+        api_key = config.get('gemini_api_key', '')
+        if api_key:
+            is_ready = True
+            status = "Gemini Ready"
+            detailed_status = f"Gemini AI ({config.get('gemini_model', 'gemini-1.5-flash')})"
+        else:
+            detailed_status = "Gemini API key missing"
+    else:  # openrouter
+        api_key = config.get('openrouter_api_key', '')
+        if api_key:
+            is_ready = True
+            status = "OpenRouter Ready"
+            detailed_status = f"OpenRouter ({config.get('selected_model', 'auto')})"
+        else:
+            detailed_status = "OpenRouter API key missing"
+    
+    return {
+        'is_ready': is_ready,
+        'status': status,
+        'detailed_status': detailed_status,
+        'provider': ai_provider
+    }
+
 @app.route('/api/check_ai_status')
 def api_check_ai_status():
     """Check AI provider status and configuration"""
     try:
-        config = load_config()
-        
-        # Check which AI provider is configured
-        ai_provider = config.get('ai_provider', 'openrouter')
-        is_ready = False
-        status = "Not configured"
-        detailed_status = "AI not configured"
-        
-        if ai_provider == 'gemini':
-            api_key = config.get('gemini_api_key', '')
-            if api_key:
-                is_ready = True
-                status = "Gemini Ready"
-                detailed_status = f"Gemini AI ({config.get('gemini_model', 'gemini-1.5-flash')})"
-            else:
-                detailed_status = "Gemini API key missing"
-        else:  # openrouter
-            api_key = config.get('openrouter_api_key', '')
-            if api_key:
-                is_ready = True
-                status = "OpenRouter Ready"
-                detailed_status = f"OpenRouter ({config.get('selected_model', 'auto')})"
-            else:
-                detailed_status = "OpenRouter API key missing"
-        
-        return jsonify({
-            'is_ready': is_ready,
-            'status': status,
-            'detailed_status': detailed_status,
-            'provider': ai_provider
-        })
+        return jsonify(ai_status_summary(load_config()))
     except Exception as e:
         logging.error(f"Error checking AI status: {e}")
         return jsonify({
@@ -2604,10 +2574,13 @@ def api_check_ai_status():
 
 @app.route('/api/test_ai_connection')
 def api_test_ai_connection():
-    """Test AI connection with a simple request"""
+    """Test AI connection with a simple request. It goes through the response
+    cache like every provider call but always bypasses the lookup: a test
+    answered from the cache would hide a broken key or provider outage"""
     try:
         config = load_config()
         ai_provider = config.get('ai_provider', 'openrouter')
+        test_prompt = "Hello, this is a connection test."
         
         if ai_provider == 'gemini':
             api_key = config.get('gemini_api_key', '')
@@ -2616,18 +2589,20 @@ def api_test_ai_connection():
             
             # Simple test request to Gemini using new library
             try:
-                from google import genai
-                from google.genai import types
+                client = get_gemini_client(api_key)
             except ImportError:
                 return jsonify({'success': False, 'message': 'Gemini library not installed. Please install google-genai.'})
             
+            model = config.get('gemini_model', 'gemini-2.5-flash')
+            
+            def generate():
+                response = client.models.generate_content(model=model, contents=test_prompt)
+                return bool(response.text), response.text
+            
             try:
-                client = genai.Client(api_key=api_key)
-                response = client.models.generate_content(
-                    model=config.get('gemini_model', 'gemini-2.5-flash'),
-                    contents="Hello, this is a connection test."
-                )
-                if response.text:
+                success, _ = cached_generate('gemini', model, test_prompt, None, generate,
+                                             bypass=True, api_key=api_key)
+                if success:
                     return jsonify({'success': True, 'message': 'Gemini connection successful'})
                 else:
                     return jsonify({'success': False, 'message': 'Gemini test failed: No response'})
@@ -2640,29 +2615,27 @@ def api_test_ai_connection():
                 return jsonify({'success': False, 'message': 'OpenRouter API key not configured'})
             
             # Simple test request to OpenRouter
-            headers = {
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            }
-            
             data = {
                 "model": config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'),
-                "messages": [{"role": "user", "content": "Hello, this is a connection test."}],
+                "messages": [{"role": "user", "content": test_prompt}],
                 "max_tokens": 50
             }
             
+            def generate():
+                response = openrouter_post(api_key, data, timeout=30)
+                if response.status_code == 200:
+                    choices = response.json().get('choices') or [{}]
+                    return True, choices[0].get('message', {}).get('content', '')
+                return False, response.status_code
+            
             try:
-                response = requests.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers=headers,
-                    json=data,
-                    timeout=30
-                )
+                success, result = cached_generate('openrouter', data['model'], test_prompt, None, generate,
+                                                  bypass=True, api_key=api_key)
                 
-                if response.status_code == 200:
+                if success:
                     return jsonify({'success': True, 'message': 'OpenRouter connection successful'})
                 else:
-                    return jsonify({'success': False, 'message': f'OpenRouter test failed: {response.status_code}'})
+                    return jsonify({'success': False, 'message': f'OpenRouter test failed: {result}'})
             except Exception as e:
                 return jsonify({'success': False, 'message': f'OpenRouter test failed: {str(e)}'})
                 
@@ -2670,6 +2643,19 @@ def api_test_ai_connection():
         logging.error(f"Error testing AI connection: {e}")
         return jsonify({'success': False, 'message': f'Connection test error: {str(e)}'})
 
+@app.route('/api/llm_cache_stats')
+def api_llm_cache_stats():
+    """AI response cache hit/miss counters"""
+    return jsonify(llm_cache_stats())
+
+@app.route('/api/render_cache_stats')
+def api_render_cache_stats():
+    """Rendered PDF cache and laid-out part cache hit/miss counters, and export store usage"""
+    stats = render_cache_stats()
+    stats['parts'] = export_part_cache_stats()
+    stats['exports'] = export_store_stats()
+    return jsonify(stats)
+
 
 
 # Session storage for standalone generation
@@ -2707,13 +2693,10 @@ def api_standalone_generation():
             'error': None
         }
         
-        # Start background generation
-        thread = threading.Thread(target=standalone_generation_background, 
-                                args=(session_id, data, config))
-        thread.daemon = True
-        thread.start()
+        # Queue background generation
+        job_id = enqueue_job('standalone_generation', session_id=session_id, params=data)
         
-        return jsonify({'success': True, 'session_id': session_id})
+        return jsonify({'success': True, 'session_id': session_id, 'job_id': job_id})
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
@@ -2731,17 +2714,9 @@ def api_standalone_export_pdf():
     """Export standalone book as PDF"""
     try:
         book_data = json.loads(request.form.get('book_data', '{}'))
-        
-        # Generate HTML for PDF
-        html_content = render_template('book_export.html', project=book_data)
-        
-        # Convert to PDF
-        pdf_filename = f"{book_data['title']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = os.path.join(EXPORTS_FOLDER, pdf_filename)
-        
-        weasyprint.HTML(string=html_content, base_url=request.url_root).write_pdf(pdf_path)
-        
-        return send_file(pdf_path, as_attachment=True, download_name=pdf_filename)
+        job_id = enqueue_job('export', export='standalone_pdf', book_data=book_data,
+                             base_url=request.url_root)
+        return export_response(job_id)
         
     except Exception as e:
         flash(f'Error exporting PDF: {str(e)}', 'error')
@@ -2751,111 +2726,9 @@ def api_standalone_export_pdf():
 def api_standalone_export_docx():
     """Export standalone book as DOCX"""
     try:
-        from docx import Document
-        from docx.shared import Inches, Pt
-        from docx.enum.text import WD_ALIGN_PARAGRAPH
-        
         book_data = json.loads(request.form.get('book_data', '{}'))
-        
-        # Create DOCX document
-        doc = Document()
-        
-        # Set margins
-        sections = doc.sections
-        for section in sections:
-            section.top_margin = Inches(0.5)
-            section.bottom_margin = Inches(0.5)
-            section.left_margin = Inches(0.5)
-            section.right_margin = Inches(0.5)
-        
-        # Cover page with image if available
-        if book_data.get('cover_image'):
-            cover_image_path = os.path.join(UPLOAD_FOLDER, book_data['cover_image'])
-            if os.path.exists(cover_image_path):
-                # Add cover image
-                cover_paragraph = doc.add_paragraph()
-                cover_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-                cover_run = cover_paragraph.add_run()
-                try:
-                    # Add image with full width
-                    cover_run.add_picture(cover_image_path, width=Inches(6))
-                except Exception as e:
-                    # If image fails, fall back to text cover
-                    pass
-        
-        # Title overlay or regular title
-        doc.add_paragraph()  # Space
-        title_paragraph = doc.add_paragraph()
-        title_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        title_run = title_paragraph.add_run(book_data['title'])
-        title_run.font.size = Pt(24)
-        title_run.font.bold = True
-        
-        # Subtitle/description
-        if book_data.get('description'):
-            topic_paragraph = doc.add_paragraph()
-            topic_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            topic_run = topic_paragraph.add_run(book_data['description'])
-            topic_run.font.size = Pt(16)
-            topic_run.font.italic = True
-        
-        doc.add_paragraph()  # Empty line
-        
-        # Book metadata
-        meta_paragraph = doc.add_paragraph()
-        meta_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        meta_run = meta_paragraph.add_run(f"Generated with BookGenPro\nLanguage: {book_data.get('language', 'English')}\n{len(book_data.get('chapters', []))} Chapters")
-        meta_run.font.size = Pt(12)
-        
-        # Author bio
-        if book_data.get('authorBio'):
-            doc.add_paragraph()
-            author_paragraph = doc.add_paragraph()
-            author_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            author_run = author_paragraph.add_run(f"By: {book_data['authorBio']}")
-            author_run.font.size = Pt(14)
-            author_run.font.italic = True
-        
-        doc.add_page_break()
-        
-        # Table of contents
-        toc_heading = doc.add_paragraph()
-        toc_run = toc_heading.add_run("Table of Contents")
-        toc_run.font.size = Pt(18)
-        toc_run.font.bold = True
-        doc.add_paragraph()
-        
-        for i, chapter in enumerate(book_data.get('chapters', []), 1):
-            toc_entry = doc.add_paragraph(f"Chapter {i}: {chapter['title']}")
-            toc_entry.style = 'List Number'
-        
-        doc.add_page_break()
-        
-        # Chapters
-        for i, chapter in enumerate(book_data.get('chapters', []), 1):
-            chapter_heading = doc.add_paragraph()
-            chapter_run = chapter_heading.add_run(f"Chapter {i}: {chapter['title']}")
-            chapter_run.font.size = Pt(16)
-            chapter_run.font.bold = True
-            doc.add_paragraph()
-            
-            content = chapter['content']
-            content = content.replace('**', '').replace('*', '').replace('#', '')
-            
-            paragraphs = content.split('\n\n')
-            for paragraph_text in paragraphs:
-                if paragraph_text.strip():
-                    paragraph = doc.add_paragraph(paragraph_text.strip())
-                    paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-            
-            doc.add_page_break()
-        
-        # Save DOCX
-        docx_filename = f"{book_data['title']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-        docx_path = os.path.join(EXPORTS_FOLDER, docx_filename)
-        doc.save(docx_path)
-        
-        return send_file(docx_path, as_attachment=True, download_name=docx_filename)
+        job_id = enqueue_job('export', export='standalone_docx', book_data=book_data)
+        return export_response(job_id)
         
     except Exception as e:
         flash(f'Error exporting DOCX: {str(e)}', 'error')
@@ -2902,7 +2775,11 @@ def standalone_generation_background(session_id, params, config):
             session['currentStep'] = 'content'
             
             total_chapters = len(session['book']['chapters'])
+            job = current_job()
             for i, chapter in enumerate(session['book']['chapters']):
+                if job and job.cancelled():
+                    session['status'] = 'cancelled'
+                    return
                 session['progress'] = f"({i+1}/{total_chapters})"
                 
                 content = generate_chapter_content_simple(
@@ -2943,9 +2820,7 @@ def save_standalone_to_project(session, params):
             'generation_type': 'ai_standalone'
         }
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'w') as f:
-            json.dump(project_data, f, indent=2)
+        save_project(project_id, project_data)
             
         try:
             session['project_id'] = project_id
@@ -2974,11 +2849,6 @@ Make it more detailed and comprehensive while maintaining the core concept. Add
                 logging.error(f"Gemini failed in enhance_description_simple: {result}")
         
         # OpenRouter fallback
-        headers = {
-            "Authorization": f"Bearer {config['openrouter_api_key']}",
-            "Content-Type": "application/json",
-        }
-        
         data = {
             "model": config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'),
             "messages": [{"role": "user", "content": prompt}],
@@ -2986,12 +2856,7 @@ Make it more detailed and comprehensive while maintaining the core concept. Add
             "max_tokens": 500
         }
         
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=60
-        )
+        response = openrouter_post(config['openrouter_api_key'], data, timeout=60)
         
         if response.status_code == 200:
             result = response.json()
@@ -3030,11 +2895,6 @@ Chapter titles:"""
                 logging.error(f"Gemini failed in generate_chapter_titles_simple: {result}")
         
         # OpenRouter fallback
-        headers = {
-            "Authorization": f"Bearer {config['openrouter_api_key']}",
-            "Content-Type": "application/json",
-        }
-        
         data = {
             "model": config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'),
             "messages": [{"role": "user", "content": prompt}],
@@ -3042,12 +2902,7 @@ Chapter titles:"""
             "max_tokens": 800
         }
         
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=60
-        )
+        response = openrouter_post(config['openrouter_api_key'], data, timeout=60)
         
         if response.status_code == 200:
             result = response.json()
@@ -3088,11 +2943,6 @@ Chapter content:"""
                 logging.error(f"Gemini failed in generate_chapter_content_simple: {result}")
         
         # OpenRouter fallback
-        headers = {
-            "Authorization": f"Bearer {config['openrouter_api_key']}",
-            "Content-Type": "application/json",
-        }
-        
         data = {
             "model": config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'),
             "messages": [{"role": "user", "content": prompt}],
@@ -3100,12 +2950,7 @@ Chapter content:"""
             "max_tokens": 2000
         }
         
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=60
-        )
+        response = openrouter_post(config['openrouter_api_key'], data, timeout=60)
         
         if response.status_code == 200:
             result = response.json()
@@ -3143,11 +2988,6 @@ Title:"""
                 logging.error(f"Gemini failed in generate_book_title_from_description: {result}")
                 return "Generated Book"
         else:
-            headers = {
-                "Authorization": f"Bearer {config['openrouter_api_key']}",
-                "Content-Type": "application/json",
-            }
-            
             data = {
                 "model": config.get('selected_model', 'meta-llama/llama-3.2-3b-instruct:free'),
                 "messages": [{"role": "user", "content": prompt}],
@@ -3155,12 +2995,7 @@ Title:"""
                 "max_tokens": 100
             }
             
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data,
-                timeout=60
-            )
+            response = openrouter_post(config['openrouter_api_key'], data, timeout=60)
             
             if response.status_code == 200:
                 result = response.json()
@@ -3182,9 +3017,7 @@ def enhance_title(project_id):
         if not config.get('license_activated', False):
             return jsonify({'success': False, 'message': 'License not activated'})
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         current_title = project.get('name', '')
         topic = project.get('topic', '')
@@ -3222,8 +3055,7 @@ Return only the enhanced title, nothing else."""
         project['name'] = enhanced_title.strip()
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'enhanced_title': enhanced_title.strip()})
         
@@ -3238,9 +3070,7 @@ def enhance_description(project_id):
         if not config.get('license_activated', False):
             return jsonify({'success': False, 'message': 'License not activated'})
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         current_description = project.get('topic', '')
         title = project.get('name', '')
@@ -3279,8 +3109,7 @@ Return the enhanced description, nothing else."""
         project['topic'] = enhanced_description.strip()
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'enhanced_description': enhanced_description.strip()})
         
@@ -3300,9 +3129,7 @@ def update_chapter_title():
         chapter_id = data.get('chapter_id')
         new_title = data.get('title')
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         # Find and update the chapter
         for chapter in project.get('chapters', []):
@@ -3312,8 +3139,7 @@ def update_chapter_title():
         
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'message': 'Chapter title updated successfully'})
         
@@ -3328,9 +3154,7 @@ def enhance_chapter_title(project_id, chapter_id):
         if not config.get('license_activated', False):
             return jsonify({'success': False, 'message': 'License not activated'})
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         # Find the chapter
         target_chapter = None
@@ -3383,8 +3207,7 @@ Return only the enhanced chapter title, nothing else."""
         target_chapter['title'] = enhanced_title.strip()
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'enhanced_title': enhanced_title.strip()})
         
@@ -3399,9 +3222,7 @@ def enhance_chapter_content(project_id, chapter_id):
         if not config.get('license_activated', False):
             return jsonify({'success': False, 'message': 'License not activated'})
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         # Find the chapter
         target_chapter = None
@@ -3459,8 +3280,7 @@ Return the enhanced content only, preserving paragraph structure."""
         target_chapter['status'] = 'completed'
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'message': 'Chapter content enhanced successfully'})
         
@@ -3475,9 +3295,7 @@ def enhance_all_chapter_titles(project_id):
         if not config.get('license_activated', False):
             return jsonify({'success': False, 'message': 'License not activated'})
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         chapters = project.get('chapters', [])
         if not chapters:
@@ -3538,8 +3356,7 @@ Return the enhanced titles in the same order, one per line, in format "Chapter X
         
         project['last_modified'] = datetime.now().isoformat()
         
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
         return jsonify({'success': True, 'message': f'Enhanced {len(enhanced_titles)} chapter titles successfully'})
         
@@ -3554,28 +3371,26 @@ def regenerate_all_chapter_content(project_id):
         if not config.get('license_activated', False):
             return jsonify({'success': False, 'message': 'License not activated'})
         
-        project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
-        with open(project_file, 'r') as f:
-            project = json.load(f)
+        project = load_project(project_id)
         
         chapters = project.get('chapters', [])
         if not chapters:
             return jsonify({'success': False, 'message': 'No chapters found'})
         
-        # Start background regeneration
-        thread = threading.Thread(target=regenerate_all_content_background, 
-                                args=(project_id, project, config))
-        thread.daemon = True
-        thread.start()
+        if list_jobs(project_id=project_id, active_only=True):
+            return jsonify({'success': False, 'message': 'Generation is already running for this project'})
+        
+        # Queue background regeneration
+        job_id = enqueue_job('regenerate_all_content', project_id=project_id)
         
-        return jsonify({'success': True, 'message': 'Started regenerating all chapter content in background'})
+        return jsonify({'success': True, 'job_id': job_id,
+                        'message': 'Started regenerating all chapter content in background'})
         
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)})
 
 def regenerate_all_content_background(project_id, project, config):
     """Background task to regenerate all chapter content"""
-    project_file = os.path.join(PROJECTS_FOLDER, f"{project_id}.json")
     
     try:
         book_title = project.get('name', '')
@@ -3585,14 +3400,21 @@ def regenerate_all_content_background(project_id, project, config):
         
         # Update status
         project['generation_status'] = 'regenerating_all_content'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
         
-        # Regenerate each chapter
+        # Regenerate each chapter. The user asked for new text, so the first
+        # run skips the response cache; a run resumed after an interruption
+        # reads it, so chapters regenerated before the restart are not paid for again
+        job = current_job()
+        use_cache = bool(job and job.attempts > 1)
         for i, chapter in enumerate(project.get('chapters', [])):
+            if job and job.cancelled():
+                project['generation_status'] = 'cancelled'
+                save_project(project_id, project)
+                return
+            
             chapter['status'] = 'generating'
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
+            save_project(project_id, project)
             
             chapter_title = chapter.get('title', '')
             
@@ -3617,9 +3439,9 @@ Generate the complete chapter content:"""
 
             # Generate content
             if ai_provider == 'gemini':
-                success, content = generate_with_gemini(prompt, config.get('gemini_api_key', ''), config.get('gemini_model', 'gemini-2.5-flash'))
+                success, content = generate_with_gemini(prompt, config.get('gemini_api_key', ''), config.get('gemini_model', 'gemini-2.5-flash'), use_cache=use_cache)
             else:
-                success, content = generate_content(prompt, config)
+                success, content = generate_content(prompt, config, use_cache=use_cache)
             
             if success:
                 chapter['content'] = content.strip()
@@ -3627,19 +3449,228 @@ Generate the complete chapter content:"""
             else:
                 chapter['status'] = 'error'
             
-            with open(project_file, 'w') as f:
-                json.dump(project, f, indent=2)
+            save_project(project_id, project)
         
         # Mark as completed
         project['generation_status'] = 'completed'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
     
     except Exception as e:
         logging.error(f"Error in regenerate_all_content_background: {e}")
         project['generation_status'] = f'error: {str(e)}'
-        with open(project_file, 'w') as f:
-            json.dump(project, f, indent=2)
+        save_project(project_id, project)
+
+# ===== BACKGROUND JOBS =====
+
+def run_generate_chapters_job(job):
+    generate_chapters_background(job.project_id, load_project(job.project_id), load_config())
+
+def run_regenerate_chapter_job(job, chapter_id):
+    regenerate_single_chapter(job.project_id, chapter_id, load_project(job.project_id), load_config())
+
+def run_regenerate_all_content_job(job):
+    regenerate_all_content_background(job.project_id, load_project(job.project_id), load_config())
+
+def run_write_pending_chapters_job(job):
+    write_pending_chapters_background(job.project_id, load_config())
+
+def run_standalone_generation_job(job, session_id, params):
+    standalone_generation_background(session_id, params, load_config())
+
+def mark_generation_interrupted(project_id, error):
+    """Clear a 'generating' status left behind by a job that cannot be resumed"""
+    try:
+        project = load_project(project_id)
+    except FileNotFoundError:
+        return
+    project['generation_status'] = f'error: {error}'
+    for chapter in project.get('chapters', []):
+        if chapter.get('status') == 'generating':
+            chapter['status'] = 'error'
+    save_project(project_id, project)
+
+register_job_handler('generate_chapters', run_generate_chapters_job,
+                     on_abandon=mark_generation_interrupted)
+register_job_handler('regenerate_chapter', run_regenerate_chapter_job,
+                     on_abandon=mark_generation_interrupted)
+register_job_handler('regenerate_all_content', run_regenerate_all_content_job,
+                     on_abandon=mark_generation_interrupted)
+register_job_handler('write_pending_chapters', run_write_pending_chapters_job,
+                     on_abandon=mark_generation_interrupted)
+# Standalone sessions live in this process's memory, so they cannot move or resume
+register_job_handler('standalone_generation', run_standalone_generation_job, local=True)
+
+def run_import_manuscript_job(job, extension):
+    """Split an uploaded manuscript into the project's chapters, saving the
+    share of the file read as import_progress for the status endpoints"""
+    project_id = job.project_id
+    path = manuscript_path(project_id, extension)
+    reported = [0]
+    
+    def on_progress(fraction):
+        percent = int(fraction * 100)
+        if percent - reported[0] < 5:
+            return
+        reported[0] = percent
+        project = load_project(project_id)
+        project['import_progress'] = percent
+        save_project(project_id, project)
+        job.report(percent)
+    
+    try:
+        try:
+            chapters = read_manuscript(path, extension, on_progress)
+            error = None if chapters else 'Could not find any chapters in the manuscript'
+        except Exception as e:
+            logging.error(f"Error importing manuscript for project {project_id}: {e}")
+            chapters, error = [], str(e)
+        
+        project = load_project(project_id)
+        project['chapters'] = chapters
+        project['generation_status'] = f'error: {error}' if error else 'completed'
+        project.pop('import_progress', None)
+        save_project(project_id, project)
+    except FileNotFoundError:
+        logging.info(f"Project {project_id} was deleted during its import")
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+def abandon_import(project_id, error):
+    """Mark an import that cannot be resumed as failed and drop its upload"""
+    for extension in MANUSCRIPT_EXTENSIONS:
+        path = manuscript_path(project_id, extension)
+        if os.path.exists(path):
+            os.remove(path)
+    mark_generation_interrupted(project_id, error)
+
+register_job_handler('import_manuscript', run_import_manuscript_job, on_abandon=abandon_import)
+
+def run_export_job(job, export, base_url=None, book_data=None):
+    """Render an export in the export process pool and store the finished
+    file in the export store; the job's result names the stored export"""
+    store = get_export_store()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    job.report(10)
+    
+    if export in ('pdf', 'kdp_pdf', 'docx'):
+        book = load_project(job.project_id)
+        name = book['name']
+    elif export in ('standalone_pdf', 'standalone_docx'):
+        book = book_data
+        name = book_data['title']
+    else:
+        raise ValueError(f"Unknown export: {export}")
+    # Identical exports of the same revision share one manifest entry and blob
+    key = export_key(job.project_id, project_content_hash(book), export)
+    job.report(20)
+    
+    if export in ('docx', 'standalone_docx'):
+        filename = f"{name}_{timestamp}.docx"
+        model = book_model(book) if export == 'docx' else standalone_book_model(book)
+        docx_path = store.temp_path('docx')
+        try:
+            run_export(job.project_id or name, build_docx, model, os.path.abspath(docx_path))
+        except Exception:
+            os.remove(docx_path)
+            raise
+        job.report(90)
+        store.put_file(docx_path, 'docx', filename, key)
+    else:
+        if export == 'standalone_pdf':
+            filename = f"{name}_{timestamp}.pdf"
+            pdf = run_export(name, render_standalone_pdf, book, base_url)
+        else:
+            template = 'kdp_book_export.html' if export == 'kdp_pdf' else 'book_export.html'
+            pdf_options = KDP_PDF_OPTIONS if export == 'kdp_pdf' else {}
+            suffix = '_KDP_Ready' if export == 'kdp_pdf' else ''
+            filename = f"{name}{suffix}_{timestamp}.pdf"
+            cache_key = export_render_key(book, template, base_url=base_url)
+            pdf = export_book_pdf(book, template, cache_key, base_url=base_url, **pdf_options)
+        job.report(90)
+        store.put(pdf, 'pdf', filename, key)
+    
+    job.report(100, {'export_key': key, 'filename': filename})
+
+register_job_handler('export', run_export_job, queue='exports')
+
+def start_background_workers():
+    """Start the job worker threads. Only the server process calls this
+    (gunicorn.conf.py, main.py): CLI commands and other imports of the app
+    must not claim queued jobs or recover stale ones."""
+    # Export jobs only wait on the export processes, so give each process a thread
+    start_job_workers(queues={'exports': EXPORT_PROCESSES})
+
+@app.route('/api/jobs')
+def api_jobs():
+    """List background jobs (?project_id=..., ?active=1 for queued/running only)"""
+    return jsonify({'jobs': list_jobs(project_id=request.args.get('project_id'),
+                                      active_only=request.args.get('active') == '1')})
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify(job)
+
+def finished_export_key(job_id):
+    """The export job's record and the key of its stored export; the key is
+    None while the export is not ready"""
+    job = get_job(job_id)
+    if job is None or job['kind'] != 'export':
+        return None, None
+    result = job.get('result') or {}
+    if job['status'] != 'completed' or not result.get('export_key'):
+        return job, None
+    return job, result['export_key']
+
+@app.route('/exports/<job_id>')
+def export_status(job_id):
+    """Page that waits for an export and then downloads it"""
+    job, _ = finished_export_key(job_id)
+    if job is None:
+        flash('Export not found', 'error')
+        return redirect(url_for('index'))
+    return render_template('export_status.html', job=job)
+
+@app.route('/api/exports/<job_id>')
+def api_export_status(job_id):
+    job, key = finished_export_key(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Export not found'}), 404
+    ready = key is not None and get_export_store().exists(key)
+    return jsonify({
+        'success': True,
+        'status': job['status'],
+        'progress': job['progress'],
+        'error': job['error'],
+        'ready': ready,
+        'expired': job['status'] == 'completed' and not ready,
+        'download_url': url_for('download_export', job_id=job_id) if ready else None
+    })
+
+@app.route('/exports/<job_id>/download')
+def download_export(job_id):
+    job, key = finished_export_key(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Export not found'}), 404
+    # An open file, so evicting the export meanwhile cannot cut the download short
+    file, download_name = get_export_store().open(key) if key else (None, None)
+    if file is None:
+        if job['status'] == 'completed':
+            return jsonify({'success': False, 'message': 'Export has expired; please export again'}), 410
+        return jsonify({'success': False, 'message': 'Export is not ready',
+                        'status': job['status']}), 409
+    response = send_file(file, as_attachment=True, download_name=download_name)
+    response.content_length = os.fstat(file.fileno()).st_size
+    return response
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    if cancel_job(job_id):
+        return jsonify({'success': True, 'message': 'Cancellation requested'})
+    return jsonify({'success': False, 'message': 'Job not found or already finished'}), 404
 
 # ===== ERROR HANDLERS =====
 
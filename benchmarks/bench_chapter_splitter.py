@@ -0,0 +1,106 @@
+"""
+Throughput benchmark for manuscript_import.split_chapters
+
+Writes synthetic manuscripts of 5-50 MB (chapter headings, numbered lists,
+numbered sentences, long paragraphs) to temporary files and splits each one
+streaming from the file. The original regex splitter from app.py is kept
+below and timed on the smaller inputs for comparison.
+
+Usage: python benchmarks/bench_chapter_splitter.py [--sizes 5,20,50] [--original-max-mb 5]
+"""
+import os
+import re
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from manuscript_import import split_chapters  # noqa: E402
+
+WORDS = ('the author writes about creative work and the tools that shape it '
+         'every chapter explains one idea with examples drawn from practice').split()
+
+
+def original_split(raw_content):
+    """The original findall-based detection, kept as the comparison baseline"""
+    chapter_patterns = [
+        r'Chapter\s+\d+[:\-\s]+(.*?)(?=Chapter\s+\d+|$)',
+        r'CHAPTER\s+\d+[:\-\s]+(.*?)(?=CHAPTER\s+\d+|$)',
+        r'Ch\.\s*\d+[:\-\s]+(.*?)(?=Ch\.\s*\d+|$)',
+        r'(\d+)\.\s+(.*?)(?=\d+\.\s+|$)',
+    ]
+    for pattern in chapter_patterns:
+        matches = re.findall(pattern, raw_content, re.IGNORECASE | re.DOTALL)
+        if matches and len(matches) > 1:
+            return len(matches)
+    return 0
+
+
+def write_manuscript(path, size_mb, rng):
+    """A manuscript of about size_mb megabytes with ~40 chapters"""
+    target = int(size_mb * 1024 * 1024)
+    chapter_bytes = max(target // 40, 1)
+    written = 0
+    chapter = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            chapter += 1
+            text = f"\n\nChapter {chapter}: {' '.join(rng.choice(WORDS) for _ in range(4)).title()}\n\n"
+            in_chapter = 0
+            while in_chapter < chapter_bytes:
+                roll = rng.random()
+                if roll < 0.05:
+                    block = '\n'.join(f"{i}. {rng.choice(WORDS)} {rng.choice(WORDS)} item"
+                                      for i in range(1, rng.randint(3, 8)))
+                elif roll < 0.1:
+                    block = f"In {rng.randint(1990, 2024)}. the numbers rose again, as chapter {chapter} shows."
+                else:
+                    block = ' '.join(' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + '.'
+                                     for _ in range(rng.randint(2, 8)))
+                text += block + '\n\n'
+                in_chapter += len(block) + 2
+            f.write(text)
+            written += len(text)
+    return chapter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='5,20,50', help='manuscript sizes in MB')
+    parser.add_argument('--original-max-mb', type=float, default=5,
+                        help='largest size the original splitter is timed on')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for size_mb in [float(size) for size in args.sizes.split(',')]:
+            path = os.path.join(directory, f"manuscript_{size_mb:g}mb.txt")
+            expected = write_manuscript(path, size_mb, rng)
+            actual_mb = os.path.getsize(path) / (1024 * 1024)
+
+            start = time.perf_counter()
+            with open(path, 'r', encoding='utf-8') as f:
+                chapters = split_chapters(f)
+            elapsed = time.perf_counter() - start
+            ok = len(chapters) == expected
+            failures += not ok
+            print(f"{actual_mb:6.1f} MB: {len(chapters)}/{expected} chapters in {elapsed:.2f}s "
+                  f"({actual_mb / elapsed:.1f} MB/s){'' if ok else '  MISMATCH'}")
+
+            if size_mb <= args.original_max_mb:
+                with open(path, 'r', encoding='utf-8') as f:
+                    raw_content = f.read()
+                start = time.perf_counter()
+                found = original_split(raw_content)
+                elapsed = time.perf_counter() - start
+                print(f"{'':9} original: {found} matches in {elapsed:.2f}s ({actual_mb / elapsed:.1f} MB/s)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
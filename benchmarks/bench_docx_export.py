@@ -0,0 +1,218 @@
+"""
+Parity check and benchmark for docx_export.build_docx
+
+Builds synthetic books with the original project DOCX builder (kept below
+as the reference) and with the shared builder, checks that both documents
+have the same paragraphs with the same text and effective formatting, then
+times repeat exports: the first export of a book, an export after one
+chapter changed, and an unchanged export. Exits non-zero on any mismatch.
+
+Usage: python benchmarks/bench_docx_export.py [--chapters N] [--words N] [--seed N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import docx_export  # noqa: E402
+from docx_export import book_model, build_docx  # noqa: E402
+
+WORDS = ('the author writes about creative work and the tools that shape it '
+         'every chapter explains one idea with examples drawn from practice').split()
+
+
+def reference_build_project_docx(project, docx_path, upload_folder):
+    """The original project builder, kept verbatim as the parity reference"""
+    from docx import Document
+    from docx.shared import Inches
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Pt
+
+    doc = Document()
+
+    sections = doc.sections
+    for section in sections:
+        section.top_margin = Inches(0.5)
+        section.bottom_margin = Inches(0.5)
+        section.left_margin = Inches(0.5)
+        section.right_margin = Inches(0.5)
+
+    if project.get('cover_image'):
+        cover_image_path = os.path.join(upload_folder, project['cover_image'])
+        if os.path.exists(cover_image_path):
+            cover_paragraph = doc.add_paragraph()
+            cover_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            cover_run = cover_paragraph.add_run()
+            try:
+                cover_run.add_picture(cover_image_path, width=Inches(6))
+            except Exception as e:
+                pass
+
+    doc.add_paragraph()
+    title_paragraph = doc.add_paragraph()
+    title_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title_run = title_paragraph.add_run(project['name'])
+    title_run.font.size = Pt(24)
+    title_run.font.bold = True
+
+    if project.get('topic'):
+        topic_paragraph = doc.add_paragraph()
+        topic_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        topic_run = topic_paragraph.add_run(project['topic'])
+        topic_run.font.size = Pt(16)
+        topic_run.font.italic = True
+
+    doc.add_paragraph()
+
+    meta_paragraph = doc.add_paragraph()
+    meta_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    meta_run = meta_paragraph.add_run(f"Generated with BookGenPro\nLanguage: {project.get('language', 'English')}\n{len(project.get('chapters', []))} Chapters")
+    meta_run.font.size = Pt(12)
+
+    if project.get('author_bio'):
+        doc.add_paragraph()
+        author_paragraph = doc.add_paragraph()
+        author_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        author_run = author_paragraph.add_run(f"By: {project['author_bio']}")
+        author_run.font.size = Pt(14)
+        author_run.font.italic = True
+
+    doc.add_page_break()
+
+    toc_heading = doc.add_paragraph()
+    toc_run = toc_heading.add_run("Table of Contents")
+    toc_run.font.size = Pt(18)
+    toc_run.font.bold = True
+    doc.add_paragraph()
+
+    for i, chapter in enumerate(project.get('chapters', []), 1):
+        if chapter.get('status') == 'completed' and chapter.get('content'):
+            toc_entry = doc.add_paragraph(f"Chapter {i}: {chapter['title']}")
+            toc_entry.style = 'List Number'
+
+    doc.add_page_break()
+
+    for i, chapter in enumerate(project.get('chapters', []), 1):
+        if chapter.get('status') == 'completed' and chapter.get('content'):
+            chapter_heading = doc.add_paragraph()
+            chapter_run = chapter_heading.add_run(f"Chapter {i}: {chapter['title']}")
+            chapter_run.font.size = Pt(16)
+            chapter_run.font.bold = True
+            doc.add_paragraph()
+
+            content = chapter['content']
+
+            content = content.replace('**', '')
+            content = content.replace('*', '')
+            content = content.replace('#', '')
+
+            paragraphs = content.split('\n\n')
+            for paragraph_text in paragraphs:
+                if paragraph_text.strip():
+                    paragraph = doc.add_paragraph(paragraph_text.strip())
+                    paragraph.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
+
+            doc.add_page_break()
+
+    doc.save(docx_path)
+
+
+def synthetic_project(rng, chapters, words, cover_image=None):
+    project = {'name': 'Benchmark Book', 'topic': 'A book for timing exports', 'language': 'English',
+               'author_bio': 'Written by a benchmark.', 'cover_image': cover_image, 'chapters': []}
+    for number in range(1, chapters + 1):
+        paragraphs = []
+        written = 0
+        while written < words:
+            sentence_words = [rng.choice(WORDS) for _ in range(rng.randint(40, 120))]
+            if rng.random() < 0.2:
+                sentence_words[0] = '**' + sentence_words[0] + '**'
+            paragraphs.append(' '.join(sentence_words).capitalize() + '.')
+            written += len(sentence_words)
+        project['chapters'].append({
+            'id': str(number),
+            'title': f"Chapter Title {number}",
+            'content': ('## Heading\n\n' if number % 3 == 0 else '') + '\n\n'.join(paragraphs),
+            # Skipped chapters keep their place in the numbering
+            'status': 'pending' if number % 7 == 0 else 'completed'
+        })
+    return project
+
+
+def paragraph_signature(paragraph):
+    """Text and effective formatting of a paragraph"""
+    style = paragraph.style
+    alignment = paragraph.alignment if paragraph.alignment is not None else style.paragraph_format.alignment
+    runs = []
+    for run in paragraph.runs:
+        size = run.font.size or style.font.size
+        bold = run.font.bold if run.font.bold is not None else style.font.bold
+        italic = run.font.italic if run.font.italic is not None else style.font.italic
+        pictures = len(run.element.xpath('.//pic:pic'))
+        breaks = len(run.element.xpath('./w:br'))
+        runs.append((run.text, size, bool(bold), bool(italic), pictures, breaks))
+    return (paragraph.text, alignment, style.name if style.name == 'List Number' else None, tuple(runs))
+
+
+def document_signature(path):
+    from docx import Document
+    doc = Document(path)
+    margins = [(s.top_margin, s.bottom_margin, s.left_margin, s.right_margin) for s in doc.sections]
+    return margins, [paragraph_signature(p) for p in doc.paragraphs]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=60, help='chapters per book')
+    parser.add_argument('--words', type=int, default=4000, help='words per chapter')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    from PIL import Image
+    rng = random.Random(args.seed)
+    failures = 0
+    with tempfile.TemporaryDirectory() as directory:
+        docx_export.UPLOAD_FOLDER = directory
+        Image.new('RGB', (2400, 3600), (120, 90, 60)).save(os.path.join(directory, 'cover.jpg'))
+
+        for cover_image in (None, 'cover.jpg', 'missing.png'):
+            project = synthetic_project(rng, 8, 300, cover_image)
+            expected_path = os.path.join(directory, 'expected.docx')
+            actual_path = os.path.join(directory, 'actual.docx')
+            reference_build_project_docx(project, expected_path, directory)
+            build_docx(book_model(project), actual_path)
+            if document_signature(expected_path) != document_signature(actual_path):
+                failures += 1
+                print(f"MISMATCH with cover {cover_image!r}")
+        print(f"parity: {3 - failures}/3 books identical")
+
+        project = synthetic_project(rng, args.chapters, args.words, 'cover.jpg')
+        path = os.path.join(directory, 'book.docx')
+        original = timed(reference_build_project_docx, project, path, directory)
+        original_mb = os.path.getsize(path) / (1024 * 1024)
+        first = timed(build_docx, book_model(project), path)
+        project['chapters'][0]['content'] += '\n\nOne more paragraph.'
+        edited = timed(build_docx, book_model(project), path)
+        unchanged = timed(build_docx, book_model(project), path)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+
+    print(f"{args.chapters} chapters x {args.words} words")
+    print(f"  original:          {original:.2f}s ({original_mb:.1f} MB)")
+    print(f"  first export:      {first:.2f}s ({size_mb:.1f} MB)")
+    print(f"  one chapter edited: {edited:.2f}s")
+    print(f"  unchanged:         {unchanged:.2f}s ({original / unchanged:.1f}x faster)")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Benchmark for text_normalizer.enhance_content_for_kdp
+
+Feeds 100k-word manuscripts through the compiled KDP pipeline and the
+original implementation (kept below as the reference).
+tests/test_text_normalizer.py checks that both give identical output.
+
+Usage: python benchmarks/bench_kdp_formatter.py [--manuscripts N] [--words N] [--seed N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_normalizer import enhance_content_for_kdp  # noqa: E402
+
+
+def reference_enhance_content_for_kdp(content):
+    """The original implementation, kept verbatim as the parity reference"""
+    if not content:
+        return []
+
+    import re
+
+    clean_text = content
+
+    clean_text = re.sub(r'\*\*([^*]+)\*\*', r'\1', clean_text)
+    clean_text = re.sub(r'\*([^*]+)\*', r'\1', clean_text)
+    clean_text = re.sub(r'_([^_]+)_', r'\1', clean_text)
+    clean_text = re.sub(r'`([^`]+)`', r'\1', clean_text)
+    clean_text = re.sub(r'#+\s*', '', clean_text)
+    clean_text = re.sub(r'^\s*[-*+]\s+', '', clean_text, flags=re.MULTILINE)
+
+    lines = clean_text.split('\n')
+    filtered_lines = []
+
+    for line in lines:
+        line = line.strip()
+        if (line and
+            not line.lower().startswith('chapter') and
+            not line.startswith('#') and
+            not re.match(r'^\d+\.?\s*$', line) and
+            len(line) > 20):
+            filtered_lines.append(line)
+
+    full_text = ' '.join(filtered_lines)
+
+    full_text = re.sub(r'\s+', ' ', full_text)
+
+    sentence_endings = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
+    sentences = sentence_endings.split(full_text)
+
+    cleaned_sentences = []
+    for sentence in sentences:
+        sentence = sentence.strip()
+        if len(sentence) > 25:
+            if not sentence.endswith(('.', '!', '?')):
+                sentence += '.'
+            cleaned_sentences.append(sentence)
+
+    paragraphs = []
+    current_paragraph = []
+    current_length = 0
+    target_paragraph_length = 400
+    max_paragraph_length = 600
+
+    for sentence in cleaned_sentences:
+        sentence_length = len(sentence)
+
+        current_paragraph.append(sentence)
+        current_length += sentence_length
+
+        should_end_paragraph = (
+            len(current_paragraph) >= 4 or
+            current_length >= target_paragraph_length or
+            (current_length >= max_paragraph_length)
+        )
+
+        if should_end_paragraph:
+            if current_paragraph:
+                paragraph_text = ' '.join(current_paragraph)
+                paragraph_text = re.sub(r'\s+', ' ', paragraph_text).strip()
+                if len(paragraph_text) > 50:
+                    paragraphs.append(paragraph_text)
+            current_paragraph = []
+            current_length = 0
+
+    if current_paragraph:
+        paragraph_text = ' '.join(current_paragraph)
+        paragraph_text = re.sub(r'\s+', ' ', paragraph_text).strip()
+        if len(paragraph_text) > 50:
+            paragraphs.append(paragraph_text)
+
+    return paragraphs
+
+
+WORDS = ('the author writes about creative work and the tools that shape it '
+         'every chapter explains one idea with examples drawn from practice').split()
+
+
+def synthetic_chapter(rng, words):
+    """A markdown-flavoured chapter: headers, emphasis, lists, code spans, numbers"""
+    lines = [f"# Chapter {rng.randint(1, 30)}: A Title", '']
+    written = 0
+    while written < words:
+        sentence_words = [rng.choice(WORDS) for _ in range(rng.randint(2, 30))]
+        if rng.random() < 0.2:
+            i = rng.randrange(len(sentence_words))
+            marker = rng.choice(['**', '*', '_', '`'])
+            sentence_words[i] = marker + sentence_words[i] + marker
+        sentence = ' '.join(sentence_words).capitalize() + rng.choice('.........!?')
+        roll = rng.random()
+        if roll < 0.05:
+            lines.append(rng.choice('-*+') + ' ' + sentence)
+        elif roll < 0.08:
+            lines.append('## ' + sentence)
+        elif roll < 0.09:
+            lines.append(str(rng.randint(1, 99)) + '.')
+        elif roll < 0.2:
+            lines.append('')
+            lines.append(sentence)
+        elif lines and lines[-1] and rng.random() < 0.5:
+            lines[-1] += '  ' + sentence
+        else:
+            lines.append(sentence)
+        written += len(sentence_words)
+    return '\n'.join(lines)
+
+
+def best_time(fn, manuscripts, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in manuscripts:
+            fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--manuscripts', type=int, default=5, help='manuscripts to time')
+    parser.add_argument('--words', type=int, default=100000, help='words per manuscript')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    manuscripts = [synthetic_chapter(rng, args.words) for _ in range(args.manuscripts)]
+    size_mb = sum(len(content) for content in manuscripts) / 1e6
+    old = best_time(reference_enhance_content_for_kdp, manuscripts)
+    new = best_time(enhance_content_for_kdp, manuscripts)
+    print(f"{args.manuscripts} manuscripts x {args.words} words ({size_mb:.1f} MB)")
+    print(f"  original: {old:.3f}s ({size_mb / old:.1f} MB/s)")
+    print(f"  compiled: {new:.3f}s ({size_mb / new:.1f} MB/s)")
+    print(f"  speedup:  {old / new:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
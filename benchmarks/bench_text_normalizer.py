@@ -0,0 +1,128 @@
+"""
+Micro-benchmark for text_normalizer.clean_chapter_content
+
+Times the compiled normaliser against the original character-loop
+implementation (kept below as the reference) on large synthetic chapters.
+tests/test_text_normalizer.py checks that both give identical output.
+
+Usage: python benchmarks/bench_text_normalizer.py [--chapters N] [--words N] [--seed N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_normalizer import clean_chapter_content  # noqa: E402
+
+
+def reference_clean_chapter_content(content):
+    """The original implementation, kept verbatim as the parity reference"""
+    if not content:
+        return []
+
+    lines = content.split('\n')
+    cleaned_lines = []
+
+    for line in lines:
+        line = line.strip()
+        if (line and
+            not line.startswith('#') and
+            not line.startswith('Chapter') and
+            not line.startswith('CHAPTER') and
+            not line.startswith('hapitre') and
+            not (len(line) > 10 and line.isupper())):
+
+            line = line.replace('**', '').replace('*', '').replace('_', '').replace('##', '').replace('###', '')
+            line = line.strip()
+            if line and len(line) > 10:
+                cleaned_lines.append(line)
+
+    full_text = ' '.join(cleaned_lines)
+
+    sentences = []
+    current_sentence = ""
+
+    for char in full_text:
+        current_sentence += char
+        if char in '.!?' and len(current_sentence.strip()) > 15:
+            sentences.append(current_sentence.strip())
+            current_sentence = ""
+
+    if current_sentence.strip():
+        sentences.append(current_sentence.strip())
+
+    paragraphs = []
+    current_paragraph = []
+
+    for sentence in sentences:
+        if sentence and len(sentence) > 10:
+            current_paragraph.append(sentence)
+            if len(current_paragraph) >= 3:
+                paragraphs.append(' '.join(current_paragraph))
+                current_paragraph = []
+
+    if current_paragraph:
+        paragraphs.append(' '.join(current_paragraph))
+
+    return paragraphs
+
+
+WORDS = ('the author writes about creative work and the tools that shape it '
+         'every chapter explains one idea with examples drawn from practice').split()
+
+
+def synthetic_chapter(rng, words):
+    """A chapter with headers, markdown emphasis, short and long sentences"""
+    lines = [f"# Chapter {rng.randint(1, 30)}", f"Chapter {rng.randint(1, 30)}: A Title", '']
+    written = 0
+    while written < words:
+        sentence_words = [rng.choice(WORDS) for _ in range(rng.randint(2, 25))]
+        if rng.random() < 0.2:
+            i = rng.randrange(len(sentence_words))
+            sentence_words[i] = rng.choice(['**', '*', '_', '##']) + sentence_words[i] + rng.choice(['**', '*', '_', ''])
+        sentence = ' '.join(sentence_words).capitalize() + rng.choice('..........!?')
+        lines.append(sentence if rng.random() < 0.7 else '  ' + sentence + '  ')
+        written += len(sentence_words)
+        roll = rng.random()
+        if roll < 0.1:
+            lines.append('')
+        elif roll < 0.12:
+            lines.append('## ' + ' '.join(rng.choice(WORDS) for _ in range(4)))
+        elif roll < 0.13:
+            lines.append('SHOUTED SECTION TITLE')
+    return '\n'.join(lines)
+
+
+def best_time(fn, chapters, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for content in chapters:
+            fn(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chapters', type=int, default=20, help='synthetic chapters to time')
+    parser.add_argument('--words', type=int, default=20000, help='words per synthetic chapter')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    chapters = [synthetic_chapter(rng, args.words) for _ in range(args.chapters)]
+    size_mb = sum(len(content) for content in chapters) / 1e6
+    old = best_time(reference_clean_chapter_content, chapters)
+    new = best_time(clean_chapter_content, chapters)
+    print(f"{args.chapters} chapters x {args.words} words ({size_mb:.1f} MB)")
+    print(f"  character loop: {old:.3f}s ({size_mb / old:.1f} MB/s)")
+    print(f"  compiled:       {new:.3f}s ({size_mb / new:.1f} MB/s)")
+    print(f"  speedup:        {old / new:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Cached access to config.json
+
+The parsed config is kept in memory and revalidated against the file's
+mtime, size and inode, so a config read costs one stat() instead of an
+open and a JSON parse. Saving through write_config replaces the cache
+immediately. Inside a Flask request every read returns the same snapshot
+(a private copy, so callers may modify it before saving); outside a
+request each read returns a fresh copy.
+"""
+import os
+import copy
+import json
+import tempfile
+import threading
+from flask import g, has_request_context
+
+CONFIG_FILE = 'config.json'
+
+_lock = threading.Lock()
+_cached = None
+_signature = None
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def read_config(path=CONFIG_FILE):
+    """The cached parsed config (shared, do not modify); raises
+    FileNotFoundError when the file does not exist"""
+    global _cached, _signature
+    signature = _file_signature(path)
+    with _lock:
+        if _cached is not None and signature == _signature:
+            return _cached
+
+    with open(path, 'r') as f:
+        config = json.load(f)
+    with _lock:
+        _cached, _signature = config, signature
+    return config
+
+
+def config_snapshot(path=CONFIG_FILE):
+    """A private copy of the config; one per request"""
+    if has_request_context():
+        snapshot = g.get('_config_snapshot')
+        if snapshot is None:
+            snapshot = g._config_snapshot = copy.deepcopy(read_config(path))
+        return snapshot
+    return copy.deepcopy(read_config(path))
+
+
+def write_config(config, path=CONFIG_FILE):
+    """Atomically write the config and refresh the cache"""
+    global _cached, _signature
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix='.config.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(config, f, indent=2)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    with _lock:
+        _cached, _signature = copy.deepcopy(config), _file_signature(path)
+    invalidate_config()
+
+
+def invalidate_config():
+    """Drop the current request's snapshot (the next read takes a new one)"""
+    if has_request_context():
+        g.pop('_config_snapshot', None)
@@ -0,0 +1,155 @@
+"""
+Size-bounded on-disk cache
+
+The storage shared by the response cache (llm_cache) and the rendered PDF
+cache (render_cache): one file per entry under a hash key, an optional
+TTL, and least-recently-used eviction once the cache grows past its size
+cap. An entry's mtime is when it was written (for the TTL) and its atime
+when it was last read (for eviction), so both survive restarts.
+Subclasses set the file suffix and how values are stored.
+"""
+import os
+import time
+import threading
+
+
+class DiskCache:
+    """On-disk cache with optional TTL and size-bounded LRU eviction"""
+
+    suffix = ''
+
+    def __init__(self, directory, max_bytes, ttl=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        os.makedirs(directory, exist_ok=True)
+
+    def encode(self, value):
+        """Bytes stored for value"""
+        return value
+
+    def decode(self, data):
+        """Value of stored bytes; raises ValueError for an unreadable entry"""
+        return data
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}{self.suffix}")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(self.suffix):
+                    yield os.path.join(root, name)
+
+    def _current_size(self):
+        if self._total_bytes is None:
+            self._total_bytes = sum(os.path.getsize(path) for path in self._entries())
+        return self._total_bytes
+
+    def get(self, key):
+        """Cached value for key, or None on a miss or expired entry"""
+        path = self.path(key)
+        value = None
+        try:
+            stat = os.stat(path)
+            if self.ttl is not None and time.time() - stat.st_mtime > self.ttl:
+                self._remove(path)
+            else:
+                with open(path, 'rb') as f:
+                    value = self.decode(f.read())
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            self._remove(path)
+
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))  # mark as recently used
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        data = self.encode(value)
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._current_size()  # the first walk already counts this entry
+            else:
+                self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def _evict(self):
+        """Drop least recently used entries until under 90% of the cap (lock held)"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def clear(self):
+        for path in list(self._entries()):
+            self._remove(path)
+        with self._lock:
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'enabled': True,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'evictions': self.evictions,
+                'bytes': self._current_size(),
+                'max_bytes': self.max_bytes
+            }
+            if self.ttl is not None:
+                stats['ttl_seconds'] = self.ttl
+            return stats
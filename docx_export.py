@@ -0,0 +1,295 @@
+"""
+DOCX export engine
+
+Project and standalone books are exported by one builder, build_docx(),
+from a normalised book model (book_model() / standalone_book_model()).
+The parts of an export that rarely change are prepared once per process
+and reused:
+- a template document with the page margins and the book's paragraph
+  styles, loaded for every export instead of styling each run again
+- the cover image, scaled down to the printed width and kept encoded in
+  memory, keyed by file, size and mtime
+- each chapter's rendered paragraphs (heading, text, page break), kept in
+  an LRU keyed by a hash of the chapter's number, title and content, so
+  an export only renders the chapters that changed since the last one
+
+Builds run in the export worker processes, and each book always goes to
+the same worker (see export_service), so its chapters are found again.
+
+Tunables (environment variables):
+- DOCX_CHAPTER_CACHE_SIZE: rendered chapters kept in memory (default 512)
+"""
+import io
+import os
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+DOCX_CHAPTER_CACHE_SIZE = int(os.environ.get("DOCX_CHAPTER_CACHE_SIZE", 512))
+
+UPLOAD_FOLDER = 'static/uploads'
+
+COVER_WIDTH_INCHES = 6
+# Covers are scaled down to this many pixels per inch of printed width
+COVER_DPI = 300
+COVER_CACHE_SIZE = 16
+
+# Paragraph styles of the template: name -> (alignment, size in pt, bold, italic)
+STYLES = {
+    'Cover Image': ('center', None, False, False),
+    'Cover Title': ('center', 24, True, False),
+    'Cover Subtitle': ('center', 16, False, True),
+    'Cover Meta': ('center', 12, False, False),
+    'Cover Author': ('center', 14, False, True),
+    'Contents Heading': (None, 18, True, False),
+    'Chapter Heading': (None, 16, True, False),
+    'Chapter Text': ('justify', None, False, False),
+}
+
+_lock = threading.Lock()
+_template = None  # bytes of the pre-styled empty document
+_style_ids = {}  # style name -> style id in the template
+_covers = OrderedDict()  # (path, size, mtime_ns) -> prepared image bytes, or None
+_chapters = OrderedDict()  # hash of (number, title, content) -> rendered body elements
+_hits = 0
+_misses = 0
+
+
+def book_model(project):
+    """Book model of a project; only completed chapters are exported, under
+    their number in the project"""
+    chapters = project.get('chapters', [])
+    return {
+        'title': project['name'],
+        'subtitle': project.get('topic', ''),
+        'language': project.get('language', 'English'),
+        'author_bio': project.get('author_bio', ''),
+        'cover_image': project.get('cover_image'),
+        'chapter_count': len(chapters),
+        'chapters': [{'number': i, 'title': chapter['title'], 'content': chapter['content']}
+                     for i, chapter in enumerate(chapters, 1)
+                     if chapter.get('status') == 'completed' and chapter.get('content')]
+    }
+
+
+def standalone_book_model(book_data):
+    """Book model of a standalone book"""
+    chapters = book_data.get('chapters', [])
+    return {
+        'title': book_data['title'],
+        'subtitle': book_data.get('description', ''),
+        'language': book_data.get('language', 'English'),
+        'author_bio': book_data.get('authorBio', ''),
+        'cover_image': book_data.get('cover_image'),
+        'chapter_count': len(chapters),
+        'chapters': [{'number': i, 'title': chapter['title'], 'content': chapter.get('content', '')}
+                     for i, chapter in enumerate(chapters, 1)]
+    }
+
+
+def _template_bytes():
+    """The empty document every export starts from: margins and styles set"""
+    global _template
+    with _lock:
+        if _template is not None:
+            return _template
+
+    from docx import Document
+    from docx.enum.style import WD_STYLE_TYPE
+    from docx.enum.text import WD_ALIGN_PARAGRAPH
+    from docx.shared import Inches, Pt
+
+    doc = Document()
+    for section in doc.sections:
+        section.top_margin = Inches(0.5)
+        section.bottom_margin = Inches(0.5)
+        section.left_margin = Inches(0.5)
+        section.right_margin = Inches(0.5)
+
+    alignments = {'center': WD_ALIGN_PARAGRAPH.CENTER, 'justify': WD_ALIGN_PARAGRAPH.JUSTIFY}
+    style_ids = {'List Number': doc.styles['List Number'].style_id}
+    for name, (alignment, size, bold, italic) in STYLES.items():
+        style = doc.styles.add_style(name, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = doc.styles['Normal']
+        if alignment:
+            style.paragraph_format.alignment = alignments[alignment]
+        if size:
+            style.font.size = Pt(size)
+        if bold:
+            style.font.bold = True
+        if italic:
+            style.font.italic = True
+        style_ids[name] = style.style_id
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    with _lock:
+        _style_ids.update(style_ids)
+        _template = buffer.getvalue()
+        return _template
+
+
+def _add_paragraph(doc, text='', style=None):
+    """doc.add_paragraph() with the style set by id: python-docx looks a
+    style name up by scanning every style, which dominates large builds"""
+    paragraph = doc.add_paragraph(text)
+    if style:
+        paragraph._p.style = _style_ids[style]
+    return paragraph
+
+
+def _prepare_cover(path):
+    """Cover image bytes at most COVER_DPI over the printed width, as PNG or
+    JPEG (which every Word version reads), or None if it cannot be read"""
+    from PIL import Image
+    try:
+        with Image.open(path) as image:
+            image.load()
+            max_width = COVER_WIDTH_INCHES * COVER_DPI
+            if image.format in ('JPEG', 'PNG') and image.width <= max_width:
+                with open(path, 'rb') as f:
+                    return f.read()
+            if image.width > max_width:
+                image = image.resize((max_width, max(1, round(image.height * max_width / image.width))),
+                                     Image.LANCZOS)
+            buffer = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image.save(buffer, 'PNG', optimize=True)
+            else:
+                image.convert('RGB').save(buffer, 'JPEG', quality=90)
+            return buffer.getvalue()
+    except Exception as e:
+        logging.error(f"Error preparing cover image {path}: {e}")
+        return None
+
+
+def _cover_bytes(cover_image):
+    """Prepared cover image, from memory unless the file changed"""
+    if not cover_image:
+        return None
+    path = os.path.join(UPLOAD_FOLDER, cover_image)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _lock:
+        if key in _covers:
+            _covers.move_to_end(key)
+            return _covers[key]
+
+    data = _prepare_cover(path)
+    with _lock:
+        _covers[key] = data
+        while len(_covers) > COVER_CACHE_SIZE:
+            _covers.popitem(last=False)
+    return data
+
+
+def _chapter_key(chapter):
+    text = f"{chapter['number']}\0{chapter['title']}\0{chapter['content']}"
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _add_chapter(doc, chapter):
+    """Render a chapter at the end of doc"""
+    _add_paragraph(doc, f"Chapter {chapter['number']}: {chapter['title']}", 'Chapter Heading')
+    doc.add_paragraph()
+
+    # Clean markdown formatting
+    content = chapter['content'].replace('**', '').replace('*', '').replace('#', '')
+    for paragraph_text in content.split('\n\n'):
+        paragraph_text = paragraph_text.strip()
+        if paragraph_text:
+            _add_paragraph(doc, paragraph_text, 'Chapter Text')
+
+    doc.add_page_break()
+
+
+def _append_chapter(doc, chapter):
+    """Append a chapter's body elements to doc, rendering it only if it is
+    not in the chapter cache"""
+    global _hits, _misses
+    body = doc.element.body
+    end = body.sectPr  # section properties stay the last child of the body
+    key = _chapter_key(chapter)
+    with _lock:
+        elements = _chapters.get(key)
+        if elements is not None:
+            _chapters.move_to_end(key)
+            _hits += 1
+        else:
+            _misses += 1
+
+    if elements is not None:
+        for element in elements:
+            end.addprevious(copy.deepcopy(element))
+        return
+
+    start = len(body) - 1
+    _add_chapter(doc, chapter)
+    elements = tuple(copy.deepcopy(element) for element in body[start:len(body) - 1])
+    with _lock:
+        _chapters[key] = elements
+        while len(_chapters) > DOCX_CHAPTER_CACHE_SIZE:
+            _chapters.popitem(last=False)
+
+
+def build_docx(book, docx_path):
+    """Write a book model as a DOCX file"""
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document(io.BytesIO(_template_bytes()))
+
+    # Cover page with image if available
+    cover = _cover_bytes(book.get('cover_image'))
+    if cover:
+        cover_paragraph = _add_paragraph(doc, style='Cover Image')
+        try:
+            cover_paragraph.add_run().add_picture(io.BytesIO(cover), width=Inches(COVER_WIDTH_INCHES))
+        except Exception as e:
+            # If image fails, fall back to text cover
+            logging.error(f"Error adding cover image to DOCX: {e}")
+
+    doc.add_paragraph()  # Space
+    _add_paragraph(doc, book['title'], 'Cover Title')
+    if book.get('subtitle'):
+        _add_paragraph(doc, book['subtitle'], 'Cover Subtitle')
+    doc.add_paragraph()
+
+    _add_paragraph(doc, f"Generated with BookGenPro\nLanguage: {book.get('language', 'English')}\n"
+                        f"{book['chapter_count']} Chapters", 'Cover Meta')
+
+    if book.get('author_bio'):
+        doc.add_paragraph()
+        _add_paragraph(doc, f"By: {book['author_bio']}", 'Cover Author')
+
+    doc.add_page_break()
+
+    # Table of contents
+    _add_paragraph(doc, "Table of Contents", 'Contents Heading')
+    doc.add_paragraph()
+    for chapter in book['chapters']:
+        _add_paragraph(doc, f"Chapter {chapter['number']}: {chapter['title']}", 'List Number')
+    doc.add_page_break()
+
+    for chapter in book['chapters']:
+        _append_chapter(doc, chapter)
+
+    doc.save(docx_path)
+
+
+def docx_cache_stats():
+    with _lock:
+        lookups = _hits + _misses
+        return {
+            'chapters': len(_chapters),
+            'max_chapters': DOCX_CHAPTER_CACHE_SIZE,
+            'covers': len(_covers),
+            'hits': _hits,
+            'misses': _misses,
+            'hit_rate': round(_hits / lookups, 3) if lookups else 0
+        }
@@ -0,0 +1,159 @@
+"""
+Export rendering in worker processes
+
+WeasyPrint layout and DOCX building are CPU-bound and hold the GIL, so a
+render running in a web worker stalls every other request it serves. The
+renders here run in a pool of worker processes instead; the web process
+only cleans the chapters, submits the work and waits for the file.
+
+Each worker process is a single-worker pool, and every book is always sent
+to the same process (chosen from a hash of its id), so the laid-out parts
+that pdf_assembly keeps in memory are found again on the next export of
+that book (and the DOCX chapters docx_export keeps). Different books
+spread over all processes and use every core.
+
+Workers are started from a fork server rather than forked from the web
+process: the web process runs job, heartbeat and request threads, and a
+fork taken while one of them holds a lock (logging's, the import lock, a
+cache's) leaves the child deadlocked on it. The fork server is a fresh,
+single-threaded process that imports the export modules once and forks
+each worker from there. A worker imports the main module again as
+__mp_main__, so the entry points keep the dev server behind
+`if __name__ == '__main__'` and start no job workers on import (see
+gunicorn.conf.py). The code that runs in a worker imports nothing from
+app.py; templates are rendered with a minimal Flask
+app that only knows the template folder and static files. A new worker
+loads the fonts and the DOCX template before its first export.
+
+Tunables (environment variables):
+- EXPORT_PROCESSES: worker processes (default: number of CPUs)
+"""
+import os
+import zlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pdf_resources import LOCAL_BASE_URL, url_fetcher, font_config
+
+EXPORT_PROCESSES = max(1, int(os.environ.get("EXPORT_PROCESSES", os.cpu_count() or 1)))
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Imported once by the fork server, so each worker starts with them loaded
+WORKER_MODULES = ['export_service', 'pdf_assembly', 'docx_export']
+
+_pools = {}  # slot -> single-process executor
+_pools_lock = threading.Lock()
+_context = None
+
+
+def _mp_context():
+    global _context
+    if _context is None:
+        _context = multiprocessing.get_context('forkserver')
+        _context.set_forkserver_preload(WORKER_MODULES)
+    return _context
+
+
+def _pool(slot):
+    with _pools_lock:
+        pool = _pools.get(slot)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=1, mp_context=_mp_context(),
+                                       initializer=_warm_worker)
+            _pools[slot] = pool
+        return pool
+
+
+def run_export(affinity, fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) in the worker process for affinity (a book id
+    or title) and return its result. fn must be a module-level function."""
+    slot = zlib.crc32(str(affinity).encode('utf-8')) % EXPORT_PROCESSES
+    try:
+        return _pool(slot).submit(fn, *args, **kwargs).result()
+    except BrokenProcessPool:
+        # The worker died (e.g. out of memory); start a fresh one next time
+        logging.error(f"Export worker {slot} died; restarting it")
+        with _pools_lock:
+            _pools.pop(slot, None)
+        raise
+
+
+def _worker_cache_stats():
+    from pdf_assembly import part_cache_stats
+    from docx_export import docx_cache_stats
+    return dict(part_cache_stats(), docx=docx_cache_stats())
+
+
+def export_part_cache_stats():
+    """pdf_assembly's part cache and docx_export's chapter cache statistics
+    from each started worker"""
+    with _pools_lock:
+        pools = sorted(_pools.items())
+    stats = {}
+    for slot, pool in pools:
+        try:
+            stats[slot] = pool.submit(_worker_cache_stats).result(timeout=5)
+        except Exception as e:
+            stats[slot] = {'error': str(e)}
+    return {'processes': EXPORT_PROCESSES, 'workers': stats}
+
+
+# ===== Runs in the worker processes =====
+
+_template_app = None
+
+
+def _warm_worker():
+    """Load what every export needs before the worker takes its first one"""
+    try:
+        url_fetcher()
+        font_config()
+        from docx_export import _template_bytes
+        _template_bytes()
+        _templates()
+    except Exception as e:
+        # The first export loads whatever failed here, or reports the error
+        logging.warning(f"Could not warm export worker {os.getpid()}: {e}")
+
+
+def _templates():
+    """Flask app used to render export templates in a worker"""
+    global _template_app
+    if _template_app is None:
+        from flask import Flask
+        _template_app = Flask('bookgenpro_exports', root_path=PACKAGE_DIR)
+    return _template_app
+
+
+def _render_template(template, base_url, **context):
+    from flask import render_template
+    with _templates().test_request_context(base_url=base_url):
+        return render_template(template, **context)
+
+
+def render_book(template, project, base_url=None, **pdf_options):
+    """PDF of a prepared project (chapters already cleaned), laid out part by
+    part so that unchanged chapters are reused from earlier renders"""
+    from pdf_assembly import render_book_pdf
+    # /static/ URLs (fonts, cover) are served from disk by pdf_resources
+    base_url = base_url or LOCAL_BASE_URL
+
+    def render_part(part, **context):
+        return _render_template(template, base_url, project=project, part=part, **context)
+
+    has_bio = bool(project.get('author_bio') and project['author_bio'].strip())
+    return render_book_pdf(render_part, project.get('chapters', []), has_bio,
+                           base_url=base_url, **pdf_options)
+
+
+def render_standalone_pdf(book_data, base_url=None):
+    """PDF of a standalone book, laid out in one pass"""
+    import weasyprint
+    base_url = base_url or LOCAL_BASE_URL
+    html_content = _render_template('book_export.html', base_url, project=book_data)
+    return weasyprint.HTML(string=html_content, base_url=base_url,
+                           url_fetcher=url_fetcher()).write_pdf(font_config=font_config())
+
@@ -0,0 +1,287 @@
+"""
+Content-addressed storage for exported books
+
+Exported files are stored once per content under exports/blobs/, named by
+the SHA-256 of their bytes, so exporting an unchanged book again adds no
+file. A small JSON manifest (exports/manifest.json) maps each export -
+project, project revision (a hash of its content) and format - to its blob,
+together with the download name and when it was created and last
+downloaded.
+
+Exports that were not downloaded for EXPORT_RETENTION_DAYS are dropped, and
+once the blobs grow past EXPORT_MAX_MB the least recently used exports are
+dropped until the store is under 90% of the cap; the export being stored is
+never one of them, so an export larger than the cap is still kept until the
+next one arrives. Sizes come from the
+manifest, so none of this reads the blob folder. A blob is deleted when
+the last export that refers to it is dropped. Downloads get the blob as a
+file opened under the manifest lock, so deleting it afterwards does not cut
+a download short. The manifest is guarded by an flock, so several worker
+processes can share the folder.
+
+Tunables (environment variables):
+- EXPORT_MAX_MB: size cap of the stored exports in megabytes (default 1000)
+- EXPORT_RETENTION_DAYS: days an export is kept after its last use
+  (default 30, 0 keeps exports until the size cap evicts them)
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; locking is then per process only
+    fcntl = None
+
+EXPORT_MAX_BYTES = int(float(os.environ.get("EXPORT_MAX_MB", 1000)) * 1024 * 1024)
+EXPORT_RETENTION = float(os.environ.get("EXPORT_RETENTION_DAYS", 30)) * 24 * 3600
+
+
+def export_key(project_id, revision, export):
+    """Manifest key of one export of one revision of a book"""
+    return f"{project_id or 'standalone'}:{revision}:{export}"
+
+
+class ExportStore:
+    """Exported files stored by content hash, with a manifest and LRU retention"""
+
+    def __init__(self, directory, max_bytes, retention):
+        self.directory = directory
+        self.blob_directory = os.path.join(directory, 'blobs')
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_directory, exist_ok=True)
+
+    def blob_path(self, blob, ext):
+        return os.path.join(self.blob_directory, blob[:2], f"{blob}.{ext}")
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive access to the manifest across threads and worker processes"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, '.manifest.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            logging.error(f"Export manifest is corrupt, starting a new one: {e}")
+            return {}
+
+    def _save(self, manifest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, separators=(',', ':'))
+        os.replace(tmp_path, self.manifest_path)
+
+    def put_file(self, path, ext, download_name, key):
+        """Move the file at path into the store as the export called key and
+        return its manifest entry. Identical content is kept once."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        blob = digest.hexdigest()
+        size = os.path.getsize(path)
+        now = time.time()
+
+        with self._locked():
+            blob_path = self.blob_path(blob, ext)
+            if os.path.exists(blob_path):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                os.replace(path, blob_path)
+
+            manifest = self._load()
+            entry = {
+                'blob': blob,
+                'ext': ext,
+                'size': size,
+                'download_name': download_name,
+                'created_at': now,
+                'accessed_at': now
+            }
+            manifest[key] = entry
+            self._cleanup(manifest, now, keep=key)
+            self._save(manifest)
+        return entry
+
+    def put(self, data, ext, download_name, key):
+        """Store exported bytes; see put_file"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=f'.{ext}.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return self.put_file(tmp_path, ext, download_name, key)
+
+    def temp_path(self, ext):
+        """A path in the store's folder for a worker to write an export to
+        before it is handed to put_file"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=f'.{ext}.tmp')
+        os.close(fd)
+        return tmp_path
+
+    def exists(self, key):
+        """Whether the export called key is stored"""
+        with self._locked():
+            entry = self._load().get(key)
+        return entry is not None and os.path.exists(self.blob_path(entry['blob'], entry['ext']))
+
+    def open(self, key, touch=True):
+        """(open binary file, download name) of a stored export, or (None, None)
+        if it was never stored or has been evicted. The caller closes the
+        file; it stays readable if the export is evicted meanwhile. touch
+        marks the export as recently used."""
+        with self._locked():
+            manifest = self._load()
+            entry = manifest.get(key)
+            if entry is None:
+                return None, None
+            try:
+                f = open(self.blob_path(entry['blob'], entry['ext']), 'rb')
+            except FileNotFoundError:
+                del manifest[key]
+                self._save(manifest)
+                return None, None
+            if touch:
+                entry['accessed_at'] = time.time()
+                self._save(manifest)
+        return f, entry['download_name']
+
+    def _cleanup(self, manifest, now, keep=None):
+        """Drop expired and least recently used exports, except keep, and
+        delete the blobs no export refers to any more (lock held)"""
+        references = {}
+        for entry in manifest.values():
+            blob = (entry['blob'], entry['ext'])
+            references[blob] = references.get(blob, 0) + 1
+        blob_sizes = {(entry['blob'], entry['ext']): entry['size'] for entry in manifest.values()}
+        total = sum(blob_sizes.values())
+
+        def drop(key):
+            nonlocal total
+            entry = manifest.pop(key)
+            self.evictions += 1
+            blob = (entry['blob'], entry['ext'])
+            references[blob] -= 1
+            if references[blob] == 0:
+                total -= blob_sizes.pop(blob)
+                try:
+                    os.remove(self.blob_path(*blob))
+                except OSError:
+                    pass
+
+        if self.retention > 0:
+            for key in [key for key, entry in manifest.items()
+                        if now - entry['accessed_at'] > self.retention]:
+                drop(key)
+
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9)
+            for key, _ in sorted(manifest.items(), key=lambda item: item[1]['accessed_at']):
+                if total <= target:
+                    break
+                if key != keep:
+                    drop(key)
+
+    def _remove_orphans(self, manifest):
+        """Delete blob files no export refers to, e.g. left by a crash between
+        storing a blob and saving the manifest (lock held)"""
+        blobs = {(entry['blob'], entry['ext']) for entry in manifest.values()}
+        for root, _, files in os.walk(self.blob_directory, topdown=False):
+            for name in files:
+                blob, _, ext = name.partition('.')
+                if (blob, ext) not in blobs:
+                    try:
+                        os.remove(os.path.join(root, name))
+                    except OSError:
+                        pass
+            if root != self.blob_directory:
+                try:
+                    os.rmdir(root)  # only succeeds once the shard is empty
+                except OSError:
+                    pass
+
+    def prune(self):
+        """Apply the retention policy and size cap now, and delete blob files
+        no export refers to"""
+        with self._locked():
+            manifest = self._load()
+            self._cleanup(manifest, time.time())
+            self._save(manifest)
+            self._remove_orphans(manifest)
+
+    def import_files(self):
+        """Move timestamped exports written before the store existed into it;
+        their retention period starts now"""
+        imported = 0
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            base, ext = os.path.splitext(name)
+            ext = ext[1:].lower()
+            if not os.path.isfile(path) or ext not in ('pdf', 'docx'):
+                continue
+            self.put_file(path, ext, name, f"legacy:{base}:{ext}")
+            imported += 1
+        return imported
+
+    def stats(self):
+        with self._locked():
+            manifest = self._load()
+        blobs = {(entry['blob'], entry['ext']): entry['size'] for entry in manifest.values()}
+        return {
+            'exports': len(manifest),
+            'files': len(blobs),
+            'bytes': sum(blobs.values()),
+            'max_bytes': self.max_bytes,
+            'retention_days': self.retention / (24 * 3600),
+            'evictions': self.evictions
+        }
+
+
+_store = None
+
+
+def init_exports(app, directory):
+    """Open the export store in directory and register its CLI commands"""
+    global _store
+    _store = ExportStore(directory, EXPORT_MAX_BYTES, EXPORT_RETENTION)
+
+    @app.cli.command('import-exports')
+    def import_exports_command():
+        """Move timestamped files in the exports folder into the export store."""
+        imported = _store.import_files()
+        print(f"Imported {imported} exports; store: {_store.stats()}")
+
+    @app.cli.command('prune-exports')
+    def prune_exports_command():
+        """Drop exports past the retention period or over the size cap."""
+        _store.prune()
+        print(f"Export store: {_store.stats()}")
+
+
+def get_export_store():
+    return _store
+
+
+def export_store_stats():
+    return _store.stats() if _store else {}
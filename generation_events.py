@@ -0,0 +1,118 @@
+"""
+Live events for BookGenPro
+
+An in-process event bus. Background generation publishes chapter tokens and
+status changes on the project's channel; library changes and AI provider
+status changes go to the global channel. Each browser tab holds one
+Server-Sent Events stream that listens on the global channel and, on a
+project page, on that project's channel too, so text shows up as the AI
+provider produces it and nothing needs to poll. Streams
+last at most STREAM_MAX_AGE seconds, and subscribers that fall too far
+behind are dropped; either way their EventSource reconnects and starts
+again from a fresh snapshot.
+
+Tunables (environment variables):
+- STREAM_SAVE_INTERVAL: seconds between saves of partial chapter text (default 5)
+- STREAM_KEEPALIVE: seconds between state checks on an idle stream (default 5)
+- LONG_POLL_TIMEOUT: seconds a long-poll request waits for a change (default 25)
+- STREAM_MAX_AGE: seconds an event stream stays open before the server ends
+  it; the browser reconnects and gets a fresh snapshot (default 300)
+"""
+import os
+import json
+import queue
+import threading
+
+STREAM_SAVE_INTERVAL = float(os.environ.get("STREAM_SAVE_INTERVAL", 5))
+STREAM_KEEPALIVE = float(os.environ.get("STREAM_KEEPALIVE", 5))
+LONG_POLL_TIMEOUT = float(os.environ.get("LONG_POLL_TIMEOUT", 25))
+STREAM_MAX_AGE = float(os.environ.get("STREAM_MAX_AGE", 300))
+SUBSCRIBER_QUEUE_SIZE = 2000
+
+# Channel for events every tab receives ('library', 'ai_status')
+GLOBAL_CHANNEL = '*'
+
+_lock = threading.Lock()
+_subscribers = {}  # channel -> set of queues
+_channels = {}     # queue -> channels it listens on
+_partials = {}     # project_id -> {chapter_id: text streamed so far}
+
+
+def subscribe(*channels):
+    """Register one listener on the given channels (project ids or
+    GLOBAL_CHANNEL) and return its queue"""
+    events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    with _lock:
+        _channels[events] = channels
+        for channel in channels:
+            _subscribers.setdefault(channel, set()).add(events)
+    return events
+
+
+def unsubscribe(events):
+    """Remove a listener from all of its channels"""
+    with _lock:
+        for channel in _channels.pop(events, ()):
+            listeners = _subscribers.get(channel)
+            if listeners:
+                listeners.discard(events)
+                if not listeners:
+                    del _subscribers[channel]
+
+
+def is_subscribed(events):
+    with _lock:
+        return events in _channels
+
+
+def publish(channel, event, data):
+    """Send an event to every listener of the channel"""
+    with _lock:
+        listeners = list(_subscribers.get(channel, ()))
+    for events in listeners:
+        try:
+            events.put_nowait((event, data))
+        except queue.Full:
+            unsubscribe(events)
+
+
+def publish_global(event, data):
+    """Send an event to every open tab"""
+    publish(GLOBAL_CHANNEL, event, data)
+
+
+def append_partial(project_id, chapter_id, delta):
+    """Record a streamed chunk of chapter text and forward it to listeners"""
+    with _lock:
+        chapters = _partials.setdefault(project_id, {})
+        chapters[chapter_id] = chapters.get(chapter_id, '') + delta
+    publish(project_id, 'token', {'chapter_id': chapter_id, 'text': delta})
+
+
+def reset_partial(project_id, chapter_id):
+    """Drop the text streamed so far for a chapter (the attempt that produced
+    it failed and another model starts over) and tell listeners"""
+    with _lock:
+        chapters = _partials.get(project_id)
+        if chapters:
+            chapters.pop(chapter_id, None)
+    publish(project_id, 'reset', {'chapter_id': chapter_id})
+
+
+def finish_partial(project_id, chapter_id):
+    with _lock:
+        chapters = _partials.get(project_id)
+        if chapters:
+            chapters.pop(chapter_id, None)
+            if not chapters:
+                del _partials[project_id]
+
+
+def partial_texts(project_id):
+    """Text streamed so far for chapters still being written"""
+    with _lock:
+        return dict(_partials.get(project_id, {}))
+
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,24 @@
+"""
+Gunicorn settings for BookGenPro (read from the working directory by
+`gunicorn main:app`)
+
+Requests are served by threads (the gthread worker) rather than one sync
+worker: every browser tab keeps its /api/events stream open, and a
+single sync worker would block every other request while one tab is open.
+
+Background job workers are started here, in each server worker process
+after it is forked, rather than when app.py is imported: `flask` CLI
+commands and scripts that import the app must not claim queued jobs.
+
+Tunables (environment variables):
+- GUNICORN_THREADS: request threads per worker process (default 32)
+"""
+import os
+
+worker_class = 'gthread'
+threads = int(os.environ.get("GUNICORN_THREADS", 32))
+
+
+def post_fork(server, worker):
+    from app import start_background_workers
+    start_background_workers()
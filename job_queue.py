@@ -0,0 +1,391 @@
+"""
+Background job queue for BookGenPro
+
+Long-running work (chapter generation, regeneration, standalone books) is
+recorded as a row in the jobs table and executed by a fixed pool of worker
+threads instead of one daemon thread per request. Jobs survive restarts:
+a running job whose heartbeat stops (the process died) is queued again,
+or marked failed if its kind cannot be resumed. A queued job pinned to one
+process is kept alive by that process's heartbeat too, and is failed once
+the process is gone, since no other process can run it. Every gunicorn worker runs
+its own pool; claiming a job is an atomic UPDATE so each job runs once.
+Job kinds can be given their own named queue with separate worker threads,
+so short interactive jobs (exports) do not wait behind long generations.
+
+Tunables (environment variables):
+- JOB_WORKERS: worker threads per process (default 4, 0 disables workers)
+- JOB_POLL_INTERVAL: seconds between queue polls (default 2)
+- JOB_HEARTBEAT: seconds between heartbeats of running jobs (default 15)
+- JOB_STALE_AFTER: seconds without heartbeat before a job is recovered (default 60)
+- JOB_MAX_ATTEMPTS: runs before a repeatedly interrupted job fails (default 3)
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
+from project_store import db
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 4))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 2))
+JOB_HEARTBEAT = float(os.environ.get("JOB_HEARTBEAT", 15))
+JOB_STALE_AFTER = float(os.environ.get("JOB_STALE_AFTER", 60))
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+# Identifies this process as a job owner
+PROCESS_TOKEN = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobRecord(db.Model):
+    """One queued, running or finished background job"""
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(64), primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    project_id = db.Column(db.String(64), index=True)
+    payload = db.Column(db.Text)
+    status = db.Column(db.String(16), index=True, nullable=False, default='queued')
+    # Jobs whose state lives in process memory must run in the process that queued them
+    pinned_to = db.Column(db.String(128))
+    owner = db.Column(db.String(128))
+    attempts = db.Column(db.Integer, default=0)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    error = db.Column(db.Text)
+    progress = db.Column(db.Integer, default=0)
+    result = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'project_id': self.project_id,
+            'status': self.status,
+            'attempts': self.attempts,
+            'cancel_requested': bool(self.cancel_requested),
+            'error': self.error,
+            'progress': self.progress or 0,
+            'result': json.loads(self.result) if self.result else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+class Job:
+    """Handle given to a running job's handler"""
+
+    def __init__(self, job_id, kind, project_id, payload, attempts):
+        self.id = job_id
+        self.kind = kind
+        self.project_id = project_id
+        self.payload = payload
+        self.attempts = attempts
+        self._cancel = threading.Event()
+        self._checked_at = 0
+
+    def cancelled(self):
+        """True once cancellation was requested (by any process)"""
+        if self._cancel.is_set():
+            return True
+        if time.monotonic() - self._checked_at >= JOB_POLL_INTERVAL:
+            self._checked_at = time.monotonic()
+            with _app.app_context():
+                record = db.session.get(JobRecord, self.id)
+                if record is None or record.cancel_requested:
+                    self._cancel.set()
+        return self._cancel.is_set()
+
+    def report(self, progress, result=None):
+        """Record progress (0-100) and optionally a JSON-serialisable result"""
+        values = {'progress': progress}
+        if result is not None:
+            values['result'] = json.dumps(result)
+        with _app.app_context():
+            JobRecord.query.filter_by(id=self.id).update(values, synchronize_session=False)
+            db.session.commit()
+
+
+_app = None
+_handlers = {}       # kind -> (handler, resumable, local, on_abandon, queue)
+_running = {}        # job id -> Job, for jobs running in this process
+_running_lock = threading.Lock()
+_wakeup = threading.Condition()
+_current = threading.local()
+_started = False
+
+
+def register_job_handler(kind, handler, resumable=True, local=False, on_abandon=None,
+                         queue='default'):
+    """Run handler(job, **payload) for jobs of this kind.
+
+    resumable: the job may be started again after a restart interrupted it.
+    local: the job's state lives in this process, so it never runs elsewhere
+    (and is failed rather than resumed after a restart).
+    on_abandon(project_id, error): called when an interrupted job is failed
+    instead of resumed, e.g. to clear a project's 'generating' status.
+    queue: the worker pool that runs the job (see start_job_workers).
+    """
+    _handlers[kind] = (handler, resumable, local, on_abandon, queue)
+
+
+def current_job():
+    """The Job being run by this thread, or None outside the job queue"""
+    return getattr(_current, 'job', None)
+
+
+def _add_missing_columns():
+    """create_all() does not alter existing tables; add columns introduced since"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('jobs')}
+    with db.engine.begin() as connection:
+        if 'progress' not in columns:
+            connection.execute(text('ALTER TABLE jobs ADD COLUMN progress INTEGER DEFAULT 0'))
+        if 'result' not in columns:
+            connection.execute(text('ALTER TABLE jobs ADD COLUMN result TEXT'))
+
+
+def init_jobs(app):
+    """Create the jobs table; call after init_store"""
+    global _app
+    _app = app
+    with app.app_context():
+        db.create_all()
+        _add_missing_columns()
+
+
+def enqueue_job(kind, project_id=None, **payload):
+    """Queue a job and return its id"""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    local = _handlers[kind][2]
+    job_id = str(uuid.uuid4())
+    with _app.app_context():
+        db.session.add(JobRecord(
+            id=job_id,
+            kind=kind,
+            project_id=project_id,
+            payload=json.dumps(payload),
+            status='queued',
+            pinned_to=PROCESS_TOKEN if local else None,
+            heartbeat_at=datetime.utcnow() if local else None
+        ))
+        db.session.commit()
+    with _wakeup:
+        _wakeup.notify_all()
+    return job_id
+
+
+def get_job(job_id):
+    with _app.app_context():
+        record = db.session.get(JobRecord, job_id)
+        return record.to_dict() if record else None
+
+
+def list_jobs(project_id=None, active_only=False, limit=50):
+    with _app.app_context():
+        query = JobRecord.query
+        if project_id:
+            query = query.filter_by(project_id=project_id)
+        if active_only:
+            query = query.filter(JobRecord.status.in_(('queued', 'running')))
+        query = query.order_by(JobRecord.created_at.desc()).limit(limit)
+        return [record.to_dict() for record in query.all()]
+
+
+def cancel_job(job_id):
+    """Request cancellation. Queued jobs are cancelled at once; running jobs
+    stop at their next checkpoint. Returns False if the job is unknown or
+    already finished."""
+    with _app.app_context():
+        record = db.session.get(JobRecord, job_id)
+        if record is None or record.status in FINISHED_STATES:
+            return False
+        record.cancel_requested = True
+        if record.status == 'queued':
+            record.status = 'cancelled'
+            record.finished_at = datetime.utcnow()
+        db.session.commit()
+    with _running_lock:
+        job = _running.get(job_id)
+    if job is not None:
+        job._cancel.set()
+    return True
+
+
+def _claim_next(queue='default'):
+    """Atomically move the oldest runnable queued job of this queue to running"""
+    kinds = [kind for kind, handler in _handlers.items() if handler[4] == queue]
+    with _app.app_context():
+        candidates = JobRecord.query.filter(
+            JobRecord.status == 'queued',
+            JobRecord.kind.in_(kinds),
+            db.or_(JobRecord.pinned_to.is_(None), JobRecord.pinned_to == PROCESS_TOKEN)
+        ).order_by(JobRecord.created_at).limit(5).all()
+
+        for candidate in candidates:
+            now = datetime.utcnow()
+            claimed = JobRecord.query.filter_by(id=candidate.id, status='queued').update({
+                'status': 'running',
+                'owner': PROCESS_TOKEN,
+                'attempts': JobRecord.attempts + 1,
+                'started_at': now,
+                'heartbeat_at': now
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                record = db.session.get(JobRecord, candidate.id)
+                db.session.refresh(record)
+                return Job(record.id, record.kind, record.project_id,
+                           json.loads(record.payload or '{}'), record.attempts)
+    return None
+
+
+def _finish(job, status, error=None):
+    with _app.app_context():
+        record = db.session.get(JobRecord, job.id)
+        if record is not None:
+            record.status = status
+            record.error = error
+            record.finished_at = datetime.utcnow()
+            if status == 'completed':
+                record.progress = 100
+            db.session.commit()
+
+
+def _run(job):
+    handler = _handlers[job.kind][0]
+    with _running_lock:
+        _running[job.id] = job
+    _current.job = job
+    try:
+        handler(job, **job.payload)
+    except Exception as e:
+        logging.error(f"Job {job.id} ({job.kind}) failed: {e}")
+        _finish(job, 'failed', str(e))
+    else:
+        _finish(job, 'cancelled' if job.cancelled() else 'completed')
+    finally:
+        _current.job = None
+        with _running_lock:
+            _running.pop(job.id, None)
+
+
+def _worker_loop(queue):
+    while True:
+        try:
+            job = _claim_next(queue)
+        except Exception as e:
+            logging.error(f"Error claiming job: {e}")
+            job = None
+        if job is None:
+            with _wakeup:
+                _wakeup.wait(JOB_POLL_INTERVAL)
+            continue
+        _run(job)
+
+
+def recover_stale_jobs():
+    """Requeue running jobs whose process stopped sending heartbeats, and
+    fail queued jobs pinned to a process that did. Returns the number of
+    jobs recovered."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_AFTER)
+    recovered = 0
+    abandoned = []
+    with _app.app_context():
+        orphaned = JobRecord.query.filter(
+            JobRecord.status == 'queued',
+            JobRecord.pinned_to.isnot(None),
+            JobRecord.pinned_to != PROCESS_TOKEN,
+            db.or_(JobRecord.heartbeat_at < cutoff,
+                   db.and_(JobRecord.heartbeat_at.is_(None), JobRecord.created_at < cutoff))
+        ).all()
+        for record in orphaned:
+            on_abandon = _handlers.get(record.kind, (None, False, False, None, None))[3]
+            record.status = 'failed'
+            record.error = 'Its process stopped before the job could run'
+            record.finished_at = datetime.utcnow()
+            if on_abandon and record.project_id:
+                abandoned.append((on_abandon, record.project_id, record.error))
+            logging.info(f"Failed job {record.id} ({record.kind}) pinned to stopped process {record.pinned_to}")
+            recovered += 1
+
+        stale = JobRecord.query.filter(JobRecord.status == 'running',
+                                       JobRecord.heartbeat_at < cutoff).all()
+        for record in stale:
+            _, resumable, local, on_abandon, _ = _handlers.get(record.kind,
+                                                               (None, False, False, None, None))
+            if record.cancel_requested:
+                record.status = 'cancelled'
+            elif not resumable or local or record.attempts >= JOB_MAX_ATTEMPTS:
+                record.status = 'failed'
+                record.error = 'Interrupted by a restart'
+                if on_abandon and record.project_id:
+                    abandoned.append((on_abandon, record.project_id, record.error))
+            else:
+                record.status = 'queued'
+                record.owner = None
+                logging.info(f"Resuming interrupted job {record.id} ({record.kind})")
+            if record.status != 'queued':
+                record.finished_at = datetime.utcnow()
+            recovered += 1
+        db.session.commit()
+
+    for on_abandon, project_id, error in abandoned:
+        try:
+            on_abandon(project_id, error)
+        except Exception as e:
+            logging.error(f"Error cleaning up after abandoned job for project {project_id}: {e}")
+    return recovered
+
+
+def _send_heartbeats():
+    """Mark this process's running jobs, and the queued jobs only it can
+    run, as alive"""
+    with _running_lock:
+        job_ids = list(_running)
+    with _app.app_context():
+        now = datetime.utcnow()
+        if job_ids:
+            JobRecord.query.filter(JobRecord.id.in_(job_ids)).update(
+                {'heartbeat_at': now}, synchronize_session=False)
+        JobRecord.query.filter(JobRecord.status == 'queued', JobRecord.pinned_to == PROCESS_TOKEN).update(
+            {'heartbeat_at': now}, synchronize_session=False)
+        db.session.commit()
+
+
+def _heartbeat_loop():
+    while True:
+        try:
+            _send_heartbeats()
+            if recover_stale_jobs():
+                with _wakeup:
+                    _wakeup.notify_all()
+        except Exception as e:
+            logging.error(f"Job heartbeat error: {e}")
+        time.sleep(JOB_HEARTBEAT)
+
+
+def start_job_workers(workers=JOB_WORKERS, queues=None):
+    """Start the worker pools and heartbeat thread (once per process).
+    queues maps extra queue names to their number of worker threads."""
+    global _started
+    if _started or workers <= 0:
+        return
+    _started = True
+    pools = {'default': workers}
+    pools.update(queues or {})
+    for queue, count in pools.items():
+        for i in range(count):
+            threading.Thread(target=_worker_loop, args=(queue,),
+                             name=f"job-worker-{queue}-{i}", daemon=True).start()
+    threading.Thread(target=_heartbeat_loop, name="job-heartbeat", daemon=True).start()
+    logging.info(f"Started job workers: {pools}")
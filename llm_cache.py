@@ -0,0 +1,97 @@
+"""
+Content-addressed cache for AI provider responses
+
+Responses are stored on disk (see disk_cache) under a hash of (provider,
+model, prompt, temperature, API key fingerprint), expire after a TTL and
+are evicted least-recently-used once the cache grows past its size cap. Only
+successful generations are stored, and answers given under one API key are
+never served under another. Callers pass bypass=True where a user asks for
+new text (chapter regeneration) or where a cached answer would hide an
+outage (the connection test); the fresh answer still replaces the entry.
+
+Tunables (environment variables):
+- LLM_CACHE_ENABLED: "0" disables the cache (default "1")
+- LLM_CACHE_DIR: cache directory (default cache/llm)
+- LLM_CACHE_MAX_MB: size cap in megabytes (default 200)
+- LLM_CACHE_TTL: entry lifetime in seconds (default 7 days)
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+
+from disk_cache import DiskCache
+
+LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join("cache", "llm"))
+LLM_CACHE_MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", 200)) * 1024 * 1024)
+LLM_CACHE_TTL = int(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+
+
+class LLMCache(DiskCache):
+    """On-disk response cache: one JSON file per response"""
+
+    suffix = '.json'
+
+    @staticmethod
+    def make_key(provider, model, prompt, temperature, api_key=''):
+        # Answers given under one API key are not reused under another
+        key_fingerprint = hashlib.sha256((api_key or '').encode('utf-8')).hexdigest()[:16]
+        payload = json.dumps([provider, model, prompt, temperature, key_fingerprint], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def encode(self, entry):
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data):
+        return json.loads(data.decode('utf-8')).get('text')
+
+    def put(self, key, text, provider=None, model=None):
+        super().put(key, {'provider': provider, 'model': model, 'text': text})
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """The process-wide cache, or None when caching is disabled"""
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache(LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL)
+        return _cache
+
+
+def cached_generate(provider, model, prompt, temperature, generate, bypass=False, api_key=''):
+    """Return generate()'s (success, text), serving identical requests made
+    with the same api_key from cache.
+
+    bypass=True skips the lookup but still stores the fresh result, so an
+    explicit regeneration replaces the cached answer.
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return generate()
+
+    key = LLMCache.make_key(provider, model, prompt, temperature, api_key)
+    if not bypass:
+        text = cache.get(key)
+        if text is not None:
+            return True, text
+
+    success, text = generate()
+    if success and text:
+        try:
+            cache.put(key, text, provider=provider, model=model)
+        except Exception as e:
+            logging.warning(f"Could not store LLM response in cache: {e}")
+    return success, text
+
+
+def llm_cache_stats():
+    cache = get_llm_cache()
+    return cache.stats() if cache else {'enabled': False}
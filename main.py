@@ -1,4 +1,8 @@
-from app import app
+import os
+from app import app, start_background_workers
 
 if __name__ == '__main__':
+    # The reloader's watcher process serves nothing; only its child runs jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,214 @@
+"""
+Chapter detection for imported manuscripts
+
+Splits raw text into chapters in one pass over its lines, so it can read
+straight from an uploaded file. Each line is checked against short,
+anchored heading patterns; only lines of heading length are tested, which
+keeps the work linear in the size of the input however the text is laid
+out. The lines are kept once and sliced into chapters at the end.
+
+Three kinds of heading are recognised, in order of preference:
+- "Chapter 3: Title", "CHAPTER IV - Title", "## Chapter 3" (any case)
+- "Ch. 3: Title"
+- "3. Title", only as a short line after a blank line, numbered 1, 2,
+  3... in sequence, so numbered sentences and lists are not headings
+
+The first kind found at least twice wins. A heading without a title on its
+line takes the next short line as its title. Text before the first heading
+is ignored. Without headings the text is grouped into about ten chapters
+of paragraphs.
+
+Uploaded manuscripts (.txt, .md, .docx) are read from disk by
+read_manuscript(), which feeds the splitter as it reads and reports how
+far it got, so an import can run as a background job.
+
+Tunables (environment variables):
+- MAX_IMPORT_MB: largest manuscript file accepted for upload (default 200)
+"""
+import io
+import os
+import re
+import uuid
+
+# Longest line that is tested as a heading
+MAX_HEADING_LENGTH = 200
+MAX_TITLE_LENGTH = 100
+# Numbered headings are short titles, not sentences
+MAX_NUMBERED_TITLE_LENGTH = 80
+
+MAX_IMPORT_MB = int(os.environ.get("MAX_IMPORT_MB", 200))
+MANUSCRIPT_EXTENSIONS = {'txt', 'md', 'docx'}
+# Lines read between progress reports
+PROGRESS_EVERY_LINES = 2000
+
+_CHAPTER_HEADING = re.compile(
+    r'\s*(?:#+\s*)?chapter\s+(?:\d+|[ivxlcdm]+)\b[:.\-–—\s]*(.*)$', re.IGNORECASE)
+_CH_HEADING = re.compile(r'\s*(?:#+\s*)?ch\.\s*\d+\b[:.\-–—\s]*(.*)$', re.IGNORECASE)
+_NUMBERED_HEADING = re.compile(r'\s*(?:#+\s*)?(\d+)\.\s+(\S.*)$')
+_TITLE_PREFIX = re.compile(r'^(Chapter\s+\d+[:\-\s]*)', re.IGNORECASE)
+_NON_WORD = re.compile(r'[^\w\s]')
+
+HEADING_KINDS = ('chapter', 'ch', 'numbered')
+
+
+def _chapter(number, title, content):
+    """A project chapter: imported text is complete, and every chapter has
+    its own id like chapters created by generation"""
+    return {
+        'id': str(uuid.uuid4()),
+        'number': number,
+        'title': title,
+        'content': content,
+        'status': 'completed'
+    }
+
+
+class ChapterSplitter:
+    """Feed lines with feed(); chapters() returns the detected chapters"""
+
+    def __init__(self):
+        self.lines = []
+        self.headings = {kind: [] for kind in HEADING_KINDS}  # kind -> [(line index, title)]
+        self._previous_blank = True
+        self._next_number = 1
+
+    def feed(self, line):
+        line = line.rstrip('\r\n')
+        index = len(self.lines)
+        self.lines.append(line)
+
+        blank = not line.strip()
+        if not blank and len(line) <= MAX_HEADING_LENGTH:
+            self._detect(index, line)
+        self._previous_blank = blank
+
+    def _detect(self, index, line):
+        match = _CHAPTER_HEADING.match(line)
+        if match:
+            self.headings['chapter'].append((index, match.group(1).strip()))
+            return
+        match = _CH_HEADING.match(line)
+        if match:
+            self.headings['ch'].append((index, match.group(1).strip()))
+            return
+        if self._previous_blank:
+            match = _NUMBERED_HEADING.match(line)
+            if match and int(match.group(1)) == self._next_number:
+                title = match.group(2).strip()
+                if len(title) <= MAX_NUMBERED_TITLE_LENGTH and not title.endswith(('.', ',', ';')):
+                    self.headings['numbered'].append((index, title))
+                    self._next_number += 1
+
+    def chapters(self):
+        for kind in HEADING_KINDS:
+            if len(self.headings[kind]) > 1:  # Need at least 2 chapters
+                return self._split_at(self.headings[kind])
+        return self._group_paragraphs()
+
+    def _split_at(self, headings):
+        chapters = []
+        for i, (start, title) in enumerate(headings):
+            end = headings[i + 1][0] if i + 1 < len(headings) else len(self.lines)
+            body_start = start + 1
+            if not title:
+                # "Chapter 3" alone on its line: the next short line is the title
+                for j in range(start + 1, end):
+                    if self.lines[j].strip():
+                        if len(self.lines[j].strip()) <= MAX_TITLE_LENGTH:
+                            title = self.lines[j].strip()
+                            body_start = j + 1
+                        break
+
+            title = _TITLE_PREFIX.sub('', title).strip()
+            chapters.append(_chapter(i + 1, (title or f"Chapter {i + 1}")[:MAX_TITLE_LENGTH],
+                                     '\n'.join(self.lines[body_start:end]).strip()))
+        return chapters
+
+    def _paragraphs(self):
+        """Paragraphs separated by empty lines"""
+        paragraph = []
+        for line in self.lines:
+            if line:
+                paragraph.append(line)
+            elif paragraph:
+                text = '\n'.join(paragraph).strip()
+                if text:
+                    yield text
+                paragraph = []
+        if paragraph:
+            text = '\n'.join(paragraph).strip()
+            if text:
+                yield text
+
+    def _group_paragraphs(self):
+        """No headings: group paragraphs into about ten chapters"""
+        paragraphs = list(self._paragraphs())
+        if not paragraphs:
+            return []
+        if len(paragraphs) < 3:
+            # Very short content, create single chapter
+            return [_chapter(1, 'Chapter 1', '\n'.join(self.lines).strip())]
+
+        chapters = []
+        chapter_size = max(3, len(paragraphs) // 10)  # Aim for ~10 chapters
+        for i in range(0, len(paragraphs), chapter_size):
+            chapter_paragraphs = paragraphs[i:i + chapter_size]
+            number = len(chapters) + 1
+            # Generate chapter title from first paragraph
+            first_paragraph = chapter_paragraphs[0]
+            title = first_paragraph[:50] + "..." if len(first_paragraph) > 50 else first_paragraph
+            title = _NON_WORD.sub('', title).strip()
+            chapters.append(_chapter(number, title or f"Chapter {number}",
+                                     '\n\n'.join(chapter_paragraphs)))
+        return chapters
+
+
+def split_chapters(lines):
+    """Chapters of a manuscript given as an iterable of lines (e.g. an open
+    text file); each chapter is a dict with id, number, title, content and
+    status ('completed')"""
+    splitter = ChapterSplitter()
+    for line in lines:
+        splitter.feed(line)
+    return splitter.chapters()
+
+
+def split_raw_text(text):
+    """Chapters of a manuscript held in a string"""
+    # newline=None reads '\r\n' and '\r' line ends as '\n'
+    return split_chapters(io.StringIO(text, newline=None))
+
+
+def _text_lines(path, on_progress):
+    """Lines of a UTF-8 text file, reporting the fraction of bytes read"""
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as raw:
+        # utf-8-sig drops a byte order mark; newline=None reads '\r\n' and '\r' as '\n'
+        text = io.TextIOWrapper(raw, encoding='utf-8-sig', errors='replace', newline=None)
+        for count, line in enumerate(text, 1):
+            yield line
+            if on_progress and count % PROGRESS_EVERY_LINES == 0:
+                on_progress(min(raw.tell() / size, 1.0))
+
+
+def _docx_lines(path, on_progress):
+    """Lines of a .docx file, one paragraph followed by a blank line"""
+    from docx import Document
+    paragraphs = Document(path).paragraphs
+    total = len(paragraphs) or 1
+    for count, paragraph in enumerate(paragraphs, 1):
+        # Soft line breaks inside a paragraph come back as '\n'
+        yield from paragraph.text.split('\n')
+        yield ''
+        if on_progress and count % (PROGRESS_EVERY_LINES // 10) == 0:
+            on_progress(count / total)
+
+
+def read_manuscript(path, extension, on_progress=None):
+    """Chapters of a manuscript file (.txt, .md or .docx). on_progress is
+    called now and then with the fraction of the file read so far."""
+    extension = extension.lower().lstrip('.')
+    if extension not in MANUSCRIPT_EXTENSIONS:
+        raise ValueError(f"Unsupported manuscript type: .{extension}")
+    lines = _docx_lines if extension == 'docx' else _text_lines
+    return split_chapters(lines(path, on_progress))
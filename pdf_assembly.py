@@ -0,0 +1,144 @@
+"""
+Incremental PDF assembly for book exports
+
+Instead of laying out a whole book in one WeasyPrint pass, the cover, the
+table of contents, every chapter and the author bio are rendered as
+separate documents whose pages are joined into one PDF. Laid-out parts are
+kept in memory keyed by the HTML they were made from, so after an edit only
+the changed chapter is laid out again.
+
+Parts carry no page numbers, so a chapter's HTML does not depend on where
+it starts. Only the side it starts on (page_side, 'right' or 'left') is
+passed, which the KDP template needs for its mirrored margins; a KDP
+chapter whose starting side flips is laid out again. Page numbers come from
+a 'numbers' part of page_count empty pages counting up from page_start:
+its page number margin boxes are stamped onto the merged pages. The table
+of contents is rendered last, with the real first page of every chapter,
+and laid out again until its own length stops moving the chapters.
+
+Export templates take part ('cover', 'toc', 'chapter', 'bio' or 'numbers'),
+part_chapters, page_side, page_start, page_count and toc_pages; without
+them they render the whole book as before.
+
+Tunables (environment variables):
+- PDF_PART_CACHE_SIZE: laid-out parts kept in memory (default 64)
+"""
+import os
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+import weasyprint
+from weasyprint.formatting_structure.boxes import MarginBox
+from pdf_resources import url_fetcher, font_config
+
+PDF_PART_CACHE_SIZE = int(os.environ.get("PDF_PART_CACHE_SIZE", 64))
+
+# Stands in for page numbers while measuring the table of contents
+PLACEHOLDER_PAGE = 999
+
+# Table of contents layouts tried before giving up on its page numbers
+MAX_TOC_PASSES = 10
+
+_lock = threading.Lock()
+_parts = OrderedDict()  # hash of (base_url, html) -> laid-out weasyprint Document
+_hits = 0
+_misses = 0
+
+
+def _layout(html, base_url):
+    """Laid-out document for html, from the part cache when possible"""
+    global _hits, _misses
+    key = hashlib.sha256(f"{base_url}\0{html}".encode('utf-8')).hexdigest()
+    with _lock:
+        document = _parts.get(key)
+        if document is not None:
+            _parts.move_to_end(key)
+            _hits += 1
+            return document
+        _misses += 1
+
+    document = weasyprint.HTML(string=html, base_url=base_url,
+                               url_fetcher=url_fetcher()).render(font_config=font_config())
+    with _lock:
+        _parts[key] = document
+        while len(_parts) > PDF_PART_CACHE_SIZE:
+            _parts.popitem(last=False)
+    return document
+
+
+def _side(page):
+    return 'right' if page % 2 else 'left'
+
+
+def _stamp(page, numbered):
+    """Copy of page with the margin boxes (page number) of numbered"""
+    box = page._page_box
+    children = [child for child in box.children if not isinstance(child, MarginBox)]
+    children += [child for child in numbered._page_box.children if isinstance(child, MarginBox)]
+    stamped = copy.copy(page)
+    stamped._page_box = box.copy_with_children(children)
+    return stamped
+
+
+def render_book_pdf(render_part, chapters, has_bio, base_url=None, **pdf_options):
+    """Lay out a book part by part and return the merged PDF bytes.
+
+    render_part(part, **context) returns the HTML of one part of the book;
+    context holds page_side, part_chapters, toc_pages, and page_start and
+    page_count for the numbers part.
+    """
+    cover = _layout(render_part('cover'), base_url)
+    toc_start = len(cover.pages) + 1
+
+    # Measure the table of contents before the chapters' pages are known
+    placeholders = {chapter['id']: PLACEHOLDER_PAGE for chapter in chapters}
+    placeholders['author_bio'] = PLACEHOLDER_PAGE
+    toc_length = len(_layout(render_part('toc', page_side=_side(toc_start), toc_pages=placeholders),
+                             base_url).pages)
+
+    for _ in range(MAX_TOC_PASSES):
+        page = toc_start + toc_length
+        toc_pages = {}
+        body = []
+        for chapter in chapters:
+            document = _layout(render_part('chapter', page_side=_side(page), part_chapters=[chapter]),
+                               base_url)
+            toc_pages[chapter['id']] = page
+            page += len(document.pages)
+            body.append(document)
+        if has_bio:
+            toc_pages['author_bio'] = page
+            body.append(_layout(render_part('bio', page_side=_side(page)), base_url))
+
+        toc = _layout(render_part('toc', page_side=_side(toc_start), toc_pages=toc_pages), base_url)
+        if len(toc.pages) == toc_length:
+            break
+        # The real numbers changed the TOC's length; place the body after it again
+        toc_length = len(toc.pages)
+    else:
+        raise RuntimeError(f"Table of contents page numbers did not settle after "
+                           f"{MAX_TOC_PASSES} layouts")
+
+    numbered_pages = [page for document in [toc] + body for page in document.pages]
+    numbers = _layout(render_part('numbers', page_side=_side(toc_start), page_start=toc_start,
+                                  page_count=len(numbered_pages)), base_url)
+    if len(numbers.pages) != len(numbered_pages):
+        raise RuntimeError(f"Page numbers laid out on {len(numbers.pages)} pages "
+                           f"for {len(numbered_pages)} book pages")
+
+    pages = cover.pages + [_stamp(page, numbered)
+                           for page, numbered in zip(numbered_pages, numbers.pages)]
+    return cover.copy(pages).write_pdf(**pdf_options)
+
+
+def part_cache_stats():
+    with _lock:
+        lookups = _hits + _misses
+        return {
+            'parts': len(_parts),
+            'max_parts': PDF_PART_CACHE_SIZE,
+            'hits': _hits,
+            'misses': _misses,
+            'hit_rate': round(_hits / lookups, 3) if lookups else 0
+        }
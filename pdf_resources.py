@@ -0,0 +1,179 @@
+"""
+Local resources for WeasyPrint renders
+
+Export templates load their fonts and the cover image from /static/. A
+WeasyPrint render fetches them through url_fetcher() below, which serves
+any /static/ URL straight from the package's static folder (fonts from
+memory after the first read) instead of over HTTP, so a render never
+waits on the network and works on offline hosts. Other URLs go through
+WeasyPrint's default fetcher.
+
+The fonts (EB Garamond, Cormorant Garamond, Crimson Text, Playfair
+Display) are vendored in static/fonts with their @font-face rules in
+static/fonts/fonts.css; `flask fetch-fonts` downloads them from Google
+Fonts once (the deployment build runs it). Renders never go to the network
+for a font: a process whose fonts are missing refuses to render, with an
+error naming the files, rather than exporting in a fallback font. One
+FontConfiguration is shared by all renders of a process, so each font
+file is parsed once per process rather than once per render.
+"""
+import os
+import re
+import mimetypes
+import threading
+from urllib.parse import urlsplit, unquote
+from urllib.request import Request, urlopen
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(PACKAGE_DIR, 'static')
+FONTS_DIR = os.path.join(STATIC_DIR, 'fonts')
+
+# Base URL for renders outside a request; its /static/ URLs resolve locally
+LOCAL_BASE_URL = 'http://localhost/'
+
+# The families the export templates use, as they were loaded from Google Fonts
+FONT_CSS_URLS = (
+    'https://fonts.googleapis.com/css2?family=EB+Garamond:ital,wght@0,400;0,500;0,600;1,400'
+    '&family=Cormorant+Garamond:wght@400;500;600;700',
+    'https://fonts.googleapis.com/css2?family=Crimson+Text:ital,wght@0,400;0,600;1,400'
+    '&family=Playfair+Display:wght@400;700',
+)
+
+_lock = threading.Lock()
+_font_files = {}  # path -> (mtime_ns, bytes), fonts and their stylesheet
+_font_config = None
+_url_fetcher = None
+
+
+def _static_path(url):
+    """Local file for a /static/ URL (or a file:// URL inside static/), or None"""
+    parts = urlsplit(url)
+    if parts.scheme in ('http', 'https') and parts.path.startswith('/static/'):
+        path = os.path.join(STATIC_DIR, unquote(parts.path[len('/static/'):]))
+    elif parts.scheme == 'file':
+        path = unquote(parts.path)
+    else:
+        return None
+    path = os.path.realpath(path)
+    if not path.startswith(STATIC_DIR + os.sep):
+        return None
+    return path
+
+
+def read_static(url):
+    """(bytes, mime type) of a local static resource, or None if url is not one"""
+    path = _static_path(url)
+    if path is None:
+        return None
+    mime_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if not path.startswith(FONTS_DIR + os.sep):
+        with open(path, 'rb') as f:
+            return f.read(), mime_type
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Export font {os.path.basename(path)} is missing from static/fonts; "
+                                f"run `flask fetch-fonts`") from None
+    with _lock:
+        cached = _font_files.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'rb') as f:
+            cached = (mtime, f.read())
+        with _lock:
+            _font_files[path] = cached
+    return cached[1], mime_type
+
+
+def _google_fonts():
+    """Font file name -> (family, style, weight, URL) of every face in
+    FONT_CSS_URLS, as named in static/fonts"""
+    fonts = {}
+    for css_url in FONT_CSS_URLS:
+        # Without a browser user agent Google Fonts serves one TrueType file per face
+        with urlopen(Request(css_url, headers={'User-Agent': 'BookGenPro'}), timeout=30) as response:
+            css = response.read().decode('utf-8')
+        for block in re.findall(r'@font-face\s*{([^}]*)}', css):
+            family = re.search(r"font-family:\s*'([^']+)'", block).group(1)
+            style = re.search(r'font-style:\s*(\w+)', block).group(1)
+            weight = re.search(r'font-weight:\s*(\d+)', block).group(1)
+            src = re.search(r'url\(([^)]+)\)', block).group(1)
+            filename = f"{family.replace(' ', '')}-{weight}{'Italic' if style == 'italic' else ''}.ttf"
+            fonts[filename] = (family, style, weight, src)
+    return fonts
+
+
+def missing_fonts():
+    """Font files named in static/fonts/fonts.css that are not on disk"""
+    try:
+        with open(os.path.join(FONTS_DIR, 'fonts.css'), encoding='utf-8') as f:
+            css = f.read()
+    except FileNotFoundError:
+        return []
+    return [name for name in re.findall(r"url\('([^']+)'\)", css)
+            if not os.path.exists(os.path.join(FONTS_DIR, name))]
+
+
+def url_fetcher():
+    """WeasyPrint URL fetcher that serves /static/ from disk and memory"""
+    global _url_fetcher
+    if _url_fetcher is not None:
+        return _url_fetcher
+
+    try:
+        from weasyprint.urls import URLFetcher, URLFetcherResponse
+    except ImportError:  # WeasyPrint < 66 takes a plain function
+        import weasyprint
+
+        def fetch(url):
+            resource = read_static(url)
+            if resource is None:
+                return weasyprint.default_url_fetcher(url)
+            data, mime_type = resource
+            return {'string': data, 'mime_type': mime_type, 'redirected_url': url}
+
+        _url_fetcher = fetch
+        return _url_fetcher
+
+    class LocalURLFetcher(URLFetcher):
+        def fetch(self, url, headers=None):
+            resource = read_static(url)
+            if resource is None:
+                return super().fetch(url, headers)
+            data, mime_type = resource
+            return URLFetcherResponse(url, data, {'Content-Type': mime_type})
+
+    _url_fetcher = LocalURLFetcher()
+    return _url_fetcher
+
+
+def font_config():
+    """The FontConfiguration shared by all renders in this process"""
+    global _font_config
+    if _font_config is None:
+        from weasyprint.text.fonts import FontConfiguration
+        missing = missing_fonts()
+        if missing:
+            raise RuntimeError(f"{len(missing)} export font files are missing from static/fonts "
+                               f"({', '.join(missing)}); run `flask fetch-fonts`")
+        _font_config = FontConfiguration()
+    return _font_config
+
+
+def fetch_fonts():
+    """Download the export fonts from Google Fonts into static/fonts and
+    write fonts.css for them; returns the number of font files"""
+    os.makedirs(FONTS_DIR, exist_ok=True)
+    rules = []
+    for filename, (family, style, weight, src) in _google_fonts().items():
+        with urlopen(src, timeout=30) as response:
+            data = response.read()
+        with open(os.path.join(FONTS_DIR, filename), 'wb') as f:
+            f.write(data)
+        rules.append(f"@font-face {{\n  font-family: '{family}';\n  font-style: {style};\n"
+                     f"  font-weight: {weight};\n  src: url('{filename}') format('truetype');\n}}\n")
+
+    with open(os.path.join(FONTS_DIR, 'fonts.css'), 'w', encoding='utf-8') as f:
+        f.write('/* Export fonts, vendored by `flask fetch-fonts` (SIL Open Font License) */\n')
+        f.write('\n'.join(rules))
+    return len(rules)
@@ -0,0 +1,806 @@
+"""
+Project storage layer for BookGenPro
+
+Project JSON files in the projects folder stay the canonical documents.
+Every save is mirrored into an indexed SQL store (SQLite by default) that
+holds project metadata and chapter rows, so the dashboard can list, sort
+and count projects without opening and parsing every file.
+
+Project files are written compactly to a temp file and renamed into place,
+so readers never see a half-written document. Saves of the same project
+that arrive within PROJECT_WRITE_COALESCE seconds (default 0.5) of its last
+write are merged into one deferred write of the latest state. A save takes
+a snapshot of the caller's dict before it returns; a deferred write only
+ever touches that snapshot, never the dict the caller keeps changing.
+
+Writes hold a per-project lock that also covers other worker processes
+(an flock on projects/.locks/<id>.lock). Each project carries a version
+counter; a save from a copy loaded before someone else's write merges the
+other writer's changes in field by field instead of overwriting them.
+
+Every indexed save or removal publishes a 'library' event to open tabs.
+"""
+import os
+import json
+import time
+import base64
+import hashlib
+import atexit
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+from flask import has_app_context
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, and_, or_, inspect, text
+from sqlalchemy.orm import noload
+import generation_events
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; locking is then per process only
+    fcntl = None
+
+db = SQLAlchemy()
+
+_app = None
+_projects_folder = 'projects'
+
+PROJECT_WRITE_COALESCE = float(os.environ.get("PROJECT_WRITE_COALESCE", 0.5))
+
+_locks_guard = threading.Lock()
+_project_locks = {}  # project_id -> lock serialising writes of that file
+_last_write = {}     # project_id -> time.monotonic() of the last write
+_pending = {}        # project_id -> (caller's dict, snapshot, base) of the latest unsaved save
+_timers = {}         # project_id -> timer that will flush it
+_written = {}        # project_id -> (mtime_ns, size, version) of our last write
+
+
+class StoreMeta(db.Model):
+    """Key/value flags for the store itself (e.g. whether JSON was imported)"""
+    __tablename__ = 'store_meta'
+
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Text)
+
+
+class ProjectRecord(db.Model):
+    """Indexed metadata for one project file"""
+    __tablename__ = 'projects'
+
+    id = db.Column(db.String(64), primary_key=True)
+    name = db.Column(db.Text)
+    title = db.Column(db.Text)
+    language = db.Column(db.String(64))
+    cover_image = db.Column(db.Text)
+    status = db.Column(db.String(64), index=True)
+    generation_status = db.Column(db.String(255), index=True)
+    created_at = db.Column(db.String(32))
+    last_modified = db.Column(db.String(32), index=True)
+    chapter_count = db.Column(db.Integer, default=0)
+    completed_chapters = db.Column(db.Integer, default=0)
+    written_chapters = db.Column(db.Integer, default=0)
+    word_count = db.Column(db.Integer, default=0)
+    # Every top-level project field except the chapter list, as JSON
+    meta = db.Column(db.Text)
+
+    chapters = db.relationship('ChapterRecord', cascade='all, delete-orphan',
+                               order_by='ChapterRecord.position', lazy='selectin')
+
+    def to_dict(self, with_chapters=True):
+        """Project metadata plus chapter summaries (no chapter text)"""
+        data = json.loads(self.meta) if self.meta else {}
+        data['id'] = self.id
+        data['filename'] = f"{self.id}.json"
+        data['last_modified'] = self.last_modified
+        data['chapter_count'] = self.chapter_count
+        data['completed_chapters'] = self.completed_chapters
+        data['written_chapters'] = self.written_chapters
+        data['word_count'] = self.word_count
+        if with_chapters:
+            data['chapters'] = [chapter.to_dict() for chapter in self.chapters]
+        return data
+
+
+class ChapterRecord(db.Model):
+    """One chapter row; chapter text itself stays in the project file"""
+    __tablename__ = 'chapters'
+
+    pk = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    project_id = db.Column(db.String(64), db.ForeignKey('projects.id'), index=True, nullable=False)
+    position = db.Column(db.Integer, nullable=False)
+    chapter_id = db.Column(db.String(64), index=True)
+    number = db.Column(db.Integer)
+    title = db.Column(db.Text)
+    status = db.Column(db.String(64), index=True)
+    word_count = db.Column(db.Integer, default=0)
+    # Digest of the chapter text; word_count is only recounted when it changes
+    content_hash = db.Column(db.String(32))
+
+    def to_dict(self):
+        return {
+            'id': self.chapter_id,
+            'number': self.number,
+            'title': self.title,
+            'status': self.status,
+            'word_count': self.word_count
+        }
+
+
+class LibraryStats(db.Model):
+    """Running library totals (a single row), adjusted by delta whenever a
+    project is synced or removed so reading them never scans the library"""
+    __tablename__ = 'library_stats'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total_projects = db.Column(db.Integer, default=0, nullable=False)
+    completed_projects = db.Column(db.Integer, default=0, nullable=False)
+    total_chapters = db.Column(db.Integer, default=0, nullable=False)
+    total_words = db.Column(db.Integer, default=0, nullable=False)
+
+    def to_dict(self):
+        return {
+            'total_projects': self.total_projects,
+            'completed_projects': self.completed_projects,
+            'total_chapters': self.total_chapters,
+            'total_words': self.total_words
+        }
+
+
+def _add_missing_columns():
+    """create_all() does not alter existing tables; add columns introduced since"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('chapters')}
+    if 'content_hash' not in columns:
+        with db.engine.begin() as connection:
+            connection.execute(text('ALTER TABLE chapters ADD COLUMN content_hash VARCHAR(32)'))
+
+
+def init_store(app, projects_folder):
+    """Bind the store to the Flask app, create tables and import JSON once"""
+    global _app, _projects_folder
+    _app = app
+    _projects_folder = projects_folder
+
+    app.config.setdefault("SQLALCHEMY_DATABASE_URI",
+                          os.environ.get("DATABASE_URL", "sqlite:///bookgenpro.db"))
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    })
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        _add_missing_columns()
+        if not db.session.get(StoreMeta, 'json_imported'):
+            imported = import_json_projects()
+            db.session.merge(StoreMeta(key='json_imported', value=str(imported)))
+            db.session.commit()
+            logging.info(f"Imported {imported} project files into the project store")
+        elif db.session.get(LibraryStats, 1) is None:
+            library_stats(verify=True)
+
+    @app.cli.command('import-projects')
+    def import_projects_command():
+        """Re-import every projects/*.json file into the project store."""
+        imported = import_json_projects()
+        print(f"Imported {imported} projects")
+
+    @app.cli.command('verify-library-stats')
+    def verify_library_stats_command():
+        """Re-import every project file and recompute the library totals."""
+        import_json_projects()
+        stats = library_stats(verify=True)
+        print(f"Library totals: {stats}")
+
+    @app.cli.command('rebuild-chapter-index')
+    def rebuild_chapter_index_command():
+        """Rebuild the chapter id -> project index from the project files."""
+        chapters = rebuild_chapter_index()
+        print(f"Indexed {chapters} chapters")
+
+
+def _app_context():
+    """Background threads have no app context; push one when needed"""
+    if has_app_context() or _app is None:
+        return nullcontext()
+    return _app.app_context()
+
+
+def get_project_file(project_id):
+    return os.path.join(_projects_folder, f"{project_id}.json")
+
+
+class ProjectDocument(dict):
+    """A project dict that remembers the state it was loaded (or last saved)
+    as, so a later save can tell which fields this copy changed"""
+
+    base = None
+
+
+MISSING = object()
+
+
+def _read_project_file(project_id):
+    with open(get_project_file(project_id), 'r') as f:
+        text = f.read()
+    project = ProjectDocument(json.loads(text))
+    project.base = json.loads(text)
+    return project
+
+
+def load_project(project_id):
+    """Load a project document; raises FileNotFoundError if it does not exist"""
+    if project_id in _pending:
+        flush_project(project_id)  # read our own deferred write
+    return _read_project_file(project_id)
+
+
+def project_revision(project_id):
+    """Opaque tag that changes on every write of the project, read from the
+    file's metadata without parsing it; None if the project does not exist"""
+    if project_id in _pending:
+        flush_project(project_id)
+    try:
+        stat = os.stat(get_project_file(project_id))
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def _project_lock(project_id):
+    with _locks_guard:
+        lock = _project_locks.get(project_id)
+        if lock is None:
+            lock = _project_locks[project_id] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def project_lock(project_id):
+    """Exclusive lock on one project across threads and worker processes.
+    Not reentrant."""
+    with _project_lock(project_id):
+        if fcntl is None:
+            yield
+            return
+        lock_dir = os.path.join(_projects_folder, '.locks')
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, f"{project_id}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _rebase_fields(mine, base, theirs, skip=()):
+    """Take every field only the other writer changed into mine, in place"""
+    for key in set(base) | set(theirs):
+        if key in skip:
+            continue
+        base_value = base.get(key, MISSING)
+        their_value = theirs.get(key, MISSING)
+        if mine.get(key, MISSING) == base_value and their_value != base_value:
+            if their_value is MISSING:
+                mine.pop(key, None)
+            else:
+                mine[key] = their_value
+
+
+def _rebase_project(mine, base, theirs):
+    """Merge another writer's changes (theirs) into mine, in place.
+
+    Fields are compared against base, the state mine was loaded from: a
+    field changed only on disk is taken from disk, one changed here is kept
+    (both changed: this write wins). Chapters are merged field by field by
+    id. Chapter dicts are updated in place because background jobs hold
+    references to them, so a caller's dict is only rebased in the caller's
+    own thread (see _catch_up).
+    """
+    _rebase_fields(mine, base, theirs, skip=('chapters', 'version'))
+
+    base_chapters = {c.get('id'): c for c in base.get('chapters', [])}
+    their_chapters = {c.get('id'): c for c in theirs.get('chapters', [])}
+    my_chapters = mine.get('chapters', [])
+    for chapter in my_chapters:
+        their_chapter = their_chapters.get(chapter.get('id'))
+        if their_chapter is not None:
+            _rebase_fields(chapter, base_chapters.get(chapter.get('id'), {}), their_chapter)
+
+    my_ids = [c.get('id') for c in my_chapters]
+    their_ids = [c.get('id') for c in theirs.get('chapters', [])]
+    if 'chapters' in theirs and my_ids == list(base_chapters) and their_ids != my_ids:
+        # Only the other writer added, removed or reordered chapters
+        mine_by_id = {c.get('id'): c for c in my_chapters}
+        merged = [mine_by_id.get(chapter_id, their_chapters[chapter_id]) for chapter_id in their_ids]
+        if 'chapters' in mine:
+            mine['chapters'][:] = merged
+        else:
+            mine['chapters'] = merged
+
+
+def _stamp_chapter_revisions(project, base):
+    """Set chapter['rev'] to the project version being written on every
+    chapter that differs from base (or is new), so status polls can send
+    only the chapters changed since a revision"""
+    version = project['version']
+    base_chapters = {c.get('id'): c for c in (base or {}).get('chapters', [])}
+    for chapter in project.get('chapters', []) or []:
+        before = base_chapters.get(chapter.get('id'))
+        if before is None or 'rev' not in chapter or any(
+                chapter.get(key) != before.get(key)
+                for key in set(chapter) | set(before) if key != 'rev'):
+            chapter['rev'] = version
+
+
+def _disk_version(project_id):
+    """(version, document) of the file on disk; the document is only parsed
+    when someone other than this process wrote it since our last write"""
+    project_file = get_project_file(project_id)
+    try:
+        stat = os.stat(project_file)
+    except FileNotFoundError:
+        return None, None
+    written = _written.get(project_id)
+    if written and written[:2] == (stat.st_mtime_ns, stat.st_size):
+        return written[2], None
+    theirs = _read_project_file(project_id)
+    return theirs.get('version', 0), theirs
+
+
+def _write_project_file(project_id, project):
+    """Serialise compactly and atomically replace the project file"""
+    data = json.dumps(project, separators=(',', ':'))
+
+    project_file = get_project_file(project_id)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(project_file) or '.',
+                                    prefix=f".{project_id}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, project_file)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    stat = os.stat(project_file)
+    _written[project_id] = (stat.st_mtime_ns, stat.st_size, project.get('version', 0))
+
+
+def _snapshot(project):
+    """Deep copy of the project as it is now"""
+    return json.loads(json.dumps(project, separators=(',', ':')))
+
+
+def _write_now(project_id, snapshot, base):
+    """Merge, version, write and index a snapshot (caller holds project_lock).
+    The snapshot belongs to the store, so it is changed in place; returns it."""
+    disk_version, theirs = _disk_version(project_id)
+    if disk_version is not None and base is not None and disk_version != base.get('version', 0):
+        if theirs is None:
+            theirs = _read_project_file(project_id)
+        _rebase_project(snapshot, base, theirs)
+        logging.info(f"Merged concurrent changes into project {project_id} (version {disk_version})")
+    snapshot['version'] = (disk_version or 0) + 1
+    _stamp_chapter_revisions(snapshot, base)
+
+    _write_project_file(project_id, snapshot)
+    _last_write[project_id] = time.monotonic()
+    sync_project(project_id, snapshot)
+    return snapshot
+
+
+def _catch_up(project_id, project):
+    """Merge what was written since the caller's copy was loaded or last
+    synced (another writer's save, or the deferred write of this copy's
+    earlier snapshot) into the caller's dict. Runs in the caller's thread,
+    under whatever lock guards the dict. Returns the new base of the copy."""
+    base = getattr(project, 'base', None)
+    if base is None:
+        return None
+    disk_version, theirs = _disk_version(project_id)
+    if disk_version is None or disk_version == base.get('version', 0):
+        return base
+    if theirs is None:
+        theirs = _read_project_file(project_id)
+    _rebase_project(project, base, theirs)
+    project['version'] = theirs.get('version', 0)
+    project.base = theirs
+    return theirs
+
+
+def _adopt(project, written):
+    """Give the caller's dict the version and chapter revisions it was just
+    written with (nothing else differs: it caught up before the snapshot)"""
+    project['version'] = written['version']
+    for chapter, written_chapter in zip(project.get('chapters') or [], written.get('chapters') or []):
+        if 'rev' in written_chapter:
+            chapter['rev'] = written_chapter['rev']
+    if isinstance(project, ProjectDocument):
+        project.base = written
+
+
+def save_project(project_id, project):
+    """Write the project document and mirror it into the index.
+
+    Changes another writer saved since this copy was loaded are merged in
+    (see _rebase_project) and the project's version counter is bumped.
+    The document is snapshotted before this returns, so callers must hold
+    whatever lock guards the dict against their other threads while saving.
+    A save within PROJECT_WRITE_COALESCE seconds of the previous write is
+    deferred to the end of that window; later saves in the window replace
+    it, so only the latest state reaches disk. The caller's dict picks up
+    the deferred write's version and merged changes on its next save.
+    """
+    with project_lock(project_id):
+        pending = _pending.get(project_id)
+        if pending is not None and pending[0] is not project:
+            _flush_pending(project_id)  # a different copy; don't drop its changes
+
+        base = _catch_up(project_id, project)
+        snapshot = _snapshot(project)
+        wait = _last_write.get(project_id, 0) + PROJECT_WRITE_COALESCE - time.monotonic()
+        if wait <= 0:
+            _pending.pop(project_id, None)
+            _adopt(project, _write_now(project_id, snapshot, base))
+            return
+
+        _pending[project_id] = (project, snapshot, base)
+        with _locks_guard:
+            if project_id not in _timers:
+                timer = threading.Timer(wait, flush_project, args=(project_id,))
+                timer.daemon = True
+                _timers[project_id] = timer
+                timer.start()
+
+
+def _flush_pending(project_id):
+    """Write the deferred snapshot, if there is one (caller holds project_lock)"""
+    pending = _pending.pop(project_id, None)
+    if pending is None:
+        return
+    _, snapshot, base = pending
+    try:
+        _write_now(project_id, snapshot, base)
+    except Exception as e:
+        logging.error(f"Error writing project {project_id}: {e}")
+        raise
+
+
+def flush_project(project_id):
+    """Write a deferred save now, if there is one"""
+    with project_lock(project_id):
+        with _locks_guard:
+            timer = _timers.pop(project_id, None)
+        if timer is not None:
+            timer.cancel()
+        _flush_pending(project_id)
+
+
+def flush_all_projects():
+    for project_id in list(_pending):
+        try:
+            flush_project(project_id)
+        except Exception:
+            pass  # already logged
+
+
+atexit.register(flush_all_projects)
+
+
+def remove_project(project_id):
+    """Remove the project document and its index rows"""
+    with project_lock(project_id):
+        with _locks_guard:
+            timer = _timers.pop(project_id, None)
+        if timer is not None:
+            timer.cancel()
+        _pending.pop(project_id, None)
+        _last_write.pop(project_id, None)
+        _written.pop(project_id, None)
+        project_file = get_project_file(project_id)
+        if os.path.exists(project_file):
+            os.remove(project_file)
+    with _app_context():
+        try:
+            record = db.session.get(ProjectRecord, project_id)
+            if record:
+                _adjust_library_stats(_stat_values(record), (0, 0, 0, 0))
+                db.session.delete(record)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error removing project {project_id} from store: {e}")
+    generation_events.publish_global('library', {'project_id': project_id, 'action': 'removed'})
+
+
+def _word_count(content):
+    return len(content.split()) if content and content.strip() else 0
+
+
+def _fill_record(record, project, project_file=None):
+    chapters = project.get('chapters', []) or []
+
+    last_modified = project.get('last_modified')
+    if not last_modified and project_file and os.path.exists(project_file):
+        last_modified = datetime.fromtimestamp(os.path.getmtime(project_file)).isoformat()
+
+    meta = {key: value for key, value in project.items() if key != 'chapters'}
+    if 'created_date' not in meta and project_file and os.path.exists(project_file):
+        meta['created_date'] = datetime.fromtimestamp(os.path.getctime(project_file)).isoformat()
+
+    record.name = project.get('name')
+    record.title = project.get('title')
+    record.language = project.get('language')
+    record.cover_image = project.get('cover_image')
+    record.status = project.get('status')
+    record.generation_status = project.get('generation_status')
+    record.created_at = project.get('created_at')
+    record.last_modified = last_modified or project.get('created_at') or ''
+    record.meta = json.dumps(meta)
+
+    # Reuse existing rows (and their word counts when the text is unchanged)
+    existing_rows = {}
+    for row in record.chapters:
+        existing_rows.setdefault(row.chapter_id, []).append(row)
+
+    chapter_rows = []
+    total_words = 0
+    completed = 0
+    written = 0
+    for position, chapter in enumerate(chapters):
+        content = chapter.get('content', '') or ''
+        content_hash = hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+        candidates = existing_rows.get(chapter.get('id'))
+        row = candidates.pop(0) if candidates else ChapterRecord(chapter_id=chapter.get('id'))
+        if row.content_hash != content_hash or row.word_count is None:
+            row.word_count = _word_count(content)
+            row.content_hash = content_hash
+        row.position = position
+        row.number = chapter.get('number', position + 1)
+        row.title = chapter.get('title')
+        row.status = chapter.get('status')
+
+        total_words += row.word_count
+        if chapter.get('status') == 'completed':
+            completed += 1
+        if row.word_count:
+            written += 1
+        chapter_rows.append(row)
+    record.chapters = chapter_rows
+    record.chapter_count = len(chapters)
+    record.completed_chapters = completed
+    record.written_chapters = written
+    record.word_count = total_words
+
+
+def _stat_values(record):
+    """(projects, completed, chapters, words) this record adds to the totals"""
+    if record is None:
+        return (0, 0, 0, 0)
+    return (1, 1 if record.status == 'completed' else 0,
+            record.chapter_count or 0, record.word_count or 0)
+
+
+def _adjust_library_stats(before, after):
+    """Apply the difference between two _stat_values to the running totals
+    as an atomic UPDATE (part of the caller's transaction)"""
+    delta = [new - old for old, new in zip(before, after)]
+    if not any(delta):
+        return
+    # Matches no row until the totals are first computed by library_stats()
+    LibraryStats.query.filter_by(id=1).update({
+        LibraryStats.total_projects: LibraryStats.total_projects + delta[0],
+        LibraryStats.completed_projects: LibraryStats.completed_projects + delta[1],
+        LibraryStats.total_chapters: LibraryStats.total_chapters + delta[2],
+        LibraryStats.total_words: LibraryStats.total_words + delta[3]
+    }, synchronize_session=False)
+
+
+def sync_project(project_id, project):
+    """Upsert one project into the index and adjust the library totals.
+    Failures are logged, not raised: the JSON file has already been written
+    and stays authoritative."""
+    with _app_context():
+        try:
+            record = db.session.get(ProjectRecord, project_id)
+            before = _stat_values(record)
+            if record is None:
+                record = ProjectRecord(id=project_id)
+                db.session.add(record)
+            _fill_record(record, project, get_project_file(project_id))
+            _adjust_library_stats(before, _stat_values(record))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error syncing project {project_id} to store: {e}")
+            return
+    generation_events.publish_global('library', {'project_id': project_id, 'action': 'saved'})
+
+
+def import_json_projects():
+    """Mirror every project file into the index, dropping rows for missing files"""
+    imported = 0
+    seen = set()
+    with _app_context():
+        if os.path.exists(_projects_folder):
+            for filename in os.listdir(_projects_folder):
+                if not filename.endswith('.json'):
+                    continue
+                project_id = filename[:-5]
+                try:
+                    project = load_project(project_id)
+                except Exception as e:
+                    logging.warning(f"Error reading project file {filename}: {e}")
+                    continue
+                record = db.session.get(ProjectRecord, project_id)
+                if record is None:
+                    record = ProjectRecord(id=project_id)
+                    db.session.add(record)
+                _fill_record(record, project, get_project_file(project_id))
+                seen.add(project_id)
+                imported += 1
+
+        for record in ProjectRecord.query.all():
+            if record.id not in seen:
+                db.session.delete(record)
+        db.session.commit()
+        library_stats(verify=True)
+    return imported
+
+
+def list_projects(limit=None):
+    """Project records, most recently modified first"""
+    with _app_context():
+        query = ProjectRecord.query.order_by(ProjectRecord.last_modified.desc())
+        if limit:
+            query = query.limit(limit)
+        return [record.to_dict() for record in query.all()]
+
+
+# Sort keys accepted by query_projects; NULLs sort as empty/zero so paging cursors stay comparable
+PROJECT_SORTS = {
+    'last_modified': lambda: func.coalesce(ProjectRecord.last_modified, ''),
+    'created_at': lambda: func.coalesce(ProjectRecord.created_at, ''),
+    'name': lambda: func.coalesce(ProjectRecord.name, ''),
+    'title': lambda: func.coalesce(ProjectRecord.title, ''),
+    'status': lambda: func.coalesce(ProjectRecord.generation_status, ''),
+    'word_count': lambda: func.coalesce(ProjectRecord.word_count, 0),
+    'chapter_count': lambda: func.coalesce(ProjectRecord.chapter_count, 0),
+}
+
+
+def encode_cursor(value, project_id):
+    return base64.urlsafe_b64encode(json.dumps([value, project_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(sort value, project id) from a cursor; raises ValueError if malformed"""
+    try:
+        value, project_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return value, project_id
+
+
+def query_projects(sort='last_modified', descending=True, limit=None, cursor=None,
+                   with_chapters=True):
+    """One page of project records as dicts, plus the cursor of the next page
+    (None on the last page). Paging is keyset-based on (sort value, id), so
+    pages stay stable while projects are added or modified."""
+    if sort not in PROJECT_SORTS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    sort_column = PROJECT_SORTS[sort]()
+
+    with _app_context():
+        query = ProjectRecord.query
+        if not with_chapters:
+            query = query.options(noload(ProjectRecord.chapters))
+        if cursor:
+            value, last_id = decode_cursor(cursor)
+            if descending:
+                query = query.filter(or_(sort_column < value,
+                                         and_(sort_column == value, ProjectRecord.id < last_id)))
+            else:
+                query = query.filter(or_(sort_column > value,
+                                         and_(sort_column == value, ProjectRecord.id > last_id)))
+        if descending:
+            query = query.order_by(sort_column.desc(), ProjectRecord.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), ProjectRecord.id.asc())
+
+        if limit:
+            query = query.add_columns(sort_column).limit(limit + 1)
+            rows = query.all()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last_record, last_value = rows[-1]
+                next_cursor = encode_cursor(last_value, last_record.id)
+            return [record.to_dict(with_chapters) for record, _ in rows], next_cursor
+
+        return [record.to_dict(with_chapters) for record in query.all()], None
+
+
+def count_projects():
+    with _app_context():
+        return ProjectRecord.query.count()
+
+
+def _computed_library_stats():
+    """Totals recomputed from every project row"""
+    total_projects, total_chapters, total_words = db.session.query(
+        func.count(ProjectRecord.id),
+        func.coalesce(func.sum(ProjectRecord.chapter_count), 0),
+        func.coalesce(func.sum(ProjectRecord.word_count), 0)
+    ).one()
+    completed_projects = ProjectRecord.query.filter_by(status='completed').count()
+    return {
+        'total_projects': total_projects,
+        'completed_projects': completed_projects,
+        'total_chapters': int(total_chapters),
+        'total_words': int(total_words)
+    }
+
+
+def library_stats(verify=False):
+    """Totals across the library from the running aggregates (one row read).
+
+    verify=True recomputes them from the project index, repairs the stored
+    totals and reports any difference under 'drift'.
+    """
+    with _app_context():
+        stored = db.session.get(LibraryStats, 1)
+        if stored is not None and not verify:
+            return stored.to_dict()
+
+        computed = _computed_library_stats()
+        if stored is None:
+            stored = LibraryStats(id=1)
+            db.session.add(stored)
+            drift = {}
+        else:
+            drift = {key: value - computed[key]
+                     for key, value in stored.to_dict().items() if value != computed[key]}
+            if drift:
+                logging.warning(f"Library totals drifted from the index: {drift}")
+        for key, value in computed.items():
+            setattr(stored, key, value)
+        db.session.commit()
+
+        if verify:
+            computed['drift'] = drift
+        return computed
+
+
+def find_chapter_projects(chapter_id):
+    """Project ids whose chapter list contains chapter_id (normally exactly one)"""
+    with _app_context():
+        rows = db.session.query(ChapterRecord.project_id).filter(
+            ChapterRecord.chapter_id == chapter_id).all()
+        return [row.project_id for row in rows]
+
+
+def find_chapter(chapter_id):
+    """Resolve a chapter id to (project_id, project, chapter) via the index.
+    Returns (None, None, None) when no project holds the chapter."""
+    for project_id in find_chapter_projects(chapter_id):
+        try:
+            project = load_project(project_id)
+        except FileNotFoundError:
+            logging.warning(f"Chapter index points at missing project {project_id}")
+            continue
+        for chapter in project.get('chapters', []):
+            if chapter.get('id') == chapter_id:
+                return project_id, project, chapter
+        logging.warning(f"Chapter index is stale for chapter {chapter_id} in project {project_id}")
+    return None, None, None
+
+
+def rebuild_chapter_index():
+    """Re-sync every project from disk and return the number of indexed chapters"""
+    import_json_projects()
+    with _app_context():
+        return ChapterRecord.query.count()
@@ -0,0 +1,116 @@
+"""
+Cache of rendered PDFs
+
+WeasyPrint lays out a whole book on every render, which takes seconds to
+minutes. Finished PDFs are kept on disk under a key built from everything
+that goes into them: a hash of the project's content, the template and its
+mtime, and the export options. Previews and exports of an unchanged book
+are served from the cache; the cache (see disk_cache) is evicted
+least-recently-used once it grows past its size cap.
+
+Tunables (environment variables):
+- PDF_CACHE_ENABLED: "0" disables the cache (default "1")
+- PDF_CACHE_DIR: cache directory (default cache/pdf)
+- PDF_CACHE_MAX_MB: size cap in megabytes (default 500)
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+
+from disk_cache import DiskCache
+
+PDF_CACHE_ENABLED = os.environ.get("PDF_CACHE_ENABLED", "1") != "0"
+PDF_CACHE_DIR = os.environ.get("PDF_CACHE_DIR", os.path.join("cache", "pdf"))
+PDF_CACHE_MAX_BYTES = int(float(os.environ.get("PDF_CACHE_MAX_MB", 500)) * 1024 * 1024)
+
+# Bookkeeping that changes on every save without changing the rendered book
+VOLATILE_PROJECT_FIELDS = ('version', 'last_modified', 'generation_status')
+VOLATILE_CHAPTER_FIELDS = ('rev', 'status', 'cleaned_paragraphs')
+
+
+def project_content_hash(project):
+    """Hash of the project's content, ignoring bookkeeping fields"""
+    content = {k: v for k, v in project.items() if k not in VOLATILE_PROJECT_FIELDS}
+    content['chapters'] = [
+        {k: v for k, v in chapter.items() if k not in VOLATILE_CHAPTER_FIELDS}
+        for chapter in project.get('chapters', [])
+    ]
+    payload = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def render_key(project, template_path, **options):
+    """Cache key for rendering project with the template at template_path"""
+    payload = json.dumps([
+        project_content_hash(project),
+        os.path.basename(template_path),
+        os.stat(template_path).st_mtime_ns,
+        options
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderCache(DiskCache):
+    """On-disk PDF cache that renders each missing PDF once"""
+
+    suffix = '.pdf'
+
+    def __init__(self, directory, max_bytes):
+        super().__init__(directory, max_bytes)
+        self._rendering = {}  # key -> lock held while the PDF is rendered
+
+    def render(self, key, render):
+        """Cached PDF for key, calling render() -> bytes on a miss. Concurrent
+        requests for the same key wait for one render instead of repeating it."""
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            key_lock = self._rendering.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                # Another request may have rendered it while we waited
+                if os.path.exists(self.path(key)):
+                    data = self.get(key)
+                    if data is not None:
+                        return data
+                data = render()
+                try:
+                    self.put(key, data)
+                except OSError as e:
+                    logging.warning(f"Could not store rendered PDF in cache: {e}")
+                return data
+        finally:
+            with self._lock:
+                self._rendering.pop(key, None)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    """The process-wide cache, or None when caching is disabled"""
+    global _cache
+    if not PDF_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = RenderCache(PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES)
+        return _cache
+
+
+def cached_pdf(key, render):
+    """PDF bytes for key, from the cache or from render()"""
+    cache = get_render_cache()
+    if cache is None:
+        return render()
+    return cache.render(key, render)
+
+
+def render_cache_stats():
+    cache = get_render_cache()
+    return cache.stats() if cache else {'enabled': False}
@@ -421,15 +421,71 @@ function initializeDynamicFeatures() {
     initializeScrollAnimations();
 }
 
-// Real-time updates system
-function initializeRealTimeUpdates() {
-    // Auto-refresh project status only if not completed
-    const statusElement = document.getElementById('generation-status');
-    if (document.querySelector('[data-project-id]') && 
-        (!statusElement || !statusElement.textContent.includes('completed'))) {
-        setInterval(updateProjectStatus, 3000);
+// Server-push event channel: one stream per tab carries generation
+// progress, AI status and library updates. Falls back to long-polling
+// where EventSource is not available or the stream cannot be opened.
+const CHANNEL_EVENTS = ['snapshot', 'token', 'reset', 'chapter', 'status', 'done', 'library', 'ai_status'];
+
+const eventChannel = (function() {
+    const handlers = {};
+    let connected = false;
+    
+    function dispatch(name, data) {
+        (handlers[name] || []).forEach(handler => {
+            try {
+                handler(data);
+            } catch (error) {
+                console.error(`Error handling ${name} event:`, error);
+            }
+        });
+    }
+    
+    function poll(query, cursor) {
+        const params = new URLSearchParams(query);
+        if (cursor) params.set('cursor', cursor);
+        
+        fetch(`/api/events/poll?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                data.events.forEach(([name, payload]) => dispatch(name, payload));
+                poll(query, data.cursor);
+            })
+            .catch(() => setTimeout(() => poll(query, cursor), 5000));
+    }
+    
+    function connect() {
+        connected = true;
+        const projectId = document.querySelector('[data-project-id]')?.getAttribute('data-project-id');
+        const query = projectId ? {project_id: projectId} : {};
+        
+        if (window.EventSource) {
+            // EventSource reconnects by itself and gets a fresh snapshot
+            const source = new EventSource(`/api/events?${new URLSearchParams(query)}`);
+            CHANNEL_EVENTS.forEach(name => {
+                source.addEventListener(name, event => dispatch(name, JSON.parse(event.data)));
+            });
+            source.addEventListener('error', () => {
+                // CLOSED means the browser gave up reconnecting (e.g. a proxy refused the stream)
+                if (source.readyState === EventSource.CLOSED) {
+                    poll(query, null);
+                }
+            });
+        } else {
+            poll(query, null);
+        }
     }
     
+    return {
+        // The stream opens with the first listener
+        on(name, handler) {
+            (handlers[name] = handlers[name] || []).push(handler);
+            if (!connected) connect();
+        }
+    };
+})();
+
+// Real-time updates system
+function initializeRealTimeUpdates() {
     // Real-time license status check
     if (document.querySelector('#license_key')) {
         initializeLicenseValidation();
@@ -441,95 +497,16 @@ function initializeRealTimeUpdates() {
     }
 }
 
-// Chapter generation status checking
+// Chapter generation progress (the project page renders chapter details)
 function initializeChapterGeneration() {
-    const projectId = document.querySelector('[data-project-id]');
-    if (!projectId) return;
-    
-    const id = projectId.getAttribute('data-project-id');
-    
-    // Check if project is already completed - don't start polling
-    const statusElement = document.getElementById('generation-status');
-    if (statusElement && statusElement.textContent.includes('completed')) {
-        window.generationCompleted = true;
-        return;
-    }
+    if (!document.querySelector('[data-project-id]')) return;
     
-    checkGenerationStatus(id);
-}
-
-function checkGenerationStatus(projectId) {
-    // Don't check if already completed
-    if (window.generationCompleted) return;
-    
-    fetch(`/check_generation_status/${projectId}`)
-        .then(response => response.json())
-        .then(data => {
-            updateGenerationUI(data);
-            
-            // Continue checking if still generating
-            if (data.status === 'enhancing_description' || data.status === 'generating_titles' || data.status === 'generating_content') {
-                setTimeout(() => checkGenerationStatus(projectId), 2000);
-            }
-        })
-        .catch(error => {
-            console.error('Error checking generation status:', error);
-        });
-}
-
-function updateGenerationUI(data) {
-    const statusElement = document.getElementById('generation-status');
-    const progressElement = document.getElementById('generation-progress');
-    const chaptersContainer = document.getElementById('chapters-container');
-    
-    if (statusElement) {
-        let statusText = '';
-        let statusClass = '';
-        
-        switch (data.status) {
-            case 'pending':
-                statusText = 'Ready to generate';
-                statusClass = 'status-pending';
-                break;
-            case 'enhancing_description':
-                statusText = 'Enhancing book description...';
-                statusClass = 'status-generating';
-                break;
-            case 'generating_titles':
-                statusText = 'Generating chapter titles...';
-                statusClass = 'status-generating';
-                break;
-            case 'generating_content':
-                statusText = `Generating content (${data.completed_chapters}/${data.chapters} chapters)`;
-                statusClass = 'status-generating';
-                break;
-            case 'completed':
-                statusText = 'Generation completed';
-                statusClass = 'status-completed';
-                break;
-            default:
-                if (data.status.startsWith('error:')) {
-                    statusText = 'Generation failed';
-                    statusClass = 'status-error';
-                }
+    eventChannel.on('status', updateProgressBars);
+    eventChannel.on('done', data => {
+        if (data.status === 'completed') {
+            showCompletionEffect();
         }
-        
-        statusElement.textContent = statusText;
-        statusElement.className = `status-badge ${statusClass}`;
-    }
-    
-    if (progressElement && data.chapters > 0) {
-        const progress = (data.completed_chapters / data.chapters) * 100;
-        progressElement.style.width = progress + '%';
-    }
-    
-    // Only refresh page if generation just completed (not if it was already completed)
-    if (data.status === 'completed' && !window.generationCompleted) {
-        window.generationCompleted = true;
-        setTimeout(() => {
-            window.location.reload();
-        }, 1000);
-    }
+    });
 }
 
 // Form validation
@@ -875,27 +852,11 @@ function initializeScrollAnimations() {
 }
 
 // Project status updates
-function updateProjectStatus() {
-    const projectId = document.querySelector('[data-project-id]')?.getAttribute('data-project-id');
-    if (!projectId) return;
-    
-    fetch(`/check_generation_status/${projectId}`)
-        .then(response => response.json())
-        .then(data => {
-            updateGenerationUI(data);
-            updateProgressBars(data);
-            
-            if (data.status === 'completed') {
-                showCompletionEffect();
-            }
-        })
-        .catch(error => console.log('Status check error:', error));
-}
-
 function updateProgressBars(data) {
     const progressBars = document.querySelectorAll('.progress-bar');
+    if (!data.total_chapters) return;
     progressBars.forEach(bar => {
-        const progress = (data.completed_chapters / data.chapters) * 100;
+        const progress = (data.completed_chapters / data.total_chapters) * 100;
         bar.style.width = progress + '%';
         
         // Add dynamic color based on progress
@@ -1314,9 +1275,9 @@ function initializeExportGuide() {
 
 // AI Status Monitoring
 function setupAIStatusMonitoring() {
-    // Check AI status every 30 seconds if on homepage
+    // Settings changes are pushed over the event channel on the homepage
     if (window.location.pathname === '/') {
-        setInterval(updateAIStatus, 30000);
+        eventChannel.on('ai_status', renderAIStatus);
     }
 }
 
@@ -1325,22 +1286,24 @@ function checkAIStatusOnLoad() {
     updateAIStatus();
 }
 
+function renderAIStatus(data) {
+    const statusElement = document.getElementById('ai-status');
+    const configStatusElement = document.getElementById('config-status');
+    
+    if (statusElement) {
+        statusElement.textContent = data.status;
+    }
+    
+    if (configStatusElement) {
+        configStatusElement.textContent = data.detailed_status;
+        configStatusElement.className = data.is_ready ? 'text-sm text-green-300' : 'text-sm text-red-300';
+    }
+}
+
 function updateAIStatus() {
     fetch('/api/check_ai_status')
         .then(response => response.json())
-        .then(data => {
-            const statusElement = document.getElementById('ai-status');
-            const configStatusElement = document.getElementById('config-status');
-            
-            if (statusElement) {
-                statusElement.textContent = data.status;
-            }
-            
-            if (configStatusElement) {
-                configStatusElement.textContent = data.detailed_status;
-                configStatusElement.className = data.is_ready ? 'text-sm text-green-300' : 'text-sm text-red-300';
-            }
-        })
+        .then(renderAIStatus)
         .catch(error => {
             console.log('AI status check failed:', error);
         });
@@ -1374,10 +1337,10 @@ window.checkAIStatus = function() {
 
 // Homepage Statistics Loading  
 function loadHomepageStats() {
-    fetch('/api/projects')
+    fetch('/api/projects?fields=id&limit=1')
         .then(response => response.json())
         .then(data => {
-            updateLibraryCounter(data.projects.length);
+            updateLibraryCounter(data.total);
         })
         .catch(error => {
             console.log('Failed to load homepage statistics:', error);
@@ -1436,12 +1399,10 @@ function loadRecentActivity() {
     // Show loading state
     activityContainer.innerHTML = '<div class="text-gray-500 text-sm">Loading recent activity...</div>';
     
-    fetch('/api/projects')
+    fetch('/api/projects?fields=title,last_modified&sort=last_modified&limit=3')
         .then(response => response.json())
         .then(data => {
-            const projects = data.projects.sort((a, b) => 
-                new Date(b.last_modified || 0) - new Date(a.last_modified || 0)
-            ).slice(0, 3);
+            const projects = data.projects;
             
             if (projects.length === 0) {
                 activityContainer.innerHTML = '<div class="text-gray-500 text-sm">No recent activity</div>';
@@ -2559,16 +2520,17 @@ function showManualCreationModal() {
 
 // Load completed projects function
 function loadCompletedProjects() {
-    fetch('/api/projects')
+    fetch('/api/projects?fields=status,chapter_count,cover_image,created_at,topic')
         .then(response => response.json())
-        .then(projects => {
+        .then(data => {
+            const projects = data.projects || [];
             const grid = document.getElementById('completed-projects-grid');
             const emptyState = document.getElementById('empty-projects-state');
             const projectCount = document.getElementById('project-count');
             
             // Filter only completed projects
             const completedProjects = projects.filter(project => 
-                project.status === 'completed' && project.chapters && project.chapters.length > 0
+                project.status === 'completed' && project.chapter_count > 0
             );
             
             if (completedProjects.length === 0) {
@@ -2588,7 +2550,7 @@ function loadCompletedProjects() {
                     'data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iMjQwIiBoZWlnaHQ9IjMyMCIgdmlld0JveD0iMCAwIDI0MCAzMjAiIGZpbGw9Im5vbmUiIHhtbG5zPSJodHRwOi8vd3d3LnczLm9yZy8yMDAwL3N2ZyI+CjxyZWN0IHdpZHRoPSIyNDAiIGhlaWdodD0iMzIwIiBmaWxsPSJ1cmwoI3BhaW50MF9saW5lYXJfMF8xKSIvPgo8cGF0aCBkPSJNMTIwIDEwMEM5Mi4zODU4IDEwMCA3MCAxMjIuMzg2IDcwIDE1MEM3MCAxNzcuNjE0IDkyLjM4NTggMjAwIDEyMCAyMDBDMTQ3LjYxNCAyMDAgMTcwIDE3Ny42MTQgMTcwIDE1MEMxNzAgMTIyLjM4NiAxNDcuNjE0IDEwMCAxMjAgMTAwWiIgZmlsbD0id2hpdGUiIGZpbGwtb3BhY2l0eT0iMC4yIi8+CjxkZWZzPgo8bGluZWFyR3JhZGllbnQgaWQ9InBhaW50MF9saW5lYXJfMF8xIiB4MT0iMCIgeTE9IjAiIHgyPSIyNDAiIHkyPSIzMjAiIGdyYWRpZW50VW5pdHM9InVzZXJTcGFjZU9uVXNlIj4KPHN0b3Agc3RvcC1jb2xvcj0iIzY2N0VFQSIvPgo8c3RvcCBvZmZzZXQ9IjEiIHN0b3AtY29sb3I9IiM3NjRCQTIiLz4KPC9saW5lYXJHcmFkaWVudD4KPC9kZWZzPgo8L3N2Zz4K';
                 
                 const createdDate = new Date(project.created_at || Date.now()).toLocaleDateString();
-                const chapterCount = project.chapters ? project.chapters.length : 0;
+                const chapterCount = project.chapter_count || 0;
                 
                 return `
                     <div class="project-card" onclick="window.location.href='/project/${project.id}'">
@@ -2675,7 +2637,7 @@ function loadBookLibrary() {
     // Show loading state
     libraryGrid.innerHTML = "<div class=\"col-span-full text-center text-gray-400\">Loading your book library...</div>";
     
-    fetch("/api/projects")
+    fetch("/api/projects?fields=filename,title,topic,description,language,style,cover_image,created_date,generation_status,chapter_count")
         .then(response => response.json())
         .then(data => {
             const books = data.projects || [];
@@ -2719,7 +2681,8 @@ function displayBooks(books) {
             `/static/uploads/${book.cover_image}` : 
             generateBookCoverDataURL(book.title || "Untitled");
             
-        const chapterCount = Array.isArray(book.chapters) ? book.chapters.length : (book.chapters || 0);
+        const chapterCount = book.chapter_count !== undefined ? book.chapter_count :
+                             (Array.isArray(book.chapters) ? book.chapters.length : (book.chapters || 0));
         const createdDate = book.created_date ? 
             new Date(book.created_date).toLocaleDateString() : 
             "Unknown date";
@@ -2831,7 +2794,7 @@ function filterBooks(filter) {
     }
     
     // Re-fetch and display books with current filter
-    fetch("/api/projects")
+    fetch("/api/projects?fields=filename,title,topic,description,language,style,cover_image,created_date,generation_status,chapter_count")
         .then(response => response.json())
         .then(data => {
             const books = data.projects || [];
@@ -3022,10 +2985,22 @@ document.addEventListener('DOMContentLoaded', function() {
     checkAIStatus();
     loadWritingProgress();
     
-    // Refresh progress every 30 seconds if user is active
-    setInterval(function() {
-        if (document.visibilityState === 'visible') {
-            loadWritingProgress();
-        }
-    }, 30000);
+    // Refresh progress when the library changes, at most every 5 seconds
+    if (document.getElementById('recent-activity') || document.getElementById('completion-bar')) {
+        let refreshPending = false;
+        let initialState = true;
+        eventChannel.on('library', function() {
+            // The stream opens with the current totals, already loaded above
+            if (initialState) {
+                initialState = false;
+                return;
+            }
+            if (refreshPending) return;
+            refreshPending = true;
+            setTimeout(function() {
+                refreshPending = false;
+                loadWritingProgress();
+            }, 5000);
+        });
+    }
 });
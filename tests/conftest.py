@@ -0,0 +1,18 @@
+import pytest
+from flask import Flask
+
+import project_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A project store in a temporary folder and SQLite database, with
+    writes coalescing disabled unless a test turns it back on"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'store.db'}"
+    projects_folder = tmp_path / 'projects'
+    projects_folder.mkdir()
+    monkeypatch.setattr(project_store, 'PROJECT_WRITE_COALESCE', 0)
+    project_store.init_store(app, str(projects_folder))
+    with app.app_context():
+        yield project_store
@@ -0,0 +1,38 @@
+from export_store import ExportStore
+
+
+def _read(store, key):
+    f, download_name = store.open(key, touch=False)
+    if f is None:
+        return None
+    with f:
+        return f.read()
+
+
+def test_export_larger_than_the_cap_is_kept(tmp_path):
+    store = ExportStore(str(tmp_path), max_bytes=100, retention=0)
+    store.put(b'a' * 60, 'pdf', 'small.pdf', 'p:1:pdf')
+    store.put(b'b' * 200, 'pdf', 'large.pdf', 'p:2:pdf')
+
+    assert store.exists('p:2:pdf')
+    assert _read(store, 'p:2:pdf') == b'b' * 200
+    assert not store.exists('p:1:pdf')
+
+    # The next export evicts it as usual
+    store.put(b'c' * 50, 'pdf', 'next.pdf', 'p:3:pdf')
+    assert not store.exists('p:2:pdf')
+    assert _read(store, 'p:3:pdf') == b'c' * 50
+
+
+def test_least_recently_used_export_is_evicted(tmp_path):
+    store = ExportStore(str(tmp_path), max_bytes=100, retention=0)
+    store.put(b'a' * 40, 'pdf', 'a.pdf', 'a')
+    store.put(b'b' * 40, 'pdf', 'b.pdf', 'b')
+    f, _ = store.open('a')
+    f.close()
+    store.put(b'c' * 40, 'docx', 'c.docx', 'c')
+
+    assert store.exists('a')
+    assert not store.exists('b')
+    assert store.exists('c')
+    assert store.stats()['bytes'] == 80
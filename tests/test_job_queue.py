@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import current_app
+
+import job_queue
+from job_queue import JobRecord
+
+
+@pytest.fixture
+def jobs(store):
+    job_queue.init_jobs(current_app._get_current_object())
+    abandoned = []
+    job_queue.register_job_handler('pinned_test', lambda job: None, local=True,
+                                   on_abandon=lambda project_id, error: abandoned.append(project_id))
+    yield abandoned
+    job_queue._handlers.pop('pinned_test', None)
+
+
+def _pin(job_id, process_token, heartbeat_age):
+    record = job_queue.db.session.get(JobRecord, job_id)
+    record.pinned_to = process_token
+    record.heartbeat_at = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+    job_queue.db.session.commit()
+
+
+def test_queued_job_pinned_to_a_stopped_process_is_failed(jobs):
+    job_id = job_queue.enqueue_job('pinned_test', project_id='p1')
+    _pin(job_id, 'gone-host:1:dead', job_queue.JOB_STALE_AFTER * 2)
+
+    assert job_queue.recover_stale_jobs() == 1
+
+    job = job_queue.get_job(job_id)
+    assert job['status'] == 'failed'
+    assert job['finished_at'] is not None
+    assert jobs == ['p1']
+    assert job_queue.list_jobs(project_id='p1', active_only=True) == []
+
+
+def test_queued_jobs_of_live_processes_are_left_alone(jobs):
+    own = job_queue.enqueue_job('pinned_test', project_id='p1')
+    other = job_queue.enqueue_job('pinned_test', project_id='p2')
+    _pin(other, 'other-host:2:alive', 1)
+
+    assert job_queue.recover_stale_jobs() == 0
+    assert job_queue.get_job(own)['status'] == 'queued'
+    assert job_queue.get_job(other)['status'] == 'queued'
+    assert jobs == []
+
+
+def test_heartbeat_keeps_this_process_pinned_jobs_alive(jobs):
+    job_id = job_queue.enqueue_job('pinned_test', project_id='p1')
+    _pin(job_id, job_queue.PROCESS_TOKEN, job_queue.JOB_STALE_AFTER * 2)
+
+    job_queue._send_heartbeats()
+
+    record = job_queue.db.session.get(JobRecord, job_id)
+    job_queue.db.session.refresh(record)
+    assert datetime.utcnow() - record.heartbeat_at < timedelta(seconds=job_queue.JOB_STALE_AFTER)
+    assert job_queue.recover_stale_jobs() == 0
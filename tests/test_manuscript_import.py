@@ -0,0 +1,53 @@
+import uuid
+
+from manuscript_import import read_manuscript, split_raw_text
+
+MANUSCRIPT = """Chapter 1: The Beginning
+
+It starts here.
+
+Chapter 2: The Middle
+
+It goes on.
+
+Chapter 3: The End
+
+It stops.
+"""
+
+
+def test_imported_chapters_have_ids_and_status():
+    chapters = split_raw_text(MANUSCRIPT)
+    assert [chapter['title'] for chapter in chapters] == ['The Beginning', 'The Middle', 'The End']
+    assert all(chapter['status'] == 'completed' for chapter in chapters)
+    assert len({chapter['id'] for chapter in chapters}) == 3
+
+
+def test_chapters_without_headings_have_ids_and_status():
+    chapters = split_raw_text('\n\n'.join(f"Paragraph {i} of the text." for i in range(40)))
+    assert len(chapters) > 1
+    assert all(chapter['id'] and chapter['status'] == 'completed' for chapter in chapters)
+
+
+def test_imported_manuscript_saves_twice_cleanly(store, tmp_path):
+    path = tmp_path / 'book.txt'
+    path.write_text(MANUSCRIPT, encoding='utf-8')
+    project_id = str(uuid.uuid4())
+    store.save_project(project_id, {'id': project_id, 'name': 'Imported', 'chapters': []})
+
+    project = store.load_project(project_id)
+    project['chapters'] = read_manuscript(str(path), 'txt')
+    store.save_project(project_id, project)
+    revisions = [chapter['rev'] for chapter in store.load_project(project_id)['chapters']]
+
+    project = store.load_project(project_id)
+    project['name'] = 'Imported again'
+    store.save_project(project_id, project)
+    saved = store.load_project(project_id)
+
+    # Unchanged chapters keep their revision, and none collided in the merge
+    assert [chapter['rev'] for chapter in saved['chapters']] == revisions
+    assert [chapter['title'] for chapter in saved['chapters']] == ['The Beginning', 'The Middle', 'The End']
+    for chapter in saved['chapters']:
+        assert store.find_chapter_projects(chapter['id']) == [project_id]
+    assert store.find_chapter_projects(None) == []
@@ -0,0 +1,137 @@
+import json
+import uuid
+import fcntl
+import multiprocessing
+
+import pytest
+
+import project_store
+
+
+def _new_project(store, **fields):
+    project_id = str(uuid.uuid4())
+    chapters = [{'id': f'c{i}', 'number': i, 'title': f'Chapter {i}', 'content': '', 'status': 'completed'}
+                for i in range(1, 4)]
+    store.save_project(project_id, dict({'id': project_id, 'name': 'Book', 'topic': 'Topic',
+                                         'chapters': chapters}, **fields))
+    return project_id
+
+
+def _on_disk(store, project_id):
+    with open(store.get_project_file(project_id)) as f:
+        return json.load(f)
+
+
+def test_writers_of_different_fields_both_survive(store):
+    project_id = _new_project(store)
+    first = store.load_project(project_id)
+    second = store.load_project(project_id)
+
+    first['name'] = 'New name'
+    first['chapters'][0]['content'] = 'First writer'
+    store.save_project(project_id, first)
+    second['topic'] = 'New topic'
+    second['chapters'][1]['title'] = 'Second writer'
+    store.save_project(project_id, second)
+
+    saved = store.load_project(project_id)
+    assert saved['name'] == 'New name'
+    assert saved['topic'] == 'New topic'
+    assert saved['chapters'][0]['content'] == 'First writer'
+    assert saved['chapters'][1]['title'] == 'Second writer'
+    assert saved['version'] == 3
+
+
+def test_same_field_conflict_is_won_by_the_later_write(store):
+    project_id = _new_project(store)
+    first = store.load_project(project_id)
+    second = store.load_project(project_id)
+
+    first['name'] = 'First'
+    first['chapters'][0]['title'] = 'First title'
+    store.save_project(project_id, first)
+    second['name'] = 'Second'
+    second['chapters'][0]['title'] = 'Second title'
+    store.save_project(project_id, second)
+
+    saved = store.load_project(project_id)
+    assert saved['name'] == 'Second'
+    assert saved['chapters'][0]['title'] == 'Second title'
+
+
+def test_chapters_added_by_another_writer_are_kept(store):
+    project_id = _new_project(store)
+    first = store.load_project(project_id)
+    second = store.load_project(project_id)
+
+    first['chapters'].append({'id': 'c4', 'number': 4, 'title': 'Chapter 4', 'content': ''})
+    store.save_project(project_id, first)
+    second['name'] = 'Renamed'
+    store.save_project(project_id, second)
+
+    saved = store.load_project(project_id)
+    assert [chapter['id'] for chapter in saved['chapters']] == ['c1', 'c2', 'c3', 'c4']
+    assert saved['name'] == 'Renamed'
+
+
+def test_coalesced_saves_flush_the_latest_state(store, monkeypatch):
+    project_id = _new_project(store)
+    monkeypatch.setattr(project_store, 'PROJECT_WRITE_COALESCE', 60)
+    project = store.load_project(project_id)
+
+    for i in range(5):
+        project['chapters'][0]['content'] = f'Draft {i}'
+        store.save_project(project_id, project)
+    project['name'] = 'Final'
+    store.save_project(project_id, project)
+
+    # Deferred: the file still holds the first write
+    assert _on_disk(store, project_id)['name'] == 'Book'
+    store.flush_project(project_id)
+
+    saved = _on_disk(store, project_id)
+    assert saved['name'] == 'Final'
+    assert saved['chapters'][0]['content'] == 'Draft 4'
+    assert saved['version'] == 2
+    assert project_id not in project_store._pending
+
+
+def test_project_lock_excludes_other_processes(store):
+    project_id = _new_project(store)
+    lock_path = f"{store._projects_folder}/.locks/{project_id}.lock"
+
+    with store.project_lock(project_id):
+        # flock locks belong to an open file, so another open of the lock
+        # file is refused just like another process would be
+        with open(lock_path, 'a') as other:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    with open(lock_path, 'a') as other:
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        fcntl.flock(other, fcntl.LOCK_UN)
+
+
+def _write_field_repeatedly(store, project_id, field, times):
+    project_store.db.engine.dispose(close=False)  # connections are not shared with the parent
+    for i in range(times):
+        project = store.load_project(project_id)
+        project[field] = i + 1
+        store.save_project(project_id, project)
+
+
+def test_processes_writing_different_fields_lose_nothing(store):
+    project_id = _new_project(store)
+    context = multiprocessing.get_context('fork')
+    writers = [context.Process(target=_write_field_repeatedly, args=(store, project_id, field, 20))
+               for field in ('count_a', 'count_b')]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(60)
+        assert writer.exitcode == 0
+
+    saved = _on_disk(store, project_id)
+    assert saved['count_a'] == 20
+    assert saved['count_b'] == 20
+    assert saved['version'] == 41
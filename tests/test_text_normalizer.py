@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from text_normalizer import clean_chapter_content, enhance_content_for_kdp
+from benchmarks import bench_text_normalizer, bench_kdp_formatter
+
+CLEAN_EDGE_CASES = [
+    '',
+    '\n\n\n',
+    'Short.',
+    'Chapter 1: The Beginning\n\nThe story starts here and goes on.',
+    '# Heading\n## Sub heading\nBody text that is long enough to keep.',
+    'THIS LINE IS ALL CAPS\nBut this one is not, so it stays in.',
+    'A **bold** claim, an *italic* aside and a __dunder__ word here.',
+    'Hashes in the middle ## of a line ### and #### more # single.',
+    'Stars and hashes #*# mixed _#_# together in one long line.',
+    'Tiny. Sentences. Are. Merged. Until. They. Are. Long. Enough. Okay.',
+    'Wait... what?! Really?? Yes!!! It is true. Absolutely, positively true.',
+    '   Leading and trailing whitespace on a long line.   \n\t\tTabbed line that is long enough.\t',
+    'Windows line endings work too.\r\nSecond line of the chapter.\r\n',
+    'Unicode text — café, naïve, 日本語の文章です。 Ends without a terminator',
+    'Non-breaking spaces and em spaces. Are treated as whitespace here.',
+    'hapitre 3 (French with a dropped C)\nLe contenu du chapitre commence ici.',
+    'Lowercase chapter heading is not skipped by the basic cleaner at all.',
+    'x' * 40 + '.' + 'y' * 5 + '!' + ' z' * 30,
+    'Numbers 3.14 and 2.71 inside sentences. Versions like v1.2.3 too.',
+    '\x0bVertical tab\x0c and form feed characters inside a long line.',
+]
+
+KDP_EDGE_CASES = [
+    '',
+    '\n \n',
+    'Chapter 1: Getting Started\n\nThis opening sentence is comfortably long enough. Another one follows it here.',
+    'CHAPTER TWO IN CAPITALS that is long enough\nchapter three in lower case, also long enough',
+    '## Heading with text after it that is long\nBody text after the heading is kept intact here.',
+    'Trailing hashes #\nare removed together with the newline after them, joining lines.',
+    '**Bold across\nlines** and *italic across\nlines* are unwrapped before lines split.',
+    'snake_case_names and __dunder__ words lose their underscores in pairs.',
+    'An `inline code` span, a ``double`` span and an unclosed ` backtick stay sane.',
+    '- first list item that is long enough to keep\n* second item, also long enough\n+ third item for good measure',
+    '\n\n   - indented bullet after blank lines that is long enough',
+    '12.\n345\n1234567890123456789012345\nNumbers alone on a line are dropped when short.',
+    'ends without punctuation and is long enough to keep',
+    'lowercase start. another lowercase sentence follows it. Then A Capital one arrives.',
+    'Tabs\tand  double  spaces and NBSP are collapsed into single spaces here.',
+    'Short. Tiny. Small. Then a sentence that is definitely longer than twenty five chars.',
+    'Wait... What?! Yes!!! This sentence ends with an ellipsis... And this one does not',
+    'Unicode — café naïve Ünïcödé text that is long. Élan starts with a non-ASCII capital.',
+    ' '.join(['This is sentence number %d in a long run of sentences.' % i for i in range(40)]),
+]
+
+
+def _synthetic_chapters(generate, seed, count=100):
+    rng = random.Random(seed)
+    return [generate(rng, rng.randint(10, 3000)) for _ in range(count)]
+
+
+@pytest.fixture(scope='module')
+def clean_chapters():
+    return _synthetic_chapters(bench_text_normalizer.synthetic_chapter, seed=1)
+
+
+@pytest.fixture(scope='module')
+def kdp_chapters():
+    return _synthetic_chapters(bench_kdp_formatter.synthetic_chapter, seed=1)
+
+
+@pytest.mark.parametrize('content', CLEAN_EDGE_CASES)
+def test_clean_chapter_content_edge_cases(content):
+    assert clean_chapter_content(content) == bench_text_normalizer.reference_clean_chapter_content(content)
+
+
+def test_clean_chapter_content_synthetic_chapters(clean_chapters):
+    for content in clean_chapters:
+        assert clean_chapter_content(content) == bench_text_normalizer.reference_clean_chapter_content(content)
+
+
+@pytest.mark.parametrize('content', KDP_EDGE_CASES)
+def test_enhance_content_for_kdp_edge_cases(content):
+    assert enhance_content_for_kdp(content) == bench_kdp_formatter.reference_enhance_content_for_kdp(content)
+
+
+def test_enhance_content_for_kdp_synthetic_chapters(kdp_chapters):
+    for content in kdp_chapters:
+        assert enhance_content_for_kdp(content) == bench_kdp_formatter.reference_enhance_content_for_kdp(content)
@@ -0,0 +1,178 @@
+"""
+Text normalisation for book exports
+
+Turns a chapter's raw (often markdown-flavoured) text into the list of
+paragraphs the export templates print. Lines are read lazily from the
+content and filtered, markup is only removed from lines that contain it,
+and the joined text is cut into sentences in a single pass of a compiled
+regex instead of being rebuilt one character at a time.
+
+clean_chapter_content() formats the standard export and
+enhance_content_for_kdp() the KDP print export. Both give output identical
+to their original implementations; benchmarks/bench_text_normalizer.py and
+benchmarks/bench_kdp_formatter.py check parity and measure old and new.
+"""
+import re
+
+# Non-empty lines of the content, without splitting it into a list first
+_LINE = re.compile(r'[^\n]+')
+
+# Lines that are headers or duplicate chapter titles rather than body text
+_HEADER_PREFIXES = ('#', 'Chapter', 'CHAPTER', 'hapitre')
+
+# A sentence: leading whitespace, then text up to the first '.', '!' or '?'
+# that leaves it more than 15 characters long (a greedy run of
+# non-terminators is much faster in re than a lazy .*?)
+_SENTENCE = re.compile(r'\s*(\S.{14}[^.!?]*[.!?])', re.DOTALL)
+
+SENTENCES_PER_PARAGRAPH = 3
+
+
+def content_lines(content):
+    """Body lines of content with markdown emphasis removed"""
+    for match in _LINE.finditer(content):
+        line = match.group().strip()
+        # Skip markdown headers, duplicate titles and all-caps lines
+        if not line or line.startswith(_HEADER_PREFIXES) or (len(line) > 10 and line.isupper()):
+            continue
+        # Most lines carry no markup; str.replace beats re.sub and translate here.
+        # '#' goes only in pairs, after '*' and '_' (as the original chain did)
+        if '*' in line:
+            line = line.replace('*', '')
+        if '_' in line:
+            line = line.replace('_', '')
+        if '##' in line:
+            line = line.replace('##', '')
+        line = line.strip()
+        if len(line) > 10:  # Only keep substantial content
+            yield line
+
+
+def split_sentences(text):
+    """Sentences of text, each ending at the first terminator that makes it
+    longer than 15 characters; the unterminated rest is the last sentence"""
+    end = 0
+    for match in _SENTENCE.finditer(text):
+        yield match.group(1)
+        end = match.end()
+    rest = text[end:].strip()
+    if rest:
+        yield rest
+
+
+def clean_chapter_content(content):
+    """Clean and format chapter content for export: paragraphs of three sentences"""
+    if not content:
+        return []
+
+    paragraphs = []
+    current_paragraph = []
+    for sentence in split_sentences(' '.join(content_lines(content))):
+        if len(sentence) > 10:
+            current_paragraph.append(sentence)
+            if len(current_paragraph) >= SENTENCES_PER_PARAGRAPH:
+                paragraphs.append(' '.join(current_paragraph))
+                current_paragraph = []
+
+    if current_paragraph:
+        paragraphs.append(' '.join(current_paragraph))
+
+    return paragraphs
+
+
+# ===== KDP print formatting =====
+
+# Markdown emphasis, code spans and headers; these may span lines
+_BOLD = re.compile(r'\*\*([^*]+)\*\*')
+_ITALIC = re.compile(r'\*([^*]+)\*')
+_UNDERSCORE_ITALIC = re.compile(r'_([^_]+)_')
+_CODE_SPAN = re.compile(r'`([^`]+)`')
+_HEADER_MARKS = re.compile(r'#+\s*')
+_LIST_MARKER = re.compile(r'^\s*[-*+]\s+', re.MULTILINE)
+
+_STANDALONE_NUMBER = re.compile(r'\d+\.?\s*$')
+
+# Sentence boundary in single-spaced text: a terminator, a space, a capital
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?]) (?=[A-Z])')
+
+KDP_SENTENCES_PER_PARAGRAPH = 4
+KDP_TARGET_PARAGRAPH_LENGTH = 400  # Optimal for 6x9 print format
+
+
+def strip_markdown(text):
+    """Remove markdown markers from the whole text. Each pass only runs if its
+    marker occurs at all; the order matters (bold before italic)."""
+    if '*' in text:
+        if '**' in text:
+            text = _BOLD.sub(r'\1', text)
+        text = _ITALIC.sub(r'\1', text)
+    if '_' in text:
+        text = _UNDERSCORE_ITALIC.sub(r'\1', text)
+    if '`' in text:
+        text = _CODE_SPAN.sub(r'\1', text)
+    if '#' in text:
+        text = _HEADER_MARKS.sub('', text)
+    return _LIST_MARKER.sub('', text)
+
+
+def kdp_lines(text):
+    """Body lines: no chapter headers, standalone numbers or short fragments"""
+    for match in _LINE.finditer(text):
+        line = match.group().strip()
+        # Skip chapter headers and very short lines (formatting artifacts)
+        if (len(line) > 20 and
+                not line.lower().startswith('chapter') and
+                not line.startswith('#') and
+                not _STANDALONE_NUMBER.match(line)):
+            yield line
+
+
+def kdp_sentences(text):
+    """Sentences of single-spaced text longer than 25 characters, each ending
+    in '.', '!' or '?'"""
+    for sentence in _SENTENCE_BREAK.split(text):
+        if len(sentence) > 25:  # Only include substantial sentences
+            if not sentence.endswith(('.', '!', '?')):
+                sentence += '.'
+            yield sentence
+
+
+def kdp_paragraphs(sentences):
+    """Group sentences into paragraphs of at most four sentences, ending one
+    as soon as it reaches the target length"""
+    current_paragraph = []
+    current_length = 0
+    for sentence in sentences:
+        current_paragraph.append(sentence)
+        current_length += len(sentence)
+        if (len(current_paragraph) >= KDP_SENTENCES_PER_PARAGRAPH or
+                current_length >= KDP_TARGET_PARAGRAPH_LENGTH):
+            paragraph = ' '.join(current_paragraph)
+            if len(paragraph) > 50:  # Only add substantial paragraphs
+                yield paragraph
+            current_paragraph = []
+            current_length = 0
+
+    if current_paragraph:
+        paragraph = ' '.join(current_paragraph)
+        if len(paragraph) > 50:
+            yield paragraph
+
+
+def enhance_content_for_kdp(content):
+    """
+    Advanced content processing for Amazon KDP print-ready formatting
+
+    Features:
+    - Intelligent paragraph detection and formatting
+    - Professional sentence structure optimization
+    - Removal of poor formatting and excessive whitespace
+    - Chapter title and markdown cleanup
+    - Optimal paragraph length for print readability
+    """
+    if not content:
+        return []
+
+    # Lines are stripped, so collapsing whitespace runs is a split and join
+    full_text = ' '.join(' '.join(kdp_lines(strip_markdown(content))).split())
+    return list(kdp_paragraphs(kdp_sentences(full_text)))